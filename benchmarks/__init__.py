@@ -0,0 +1 @@
+"""Benchmarks for pypodio2, run against a local stub of the Podio API."""
@@ -0,0 +1,66 @@
+"""
+Throughput of one AsyncClient with 1-256 requests in flight, against a
+local asyncio stub server.
+
+    python -m benchmarks.bench_async --requests 5000 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from pypodio2.aio import AsyncClient, AsyncHttpTransport
+
+CONCURRENCY = (1, 8, 32, 128, 256)
+
+
+async def start_stub(latency):
+    body = json.dumps({'item_id': 1}).encode("utf-8")
+    response = (b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n" % len(body)) + body
+
+    async def handler(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            if latency:
+                await asyncio.sleep(latency)
+            writer.write(response)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handler, '127.0.0.1', 0, backlog=512)
+    return server, 'http://127.0.0.1:%s' % server.sockets[0].getsockname()[1]
+
+
+async def run(url, concurrency, requests):
+    client = AsyncClient(AsyncHttpTransport(url, dict, max_concurrency=concurrency))
+    start = time.time()
+    await asyncio.gather(*[client.Item.find(i) for i in range(requests)])
+    elapsed = time.time() - start
+    await client.close()
+    # Let the stub notice the closed connections
+    await asyncio.sleep(0.1)
+    return requests / elapsed
+
+
+async def main(args):
+    server, url = await start_stub(args.latency)
+    print("%12s %12s" % ("in flight", "req/s"))
+    for concurrency in CONCURRENCY:
+        print("%12d %12.1f" % (concurrency, await run(url, concurrency, args.requests)))
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="artificial server latency in seconds")
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(main(parser.parse_args()))
+    loop.close()
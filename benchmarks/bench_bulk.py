@@ -0,0 +1,42 @@
+"""
+Items per second written by Item.bulk_upsert with 1-32 workers.
+
+    python -m benchmarks.bench_bulk --items 2000 --latency 0.005
+"""
+import argparse
+import time
+
+from pypodio2 import client, transport
+from benchmarks.stub_server import StubServer
+
+WORKER_COUNTS = (1, 2, 4, 8, 16, 32)
+
+
+def run(url, workers, items):
+    podio = client.Client(transport.HttpTransport(url, dict, pool_size=workers))
+    batch = ({'fields': {'title': 'item %d' % n}} for n in range(items))
+    start = time.time()
+    failed = sum(1 for result in podio.Item.bulk_upsert(1, batch, workers=workers)
+                 if not result.ok)
+    return items / (time.time() - start), failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help="artificial server latency in seconds")
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency).start()
+    try:
+        print("%8s %12s %8s" % ("workers", "items/s", "failed"))
+        for workers in WORKER_COUNTS:
+            rate, failed = run(server.url, workers, args.items)
+            print("%8d %12.1f %8d" % (workers, rate, failed))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
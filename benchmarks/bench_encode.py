@@ -0,0 +1,51 @@
+"""
+Multipart encoding throughput for a large file, in MB/s.
+
+    python -m benchmarks.bench_encode --size 256
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from pypodio2.encode import MultipartParam, multipart_encode
+
+BLOCKSIZES = (4096, 65536, 1048576)
+
+
+def run(path, blocksize, reuse_buffer):
+    with open(path, 'rb') as fileobj:
+        datagen, headers = multipart_encode([('filename', 'big.bin'),
+                                             MultipartParam('source', fileobj=fileobj)],
+                                            blocksize=blocksize, reuse_buffer=reuse_buffer)
+        start = time.time()
+        size = 0
+        for block in datagen:
+            size += len(block)
+        elapsed = time.time() - start
+    assert size == int(headers['Content-Length'])
+    return size / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=256, help="file size in MB")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            block = os.urandom(1 << 20)
+            for _ in range(args.size):
+                f.write(block)
+        print("%10s %14s %10s" % ("blocksize", "reuse_buffer", "MB/s"))
+        for blocksize in BLOCKSIZES:
+            for reuse_buffer in (False, True):
+                print("%10d %14s %10.1f" % (blocksize, reuse_buffer,
+                                            run(path, blocksize, reuse_buffer)))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
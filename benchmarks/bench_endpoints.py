@@ -0,0 +1,56 @@
+"""
+Per-call overhead of the client itself, with the network replaced by a
+canned response: attribute based URL building against precompiled
+endpoints.
+
+    python -m benchmarks.bench_endpoints --calls 200000
+"""
+import argparse
+import time
+
+from httplib2 import Response
+
+from pypodio2 import client, endpoints, transport
+
+RESPONSE = (Response({'status': '200'}), b'{"item_id": 1}')
+
+
+class CannedHttp(object):
+    def request(self, uri, method="GET", body=None, headers=None):
+        return RESPONSE
+
+
+def timed(func, calls):
+    start = time.time()
+    for n in range(calls):
+        func(n)
+    return (time.time() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    http_transport = transport.HttpTransport('https://api.podio.com', dict)
+    http_transport._http = CannedHttp()
+    podio = client.Client(http_transport)
+    attributes = {'fields': {'title': 'x'}}
+
+    cases = (
+        ("GET url=/item/%d", lambda n: http_transport.GET(url='/item/%d' % n)),
+        ("call(ITEM_FIND)", lambda n: http_transport.call(endpoints.ITEM_FIND, n)),
+        ("Item.find", lambda n: podio.Item.find(n)),
+        ("PUT url=/item/%d?..", lambda n: http_transport.PUT(
+            url='/item/%d?silent=true' % n, body=b'{}', type='application/json')),
+        ("call(ITEM_UPDATE)", lambda n: http_transport.call(
+            endpoints.ITEM_UPDATE, n, body=b'{}', type='application/json', silent=True)),
+        ("Item.update", lambda n: podio.Item.update(n, attributes, silent=True)),
+    )
+    print("%-22s %10s" % ("", "us/call"))
+    for name, func in cases:
+        print("%-22s %10.2f" % (name, timed(func, args.calls)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Time to export an org of several apps from the local Podio stub with one
+process and with a pool of worker processes.
+
+    python -m benchmarks.bench_export --apps 8 --items 2000
+"""
+import argparse
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+from pypodio2.export import Exporter, OAuthClientFactory
+from benchmarks.stub_server import StubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--apps', type=int, default=8)
+    parser.add_argument('--items', type=int, default=2000, help="items per app")
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency, items=args.items, spaces=1, apps=args.apps).start()
+    try:
+        print("%10s %10s %12s" % ("processes", "seconds", "items/s"))
+        for processes in sorted(set([1, args.processes])):
+            directory = tempfile.mkdtemp()
+            tokens = tempfile.mkdtemp()
+            try:
+                factory = OAuthClientFactory('key', 'secret', 'user', 'password',
+                                             domain=server.url, token_directory=tokens)
+                start = time.time()
+                items = sum(result.items for result in
+                            Exporter(factory, directory, processes=processes).export_org(1))
+                elapsed = time.time() - start
+            finally:
+                shutil.rmtree(directory)
+                shutil.rmtree(tokens)
+            print("%10d %10.2f %12.0f" % (processes, elapsed, items / elapsed))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Decoding and encoding time of a 500-item filter page per JSON codec.
+
+    python -m benchmarks.bench_json --items 500 --rounds 20
+"""
+import argparse
+import json
+import time
+
+from pypodio2 import jsoncodec
+from pypodio2.transport import _handle_response
+
+
+class Response(object):
+    status = 200
+
+
+def filter_page(items):
+    """A filter response shaped like Podio's, with a few fields per item"""
+    return {'filtered': items, 'total': items, 'items': [{
+        'item_id': 100000 + n,
+        'app_item_id': n,
+        'title': u'Item n\xb0%d' % n,
+        'created_on': '2024-05-01 10:00:00',
+        'last_event_on': '2024-05-02 11:30:00',
+        'created_by': {'user_id': 12, 'name': 'Jane Doe', 'type': 'user'},
+        'fields': [{
+            'field_id': 5000 + f,
+            'external_id': 'field-%d' % f,
+            'type': 'text',
+            'label': 'Field %d' % f,
+            'values': [{'value': u'Some text for field %d of item %d' % (f, n)}],
+        } for f in range(10)],
+        'tags': ['alpha', 'beta'],
+    } for n in range(items)]}
+
+
+def timed(func, rounds):
+    start = time.time()
+    for _ in range(rounds):
+        func()
+    return (time.time() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    page = filter_page(args.items)
+    body = json.dumps(page).encode("utf-8")
+    codecs = [jsoncodec.StdlibCodec()]
+    try:
+        codecs.append(jsoncodec.OrjsonCodec())
+    except ImportError:
+        print("orjson is not installed, only the stdlib codec is measured")
+
+    print("page size %.1f MB" % (len(body) / 1e6))
+    print("%8s %12s %12s" % ("codec", "decode ms", "encode ms"))
+    previous = jsoncodec.get_codec()
+    try:
+        for codec in codecs:
+            jsoncodec.set_codec(codec)
+            decode = timed(lambda: _handle_response(Response, body), args.rounds)
+            encode = timed(lambda: jsoncodec.dumps(page), args.rounds)
+            print("%8s %12.2f %12.2f" % (codec.name, decode, encode))
+    finally:
+        jsoncodec.set_codec(previous)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Peak memory and time to process a filter page decoded at once and
+incrementally with jsonstream, the body arriving in 64 KB chunks.
+
+    python -m benchmarks.bench_jsonstream --items 500
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from pypodio2 import jsoncodec
+from pypodio2.jsonstream import ArrayParser
+from benchmarks.bench_json import filter_page
+
+CHUNK = 65536
+
+
+def chunks(body):
+    for start in range(0, len(body), CHUNK):
+        yield body[start:start + CHUNK]
+
+
+def buffered(body):
+    data = b''.join(chunks(body))
+    count = 0
+    for item in jsoncodec.loads(data)['items']:
+        count += 1
+    return count
+
+
+def incremental(body):
+    parser = ArrayParser('items')
+    count = 0
+    for chunk in chunks(body):
+        for item in parser.feed(chunk):
+            count += 1
+    parser.close()
+    return count
+
+
+def measure(func, body):
+    # Timed separately since tracing slows allocations down
+    start = time.time()
+    func(body)
+    elapsed = time.time() - start
+    gc.collect()
+    tracemalloc.start()
+    func(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=500)
+    args = parser.parse_args()
+
+    body = jsoncodec.dumps(filter_page(args.items))
+    print("page of %d items, %.1f MB" % (args.items, len(body) / 1e6))
+    print("%12s %12s %10s" % ("", "peak MB", "ms"))
+    for name, func in (('buffered', buffered), ('incremental', incremental)):
+        peak, elapsed = measure(func, body)
+        print("%12s %12.2f %10.1f" % (name, peak / 1e6, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
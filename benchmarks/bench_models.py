@@ -0,0 +1,60 @@
+"""
+Memory held by decoded filter results as raw dicts and as models.Item,
+and the cost of reading one field value from each.
+
+    python -m benchmarks.bench_models --items 20000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from pypodio2 import jsoncodec
+from pypodio2.models import AppSchema
+from benchmarks.bench_json import filter_page
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def raw_lookup(item, external_id):
+    for field in item['fields']:
+        if field['external_id'] == external_id:
+            return field['values'][0]['value']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=20000)
+    args = parser.parse_args()
+
+    page = filter_page(args.items)
+    body = jsoncodec.dumps(page)
+    del page
+    schema = AppSchema.from_app({'app_id': 1, 'fields': []})
+
+    raw, raw_size = measure(lambda: jsoncodec.loads(body)['items'])
+    models, model_size = measure(lambda: list(schema.items(jsoncodec.loads(body)['items'])))
+
+    start = time.time()
+    for item in raw:
+        raw_lookup(item, 'field-9')
+    raw_time = (time.time() - start) / len(raw) * 1e9
+    start = time.time()
+    for item in models:
+        item['field-9']
+    model_time = (time.time() - start) / len(models) * 1e9
+
+    print("%8s %12s %14s" % ("", "MB", "ns/lookup"))
+    print("%8s %12.1f %14.0f" % ("dicts", raw_size / 1e6, raw_time))
+    print("%8s %12.1f %14.0f" % ("models", model_size / 1e6, model_time))
+
+
+if __name__ == '__main__':
+    main()
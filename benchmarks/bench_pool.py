@@ -0,0 +1,50 @@
+"""
+Throughput of a single pooled client shared by 1-32 threads.
+
+    python -m benchmarks.bench_pool --requests 2000 --latency 0.005
+"""
+import argparse
+import threading
+import time
+
+from pypodio2 import client, transport
+from benchmarks.stub_server import StubServer
+
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32)
+
+
+def run(url, threads, requests):
+    podio = client.Client(transport.HttpTransport(url, dict, pool_size=threads))
+    per_thread = requests // threads
+
+    def worker():
+        for _ in range(per_thread):
+            podio.Item.find(1)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help="artificial server latency in seconds")
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency).start()
+    try:
+        print("%8s %12s" % ("threads", "req/s"))
+        for threads in THREAD_COUNTS:
+            print("%8d %12.1f" % (threads, run(server.url, threads, args.requests)))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
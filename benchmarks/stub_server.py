@@ -0,0 +1,221 @@
+"""
+Local stand-in for the Podio API used by the benchmarks.
+
+It implements just enough of the API for the main areas calls:
+
+    POST   /oauth/token                 password, app and refresh grants
+    GET    /item/{id}                   an item with ``fields`` fields
+    POST   /item/app/{id}/filter/       offset/limit pages of ``items`` items
+    POST   /item/app/{id}/              create an item
+    PUT    /item/{id}                   update an item
+    DELETE /item/{id}                   delete an item
+    GET    /app/{id}                    an app with ``fields`` fields
+    GET    /org/{id}/space/             ``spaces`` spaces
+    GET    /app/space/{id}/             ``apps`` apps per space
+    POST   /file/v2/                    multipart upload
+    GET    /file/{id}/raw               ``file_size`` bytes, honouring Range
+
+Any other path gets a small JSON document. Every response carries
+X-Rate-Limit-* headers, after an optional artificial ``latency`` that
+stands in for network and server time; a share ``error_rate`` of the
+requests fails with a 503 instead. With ``compress`` JSON responses are
+gzipped for clients that accept it.
+"""
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+def make_item(item_id, fields):
+    return {
+        'item_id': item_id,
+        'app_item_id': item_id,
+        'title': 'Item %d' % item_id,
+        'created_on': '2024-05-01 10:00:00',
+        'last_edit_on': '2024-05-01 10:00:00',
+        'fields': [{
+            'field_id': 1000 + n,
+            'external_id': 'field-%d' % n,
+            'type': 'text',
+            'label': 'Field %d' % n,
+            'values': [{'value': 'Value %d of item %d' % (n, item_id)}],
+        } for n in range(fields)],
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    routes = [
+        ('POST', re.compile(r'^/oauth/token/?$'), 'token'),
+        ('GET', re.compile(r'^/item/(\d+)$'), 'item'),
+        ('POST', re.compile(r'^/item/app/(\d+)/filter/$'), 'filter'),
+        ('POST', re.compile(r'^/item/app/(\d+)/$'), 'create_item'),
+        ('PUT', re.compile(r'^/item/(\d+)$'), 'update_item'),
+        ('DELETE', re.compile(r'^/item/(\d+)$'), 'delete_item'),
+        ('GET', re.compile(r'^/app/(\d+)$'), 'app'),
+        ('GET', re.compile(r'^/org/(\d+)/space/$'), 'spaces'),
+        ('GET', re.compile(r'^/app/space/(\d+)/$'), 'apps'),
+        ('POST', re.compile(r'^/file/v2/$'), 'upload'),
+        ('GET', re.compile(r'^/file/(\d+)/raw$'), 'download'),
+    ]
+
+    def _respond(self):
+        length = int(self.headers.get('content-length') or 0)
+        body = self.rfile.read(length) if length else b''
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.should_fail():
+            return self._send(503, {'error': 'unavailable'})
+
+        path = self.path.split('?', 1)[0]
+        for method, pattern, name in self.routes:
+            match = pattern.match(path)
+            if method == self.command and match:
+                return getattr(self, 'do_' + name)(body, *match.groups())
+        self._send(200, {'item_id': 1, 'path': self.path})
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def _send(self, status, document=None, raw=None, headers=()):
+        if raw is None:
+            raw = json.dumps(document).encode("utf-8") if document is not None else b''
+        self.send_response(status)
+        if document is not None:
+            self.send_header('Content-Type', 'application/json')
+            if self.server.compress and 'gzip' in (self.headers.get('accept-encoding') or ''):
+                compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+                raw = compressor.compress(raw) + compressor.flush()
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(raw)))
+        self.send_header('X-Rate-Limit-Limit', str(self.server.rate_limit))
+        self.send_header('X-Rate-Limit-Remaining', str(self.server.rate_remaining()))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_token(self, body):
+        self._send(200, {'access_token': 'stub-access', 'refresh_token': 'stub-refresh',
+                         'expires_in': 28800, 'token_type': 'bearer'})
+
+    def do_item(self, body, item_id):
+        self._send(200, self.server.item(int(item_id)))
+
+    def do_filter(self, body, app_id):
+        attributes = json.loads(body.decode("utf-8") or '{}')
+        offset = attributes.get('offset', 0)
+        limit = min(attributes.get('limit', 30), 500)
+        total = self.server.items
+        self._send(200, {'filtered': total, 'total': total,
+                         'items': [self.server.item(n + 1)
+                                   for n in range(offset, min(offset + limit, total))]})
+
+    def do_create_item(self, body, app_id):
+        self._send(200, {'item_id': self.server.next_id(), 'title': 'New item'})
+
+    def do_update_item(self, body, item_id):
+        self._send(200, {'revision': 1})
+
+    def do_delete_item(self, body, item_id):
+        self._send(204)
+
+    def do_app(self, body, app_id):
+        self._send(200, {'app_id': int(app_id),
+                         'fields': [dict((k, v) for k, v in field.items() if k != 'values')
+                                    for field in self.server.item(1)['fields']]})
+
+    def do_spaces(self, body, org_id):
+        self._send(200, [{'space_id': int(org_id) * 100 + n, 'org_id': int(org_id)}
+                         for n in range(self.server.spaces)])
+
+    def do_apps(self, body, space_id):
+        self._send(200, [{'app_id': int(space_id) * 100 + n, 'space_id': int(space_id)}
+                         for n in range(self.server.apps)])
+
+    def do_upload(self, body, *args):
+        self._send(200, {'file_id': self.server.next_id(), 'size': len(body)})
+
+    def do_download(self, body, file_id):
+        data = self.server.file_data
+        match = re.match(r'bytes=(\d+)-', self.headers.get('range') or '')
+        if match is None:
+            return self._send(200, raw=data, headers=[('Content-Type', 'application/octet-stream')])
+        start = int(match.group(1))
+        if start >= len(data):
+            return self._send(416, {'error': 'range'})
+        self._send(206, raw=data[start:], headers=[
+            ('Content-Type', 'application/octet-stream'),
+            ('Content-Range', 'bytes %d-%d/%d' % (start, len(data) - 1, len(data)))])
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency=0.0, port=0, items=1000, fields=10, file_size=1 << 20,
+                 error_rate=0.0, rate_limit=1000000, seed=0, compress=False, spaces=2, apps=2):
+        HTTPServer.__init__(self, ('127.0.0.1', port), StubHandler)
+        self.latency = latency
+        self.items = items
+        self.fields = fields
+        self.file_data = b'x' * file_size
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.compress = compress
+        self.spaces = spaces
+        self.apps = apps
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._item_cache = {}
+
+    @property
+    def url(self):
+        return 'http://%s:%s' % self.server_address
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def rate_remaining(self):
+        with self._lock:
+            self._requests += 1
+            return max(self.rate_limit - self._requests, 0)
+
+    def next_id(self):
+        with self._lock:
+            return 100000 + self._random.randint(0, 1 << 30)
+
+    def item(self, item_id):
+        item = self._item_cache.get(item_id)
+        if item is None:
+            item = self._item_cache[item_id] = make_item(item_id, self.fields)
+        return item
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
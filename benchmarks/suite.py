@@ -0,0 +1,179 @@
+"""
+Throughput and p50/p99 latency of the main areas calls against the local
+Podio stub, end to end: serialization, the transport and real sockets.
+
+    python -m benchmarks.suite --requests 200 --latency 0.002
+
+Results can be saved with --output and compared with a previous run with
+--baseline; the exit status is 1 if any scenario got slower than the
+baseline by more than --tolerance, so the suite can gate CI.
+"""
+import argparse
+import io
+import json
+import sys
+import time
+
+from pypodio2 import api, transport
+from pypodio2.retry import RetryPolicy
+from benchmarks.stub_server import StubServer
+
+APP_ID = 1
+UPLOAD = b'u' * (256 << 10)
+
+
+def oauth(client, n):
+    transport.OAuthAuthorization('user', 'password', 'key', 'secret',
+                                 client.transport._api_url)
+
+
+def item_find(client, n):
+    client.Item.find(n + 1)
+
+
+def item_filter(client, n):
+    client.Item.filter(APP_ID, {'limit': 500, 'offset': 0})
+
+
+def item_iter_filter(client, n):
+    for _ in client.Item.iter_filter(APP_ID):
+        pass
+
+
+def item_create(client, n):
+    client.Item.create(APP_ID, {'fields': {'field-0': 'Value'}})
+
+
+def item_update(client, n):
+    client.Item.update(n + 1, {'fields': {'field-0': 'Value'}})
+
+
+def item_delete(client, n):
+    client.Item.delete(n + 1)
+
+
+def app_find(client, n):
+    client.Application.find(APP_ID)
+
+
+def file_upload(client, n):
+    client.Files.create('upload.bin', UPLOAD)
+
+
+def file_download(client, n):
+    client.Files.download(1, io.BytesIO())
+
+
+# (name, function, share of --requests it runs)
+SCENARIOS = (
+    ('oauth_token', oauth, 1.0),
+    ('item_find', item_find, 1.0),
+    ('item_filter_500', item_filter, 0.25),
+    ('item_iter_filter', item_iter_filter, 0.05),
+    ('item_create', item_create, 1.0),
+    ('item_update', item_update, 1.0),
+    ('item_delete', item_delete, 1.0),
+    ('app_find', app_find, 1.0),
+    ('file_upload', file_upload, 0.25),
+    ('file_download', file_download, 0.25),
+)
+
+
+def percentile(sorted_values, fraction):
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run(func, client, calls):
+    latencies = []
+    errors = 0
+    start = time.time()
+    for n in range(calls):
+        call_start = time.time()
+        try:
+            func(client, n)
+        except Exception:
+            errors += 1
+        latencies.append(time.time() - call_start)
+    elapsed = time.time() - start
+    latencies.sort()
+    return {
+        'calls': calls,
+        'errors': errors,
+        'throughput': calls / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Returns (name, metric, baseline, result) for every regression"""
+    found = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['throughput'] < before['throughput'] / (1 + tolerance):
+            found.append((name, 'throughput', before['throughput'], result['throughput']))
+        for metric in ('p50_ms', 'p99_ms'):
+            if result[metric] > before[metric] * (1 + tolerance):
+                found.append((name, metric, before[metric], result[metric]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200,
+                        help="calls per scenario, fewer for the heavy ones")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="artificial server latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="share of requests failing with 503, retried where allowed")
+    parser.add_argument('--items', type=int, default=2000, help="items in the stub app")
+    parser.add_argument('--compress', action='store_true',
+                        help="gzip JSON responses and request bodies over 1 KB")
+    parser.add_argument('--only', action='append', help="run only these scenarios")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON file of a previous run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown relative to the baseline, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency, items=args.items,
+                        error_rate=args.error_rate, compress=args.compress).start()
+    results = {}
+    try:
+        client = api.OAuthClient('key', 'secret', 'user', 'password', domain=server.url,
+                                 pool_size=1,
+                                 retry_policy=RetryPolicy(backoff_base=0.001, jitter=False),
+                                 compress_min_size=1024 if args.compress else None)
+        print("%-18s %7s %7s %10s %10s %10s" % ("scenario", "calls", "errors", "calls/s",
+                                                "p50 ms", "p99 ms"))
+        for name, func, share in SCENARIOS:
+            if args.only and name not in args.only:
+                continue
+            result = results[name] = run(func, client, max(int(args.requests * share), 1))
+            print("%-18s %7d %7d %10.1f %10.2f %10.2f" % (
+                name, result['calls'], result['errors'], result['throughput'],
+                result['p50_ms'], result['p99_ms']))
+        stats = client.transport.transfer_stats
+        print("response bytes: %d on the wire, %d decoded" % (stats.response_wire_bytes,
+                                                              stats.response_bytes))
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for name, metric, before, after in found:
+            print("REGRESSION %s %s: %.2f -> %.2f" % (name, metric, before, after))
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
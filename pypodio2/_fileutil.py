@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Atomic file writes for the caches, token store, watermarks and exports.
+
+Contents go to a temporary file in the target's directory, which replaces
+the target once complete, so readers see the old file or the new one,
+never half of one. The temporary file is removed when writing fails.
+"""
+import contextlib
+import os
+import tempfile
+
+_replace = getattr(os, "replace", os.rename)
+
+# Read once, since reading it means changing it for the whole process
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode=0o666):
+    """
+    Yields a binary file that replaces ``path`` when the block exits
+    without an exception. ``mode`` is masked by the umask, as with open().
+    Temporary file names end in ``.tmp``.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.chmod(tmp_path, mode & ~_umask)
+            yield f
+        _replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write(path, data, mode=0o666):
+    """Replaces the contents of ``path`` with the bytes ``data``"""
+    with atomic_open(path, mode) as f:
+        f.write(data)
@@ -0,0 +1,670 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio flavour of the Podio client.
+
+Areas work unchanged on top of AsyncHttpTransport: transport calls return
+coroutines, so ``await client.Item.find(item_id)`` behaves like its
+blocking counterpart. Methods that do more than one call or stream are
+overridden below: the iter_* methods return async iterators, bulk_* async
+iterators of bulk.BulkResult, incremental calls AsyncArrayStreams, and
+Files.download and Files.upload are coroutines. Requires Python 3.5+.
+"""
+import asyncio
+import collections
+import os
+import ssl
+
+from httplib2 import Response
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+from . import areas, models
+from .bulk import BulkResult
+from .client import Client
+from .jsonstream import ArrayParser
+from .transport import (HttpTransport, TransportException, _handle_response,
+                        headers_refresh_due, refresh_headers)
+
+
+class AsyncConnection(object):
+    """A single HTTP/1.1 keep-alive connection"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+
+    @classmethod
+    async def open(cls, host, port, ssl_context=None):
+        reader, writer = await asyncio.open_connection(host, port, ssl=ssl_context)
+        return cls(reader, writer)
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+    async def request(self, method, path, host, body, headers):
+        """
+        ``body`` is bytes, or an iterable of blocks such as a streamed
+        multipart body, sent with the Content-Length given in ``headers``
+        """
+        lines = ["%s %s HTTP/1.1" % (method, path), "Host: %s" % host]
+        length = None
+        for name, value in headers.items():
+            if name.lower() == 'content-length':
+                length = int(value)
+            elif name.lower() != 'host':
+                lines.append("%s: %s" % (name, value))
+        if isinstance(body, bytes):
+            length = len(body)
+        lines.append("Content-Length: %d" % length)
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        if isinstance(body, bytes):
+            self.writer.write(head + body)
+        else:
+            self.writer.write(head)
+            for block in body:
+                self.writer.write(block)
+                await self.writer.drain()
+        await self.writer.drain()
+        return await self._read_head(method)
+
+    async def _read_head(self, method):
+        """Reads the status and headers, returns them with an AsyncBody"""
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        version, status = status_line.decode("latin-1").split(None, 2)[:2]
+        info = {'status': status}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, value = line.decode("latin-1").split(":", 1)
+            name = name.strip().lower()
+            if name in info:
+                info[name] += ", " + value.strip()
+            else:
+                info[name] = value.strip()
+
+        if info.get('connection', '').lower() == 'close' or version == "HTTP/1.0":
+            self.reusable = False
+        if method == "HEAD" or status in ("204", "304"):
+            body = AsyncBody(self.reader, 0)
+        elif info.get('transfer-encoding', '').lower() == 'chunked':
+            body = AsyncBody(self.reader, chunked=True)
+        elif 'content-length' in info:
+            body = AsyncBody(self.reader, int(info['content-length']))
+        else:
+            # Delimited by the end of the connection
+            body = AsyncBody(self.reader)
+            self.reusable = False
+        return Response(info), body
+
+
+class AsyncBody(object):
+    """
+    The body of a response, read from ``reader`` as it arrives. ``length``
+    is its Content-Length, None if chunked or delimited by the end of the
+    connection. ``done`` is true once all of it was read.
+    """
+
+    def __init__(self, reader, length=None, chunked=False):
+        self._reader = reader
+        self._chunked = chunked
+        # Bytes left of the body, or of the current chunk
+        self._remaining = 0 if chunked else length
+        self.done = length == 0 and not chunked
+
+    async def read(self, size=None):
+        """Reads up to ``size`` bytes, or all that is left; b"" at the end"""
+        if self.done:
+            return b""
+        if self._chunked:
+            if size is None:
+                chunks = []
+                chunk = await self.read(65536)
+                while chunk:
+                    chunks.append(chunk)
+                    chunk = await self.read(65536)
+                return b"".join(chunks)
+            if not self._remaining:
+                self._remaining = int((await self._reader.readline()).split(b";")[0], 16)
+                if not self._remaining:
+                    # Skip trailers
+                    while (await self._reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    self.done = True
+                    return b""
+            data = await self._reader.readexactly(min(size, self._remaining))
+            self._remaining -= len(data)
+            if not self._remaining:
+                await self._reader.readexactly(2)
+            return data
+        if self._remaining is None:
+            data = await self._reader.read(-1 if size is None else size)
+            self.done = size is None or not data
+            return data
+        size = self._remaining if size is None else min(size, self._remaining)
+        data = await self._reader.readexactly(size)
+        self._remaining -= len(data)
+        self.done = not self._remaining
+        return data
+
+
+class AsyncStreamingResponse(object):
+    """
+    A response whose body has not been read yet, the counterpart of
+    transport.StreamingResponse: read it with ``await read(size)`` or
+    ``async for chunk in iter_chunks(size)``. Close it (or use it in an
+    ``async with`` block) when done, which returns a fully read connection
+    to its pool.
+    """
+
+    def __init__(self, response, body, release):
+        self.response = response
+        self.status = response.status
+        self._body = body
+        self._release = release
+
+    async def read(self, size=None):
+        return await self._body.read(size)
+
+    def iter_chunks(self, chunk_size=65536):
+        return _Chunks(self, chunk_size)
+
+    def close(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            release(self._body.done)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class _Chunks(object):
+    def __init__(self, stream, chunk_size):
+        self._stream = stream
+        self._chunk_size = chunk_size
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = await self._stream.read(self._chunk_size)
+        if not chunk:
+            raise StopAsyncIteration
+        return chunk
+
+
+class AsyncConnectionPool(object):
+    """
+    Keep-alive connections per host, with at most ``max_concurrency``
+    requests in flight at any time. A streamed response counts as in
+    flight until it is closed.
+    """
+
+    def __init__(self, max_concurrency=100, ssl_context=None):
+        self.max_concurrency = max_concurrency
+        self._ssl_context = ssl_context
+        self._idle = {}
+        self._semaphore = None
+
+    def _get_ssl_context(self):
+        if self._ssl_context is None:
+            # Matches the disabled certificate validation of HttpTransport
+            self._ssl_context = ssl.create_default_context()
+            self._ssl_context.check_hostname = False
+            self._ssl_context.verify_mode = ssl.CERT_NONE
+        return self._ssl_context
+
+    async def request(self, uri, method="GET", body=None, headers=None, stream=False):
+        """
+        Same signature as httplib2.Http.request, as a coroutine. With
+        ``stream`` the data returned is an AsyncStreamingResponse.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        parts = urlsplit(uri)
+        secure = parts.scheme == "https"
+        port = parts.port or (443 if secure else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        if body is None:
+            body = b""
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+
+        await self._semaphore.acquire()
+        try:
+            conn, response, response_body = await self._send(
+                key, parts.netloc, secure, method, path, body, headers or {})
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        def release(done):
+            if not done:
+                conn.close()
+            self._release(key, conn)
+
+        if stream:
+            return response, AsyncStreamingResponse(response, response_body, release)
+        try:
+            data = await response_body.read()
+        finally:
+            release(response_body.done)
+        return response, data
+
+    async def _send(self, key, host, secure, method, path, body, headers):
+        idle = self._idle.setdefault(key, [])
+        while True:
+            reused = bool(idle)
+            if reused:
+                conn = idle.pop()
+            else:
+                conn = await AsyncConnection.open(
+                    key[1], key[2], self._get_ssl_context() if secure else None)
+            try:
+                response, response_body = await conn.request(method, path, host, body,
+                                                             headers)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn.close()
+                if reused:
+                    # The server dropped an idle keep-alive connection
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            return conn, response, response_body
+
+    def _release(self, key, conn):
+        """Keeps a connection whose response was read for reuse, or closes it"""
+        if conn.reusable:
+            self._idle.setdefault(key, []).append(conn)
+        else:
+            conn.close()
+        self._semaphore.release()
+
+    async def close(self):
+        for connections in self._idle.values():
+            for conn in connections:
+                conn.close()
+        self._idle = {}
+
+
+class AsyncHttpTransport(HttpTransport):
+    """
+    HttpTransport whose calls return coroutines. The retry policy, the
+    rate limiter, the token refresh on 401 and streamed responses work as
+    on HttpTransport, waiting with asyncio.sleep; responses are not
+    cached. Streamed responses are AsyncStreamingResponses.
+    """
+
+    def __init__(self, url, headers_factory, max_concurrency=100, hooks=None,
+                 rate_limiter=None, retry_policy=None):
+        super(AsyncHttpTransport, self).__init__(url, headers_factory, hooks=hooks,
+                                                 rate_limiter=rate_limiter,
+                                                 retry_policy=retry_policy)
+        self._http = AsyncConnectionPool(max_concurrency)
+
+    def request(self, method, attribute_stack, kwargs):
+        return self._authorized(super(AsyncHttpTransport, self).request,
+                                method, attribute_stack, kwargs)
+
+    def call(self, endpoint, *args, **kwargs):
+        return self._authorized(super(AsyncHttpTransport, self).call, endpoint, *args, **kwargs)
+
+    async def _authorized(self, send, *args, **kwargs):
+        """
+        Awaits ``send``, renewing an expiring token first. Renewing it is a
+        blocking request, so it runs in the loop's default executor instead
+        of within the headers factory call of send.
+        """
+        if headers_refresh_due(self._headers_factory):
+            await asyncio.get_event_loop().run_in_executor(None, self._headers_factory)
+        return await send(*args, **kwargs)
+
+    async def _execute(self, method, url, body, headers, handler, options):
+        response, data = await self._fetch(url, method, body, headers, options)
+        if options.get('stream') and response.status >= 400:
+            # Read the error here, handlers can't await it
+            try:
+                error = await data.read()
+            finally:
+                data.close()
+            _handle_response(response, error)
+        return handler(response, data)
+
+    async def _fetch(self, url, method, body, headers, options):
+        response, data = await self._send_with_retries(url, method, body, headers, options)
+        if response.status == 401 and await asyncio.get_event_loop().run_in_executor(
+                None, refresh_headers, self._headers_factory, headers):
+            # The token was revoked or expired early, retry once with a new one
+            _discard(data)
+            headers.update(self._headers_factory())
+            response, data = await self._send_with_retries(url, method, body, headers, options)
+        return response, data
+
+    async def _send_with_retries(self, url, method, body, headers, options):
+        """See HttpTransport._send_with_retries"""
+        policy = options.get('retry', self.retry_policy)
+        stream = options.get('stream', False)
+        caller = options.get('caller')
+        if not policy or not policy.allows(method, options.get('idempotent', False)):
+            return await self._send(url, method, body, headers, stream, caller=caller)
+
+        attempt = 1
+        while True:
+            try:
+                response, data = await self._send(url, method, body, headers, stream, attempt,
+                                                  caller)
+            except Exception as e:
+                if not policy.should_retry(attempt, error=e):
+                    raise
+                delay = policy.delay(attempt, error=e)
+            else:
+                if not policy.should_retry(attempt, response=response):
+                    return response, data
+                _discard(data)
+                delay = policy.delay(attempt, response=response)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, url, method, body, headers, stream=False, attempt=1, caller=None):
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.try_acquire()
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self.rate_limiter.try_acquire()
+        info = self._before_request(method, url, body, headers, attempt, caller)
+        try:
+            if stream:
+                response, data = await self._http.request(url, method, body=body,
+                                                          headers=headers, stream=True)
+            else:
+                response, data = await self._http.request(url, method, body=body,
+                                                          headers=headers)
+        except Exception as e:
+            self._on_error(info, e)
+            raise
+        self._after_response(info, response, data)
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(response)
+        return response, data
+
+    async def close(self):
+        await self._http.close()
+
+
+def _discard(data):
+    """Releases the connection of an unwanted streamed response"""
+    if isinstance(data, AsyncStreamingResponse):
+        data.close()
+
+
+class AsyncArrayStream(object):
+    """
+    Async iterator over the elements of an array in a streamed response,
+    the counterpart of jsonstream.ArrayStream. Once exhausted, ``meta``
+    holds the rest of the document. The connection is released when the
+    iteration ends; call close() (or use an ``async with`` block) when
+    stopping early.
+    """
+
+    def __init__(self, stream, key=None, chunk_size=65536):
+        self.response = stream.response
+        self.meta = None
+        self._stream = stream
+        self._parser = ArrayParser(key)
+        self._chunk_size = chunk_size
+        self._elements = collections.deque()
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._elements:
+            if self._done:
+                raise StopAsyncIteration
+            try:
+                chunk = await self._stream.read(self._chunk_size)
+                if chunk:
+                    self._elements.extend(self._parser.feed(chunk))
+                else:
+                    self._done = True
+                    self.meta = self._parser.close()
+            except BaseException:
+                self.close()
+                raise
+            if self._done:
+                self.close()
+        return self._elements.popleft()
+
+    def close(self):
+        self._done = True
+        self._stream.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+def array_handler(key=None, chunk_size=65536):
+    """See jsonstream.array_handler, returns AsyncArrayStreams"""
+    def handler(response, stream):
+        return AsyncArrayStream(stream, key, chunk_size)
+    return handler
+
+
+def incremental_options(key=None):
+    """See areas.Area.incremental_options"""
+    return {'stream': True, 'handler': array_handler(key)}
+
+
+class AsyncItems(object):
+    """
+    Async iterator over the items of an offset/limit paginated endpoint,
+    see pagination.iter_items. ``fetch_page`` returns a coroutine; with
+    ``prefetch`` the next page is requested while the current one is
+    consumed.
+    """
+
+    def __init__(self, fetch_page, limit, offset=0, prefetch=False):
+        self._fetch_page = fetch_page
+        self._limit = limit
+        self._offset = offset
+        self._prefetch = prefetch
+        self._items = collections.deque()
+        self._next_page = None
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._items:
+            if self._done:
+                raise StopAsyncIteration
+            page = await (self._next_page or self._fetch_page(self._offset, self._limit))
+            self._next_page = None
+            items = page.get('items') or []
+            count = page.get('filtered', page.get('total'))
+            self._offset += len(items)
+            self._done = len(items) < self._limit or (count is not None and self._offset >= count)
+            if self._prefetch and not self._done:
+                self._next_page = asyncio.ensure_future(
+                    self._fetch_page(self._offset, self._limit))
+            self._items.extend(items)
+        return self._items.popleft()
+
+
+class AsyncBulk(object):
+    """
+    Async iterator running the coroutine function ``func`` on every element
+    of ``operations`` with at most ``workers`` in flight, see bulk.run.
+    Yields a bulk.BulkResult per element, in order of completion.
+    """
+
+    def __init__(self, func, operations, workers=8):
+        self._func = func
+        self._operations = enumerate(operations)
+        self._workers = workers
+        self._pending = set()
+        self._results = collections.deque()
+
+    async def _call(self, index, operation):
+        try:
+            return BulkResult(index, operation, True, result=await self._func(operation))
+        except Exception as e:
+            return BulkResult(index, operation, False, error=e)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._results:
+            while self._operations is not None and len(self._pending) < self._workers:
+                try:
+                    index, operation = next(self._operations)
+                except StopIteration:
+                    self._operations = None
+                    break
+                self._pending.add(asyncio.ensure_future(self._call(index, operation)))
+            if not self._pending:
+                raise StopAsyncIteration
+            done, self._pending = await asyncio.wait(self._pending,
+                                                     return_when=asyncio.FIRST_COMPLETED)
+            self._results.extend(task.result() for task in done)
+        return self._results.popleft()
+
+
+@areas.tag_callers
+class Item(areas.Item):
+    incremental_options = staticmethod(incremental_options)
+
+    def iter_filter(self, app_id, attributes=None, limit=500, prefetch=False, **kwargs):
+        """Async iterator over all items matching a filter, see areas.Item.iter_filter"""
+        attributes = dict(attributes or {})
+
+        def fetch_page(offset, page_limit):
+            page_attributes = dict(attributes, offset=offset, limit=page_limit)
+            return self.filter(app_id, page_attributes, **kwargs)
+
+        return AsyncItems(fetch_page, limit, offset=attributes.get('offset', 0),
+                          prefetch=prefetch)
+
+    def _bulk(self, func, operations, workers):
+        return AsyncBulk(func, operations, 8 if workers is None else workers)
+
+
+@areas.tag_callers
+class Application(areas.Application):
+    async def schema(self, app_id):
+        return models.AppSchema.from_app(await self.find(app_id))
+
+    def iter_items(self, app_id, limit=500, prefetch=False, **kwargs):
+        """Async iterator over all items of an app, see areas.Application.iter_items"""
+        start = kwargs.pop('offset', 0)
+
+        def fetch_page(offset, page_limit):
+            return self.get_items(app_id, offset=offset, limit=page_limit, **kwargs)
+
+        return AsyncItems(fetch_page, limit, offset=start, prefetch=prefetch)
+
+
+@areas.tag_callers
+class Stream(areas.Stream):
+    incremental_options = staticmethod(incremental_options)
+
+
+@areas.tag_callers
+class Files(areas.Files):
+    async def download(self, file_id, dest, resume=False, progress=None, chunk_size=65536):
+        """See areas.Files.download"""
+        if hasattr(dest, 'write'):
+            return await self._download_to(file_id, dest, dest.tell() if resume else 0,
+                                           progress, chunk_size)
+        offset = 0
+        if resume and os.path.exists(dest):
+            offset = os.path.getsize(dest)
+        with open(dest, 'ab' if offset else 'wb') as fileobj:
+            return await self._download_to(file_id, fileobj, offset, progress, chunk_size)
+
+    async def _download_to(self, file_id, fileobj, offset, progress, chunk_size):
+        headers = {'accept-encoding': 'identity'}
+        if offset:
+            headers['range'] = 'bytes=%d-' % offset
+        try:
+            stream = await self.transport.GET(url='/file/%d/raw' % file_id, stream=True,
+                                              headers=headers)
+        except TransportException as e:
+            if offset and e.status.status == 416:
+                # Nothing left to download
+                return offset
+            raise
+        async with stream:
+            if stream.status != 206 and offset:
+                # The range was ignored, the whole file is coming
+                fileobj.seek(fileobj.tell() - offset)
+                fileobj.truncate()
+                offset = 0
+            length = stream.response.get('content-length')
+            total = offset + int(length) if length is not None else None
+            written = offset
+            async for chunk in stream.iter_chunks(chunk_size):
+                fileobj.write(chunk)
+                written += len(chunk)
+                if progress:
+                    progress(written, total)
+        return written
+
+    async def upload(self, path, filename=None, cb=None):
+        """See areas.Files.upload, the file stays open until the upload is sent"""
+        if filename is None:
+            filename = os.path.basename(path)
+        with open(path, 'rb') as fileobj:
+            return await self.create(filename, fileobj, cb=cb)
+
+
+@areas.tag_callers
+class Space(areas.Space):
+    async def find_by_url(self, space_url, id_only=True):
+        resp = await super(Space, self).find_by_url(space_url, id_only=False)
+        if id_only:
+            return resp['space_id']
+        return resp
+
+
+class AsyncClient(Client):
+    """
+    Podio client on top of an AsyncHttpTransport. Can be used as an async
+    context manager to close its connections on exit.
+    """
+    _overrides = {'Application': Application, 'Files': Files, 'Item': Item,
+                  'Space': Space, 'Stream': Stream}
+
+    def __getattr__(self, name):
+        area = self._overrides.get(name) or getattr(areas, name)
+        return area(self.transport)
+
+    async def close(self):
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -10,22 +10,64 @@ def build_headers(authorization_headers, user_agent):
 
 
 def OAuthClient(api_key, api_secret, login, password, user_agent=None,
-                domain="https://api.podio.com"):
+                domain="https://api.podio.com", token_store=None, **transport_options):
     auth = transport.OAuthAuthorization(login, password,
-                                        api_key, api_secret, domain)
-    return AuthorizingClient(domain, auth, user_agent=user_agent)
+                                        api_key, api_secret, domain, token_store)
+    return AuthorizingClient(domain, auth, user_agent=user_agent, **transport_options)
 
 
 def OAuthAppClient(client_id, client_secret, app_id, app_token, user_agent=None,
-                   domain="https://api.podio.com"):
+                   domain="https://api.podio.com", token_store=None, **transport_options):
 
     auth = transport.OAuthAppAuthorization(app_id, app_token,
-                                           client_id, client_secret, domain)
+                                           client_id, client_secret, domain, token_store)
 
-    return AuthorizingClient(domain, auth, user_agent=user_agent)
+    return AuthorizingClient(domain, auth, user_agent=user_agent, **transport_options)
 
 
-def AuthorizingClient(domain, auth, user_agent=None):
-    """Creates a Podio client using an auth object."""
-    http_transport = transport.HttpTransport(domain, build_headers(auth, user_agent))
+def AuthorizingClient(domain, auth, user_agent=None, **transport_options):
+    """
+    Creates a Podio client using an auth object.
+
+    Extra keyword arguments are passed on to transport.HttpTransport, e.g.
+    ``pool_size=8`` to share the client between up to 8 threads.
+    """
+    http_transport = transport.HttpTransport(domain, build_headers(auth, user_agent),
+                                             **transport_options)
     return client.Client(http_transport)
+
+
+def AsyncOAuthClient(api_key, api_secret, login, password, user_agent=None,
+                     domain="https://api.podio.com", max_concurrency=100, token_store=None,
+                     **transport_options):
+    """
+    Creates an asyncio Podio client, see pypodio2.aio. The initial token
+    grant is a blocking call, every request after it is a coroutine.
+    """
+    auth = transport.OAuthAuthorization(login, password,
+                                        api_key, api_secret, domain, token_store)
+    return AsyncAuthorizingClient(domain, auth, user_agent=user_agent,
+                                  max_concurrency=max_concurrency, **transport_options)
+
+
+def AsyncOAuthAppClient(client_id, client_secret, app_id, app_token, user_agent=None,
+                        domain="https://api.podio.com", max_concurrency=100, token_store=None,
+                        **transport_options):
+    auth = transport.OAuthAppAuthorization(app_id, app_token,
+                                           client_id, client_secret, domain, token_store)
+    return AsyncAuthorizingClient(domain, auth, user_agent=user_agent,
+                                  max_concurrency=max_concurrency, **transport_options)
+
+
+def AsyncAuthorizingClient(domain, auth, user_agent=None, max_concurrency=100,
+                           **transport_options):
+    """
+    Creates an asyncio Podio client using an auth object. Extra keyword
+    arguments are passed on to aio.AsyncHttpTransport: hooks, rate_limiter
+    and retry_policy.
+    """
+    from . import aio
+    http_transport = aio.AsyncHttpTransport(domain, build_headers(auth, user_agent),
+                                            max_concurrency=max_concurrency,
+                                            **transport_options)
+    return aio.AsyncClient(http_transport)
@@ -1,5 +1,13 @@
 # -*- coding: utf-8 -*-
-import json
+import functools
+import inspect
+import mimetypes
+import os
+
+from . import bulk, endpoints, jsoncodec, jsonstream, models
+from .encode import MultipartParam
+from .pagination import iter_items
+from .transport import CallerTransport, TransportException
 
 try:
     from urllib.parse import urlencode
@@ -7,6 +15,30 @@ except ImportError:
     from urllib import urlencode
 
 
+def tag_callers(cls):
+    """
+    Class decorator making the requests of every public method of an area
+    carry 'Area.method' as their ``caller`` option, which hooks see as
+    RequestInfo.caller. Calls made by a method to other methods of its
+    area keep the outer caller.
+    """
+    for name, method in list(vars(cls).items()):
+        if not name.startswith('_') and inspect.isfunction(method):
+            setattr(cls, name, _tagged('%s.%s' % (cls.__name__, name), method))
+    return cls
+
+
+def _tagged(caller, method):
+    @functools.wraps(method)
+    def tagged(self, *args, **kwargs):
+        # Only hooks see the caller, don't pay for it without them
+        if getattr(self.transport, 'hooks', None) and \
+                not isinstance(self.transport, CallerTransport):
+            self = type(self)(CallerTransport(self.transport, caller))
+        return method(self, *args, **kwargs)
+    return tagged
+
+
 class Area(object):
     """Represents a Podio Area"""
     def __init__(self, transport):
@@ -41,7 +73,17 @@ class Area(object):
         else:
             return ''
 
+    @staticmethod
+    def incremental_options(key=None):
+        """
+        Request options to receive the array under ``key`` (or the
+        top-level array) as a jsonstream.ArrayStream, decoded element by
+        element as the response arrives instead of all at once.
+        """
+        return {'stream': True, 'handler': jsonstream.array_handler(key)}
+
 
+@tag_callers
 class Embed(Area):
 
     def __init__(self, *args, **kwargs):
@@ -50,10 +92,11 @@ class Embed(Area):
     def create(self, attributes):
         if type(attributes) != dict:
             return ApiErrorException('Must be of type dict')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/embed/', body=attributes, type='application/json')
 
 
+@tag_callers
 class Contact(Area):
 
     def __init__(self, *args, **kwargs):
@@ -62,10 +105,11 @@ class Contact(Area):
     def create(self, space_id, attributes):
         if type(attributes) != dict:
             return ApiErrorException('Must be of type dict')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/contact/space/%d/' % space_id, body=attributes, type='application/json')
 
 
+@tag_callers
 class Search(Area):
 
     def __init__(self, *args, **kwargs):
@@ -74,10 +118,11 @@ class Search(Area):
     def searchApp(self, app_id, attributes):
         if type(attributes) != dict:
             return ApiErrorException('Must be of type dict')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/search/app/%d/' % app_id, body=attributes, type='application/json')
 
 
+@tag_callers
 class Item(Area):
     def find(self, item_id, basic=False, **kwargs):
         """
@@ -90,21 +135,57 @@ class Item(Area):
         :rtype: dict
         """
         if basic:
-            return self.transport.GET(url='/item/%d/basic' % item_id)
-        return self.transport.GET(kwargs, url='/item/%d' % item_id)
+            return self.transport.call(endpoints.ITEM_FIND_BASIC, item_id, **kwargs)
+        return self.transport.call(endpoints.ITEM_FIND, item_id, **kwargs)
 
-    def filter(self, app_id, attributes, **kwargs):
+    def filter(self, app_id, attributes, incremental=False, **kwargs):
+        """
+        :param incremental: Return a jsonstream.ArrayStream that yields the
+                            items as they are received; its ``meta`` holds
+                            the rest of the page ('filtered', 'total')
+                            once exhausted
+        """
         if not isinstance(attributes, dict):
             raise TypeError('Must be of type dict')
-        attributes = json.dumps(attributes)
-        return self.transport.POST(url="/item/app/%d/filter/" % app_id, body=attributes,
-                                   type="application/json", **kwargs)
+        # Filtering only reads, so it is safe to retry despite being a POST
+        kwargs.setdefault('idempotent', True)
+        if incremental:
+            kwargs.update(self.incremental_options('items'))
+        return self.transport.call(endpoints.ITEM_FILTER, app_id, body=attributes, **kwargs)
+
+    def iter_filter(self, app_id, attributes=None, limit=500, prefetch=False, **kwargs):
+        """
+        Generator over all items matching a filter, fetched page by page so
+        memory use stays constant.
+
+        :param app_id: Application ID
+        :param attributes: Filter attributes as for filter(). 'offset' is
+                           where iteration starts, 'limit' is ignored.
+        :param limit: Page size, at most 500
+        :param prefetch: Fetch the next page in a background thread while
+                         the current one is consumed
+        :return: Generator of item dicts
+        """
+        attributes = dict(attributes or {})
+
+        def fetch_page(offset, page_limit):
+            page_attributes = dict(attributes, offset=offset, limit=page_limit)
+            return self.filter(app_id, page_attributes, **kwargs)
+
+        return iter_items(fetch_page, limit, offset=attributes.get('offset', 0),
+                          prefetch=prefetch)
 
     def filter_by_view(self, app_id, view_id):
-        return self.transport.POST(url="/item/app/{}/filter/{}".format(app_id, view_id))
+        return self.transport.POST(url="/item/app/{}/filter/{}".format(app_id, view_id),
+                                   idempotent=True)
 
-    def find_all_by_external_id(self, app_id, external_id):
-        return self.transport.GET(url='/item/app/%d/v2/?external_id=%r' % (app_id, external_id))
+    def find_all_by_external_id(self, app_id, external_id, **kwargs):
+        """
+        Returns the items of an app with an external ID. To look up many
+        external IDs, see resolver.ExternalIdResolver.
+        """
+        return self.transport.GET(url='/item/app/%d/v2/?%s' % (
+            app_id, urlencode({'external_id': external_id})), **kwargs)
 
     def revisions(self, item_id):
         return self.transport.GET(url='/item/%d/revision/' % item_id)
@@ -122,12 +203,8 @@ class Item(Area):
     def create(self, app_id, attributes, silent=False, hook=True):
         if not isinstance(attributes, dict):
             raise TypeError('Must be of type dict')
-        attributes = json.dumps(attributes)
-        return self.transport.POST(body=attributes,
-                                   type='application/json',
-                                   url='/item/app/%d/%s' % (app_id,
-                                                            self.get_options(silent=silent,
-                                                                             hook=hook)))
+        return self.transport.call(endpoints.ITEM_CREATE, app_id, body=attributes,
+                                   silent=silent, hook=hook)
 
     def update(self, item_id, attributes, silent=False, hook=True):
         """
@@ -138,19 +215,50 @@ class Item(Area):
         """
         if not isinstance(attributes, dict):
             raise TypeError('Must be of type dict')
-        attributes = json.dumps(attributes)
-        return self.transport.PUT(body=attributes,
-                                  type='application/json',
-                                  url='/item/%d%s' % (item_id, self.get_options(silent=silent,
-                                                                                hook=hook)))
+        return self.transport.call(endpoints.ITEM_UPDATE, item_id, body=attributes,
+                                   silent=silent, hook=hook)
 
     def delete(self, item_id, silent=False, hook=True):
-        return self.transport.DELETE(url='/item/%d%s' % (item_id,
-                                                         self.get_options(silent=silent,
-                                                                          hook=hook)),
-                                     handler=lambda x, y: None)
-
-
+        return self.transport.call(endpoints.ITEM_DELETE, item_id, silent=silent, hook=hook,
+                                   handler=lambda x, y: None)
+
+    def bulk_upsert(self, app_id, items, workers=None, silent=False, hook=True):
+        """
+        Creates or updates many items concurrently. Items with an 'item_id'
+        are updated, all others are created in the app.
+
+        :param app_id: Application ID for new items
+        :param items: Iterable of item attribute dicts, consumed lazily
+        :param workers: Number of requests in flight, by default 8 on a
+                        pooled client (``pool_size``) and 1 on others, which
+                        can't run more. A rate limiter on the client paces
+                        all of them.
+        :param silent: See Area.get_options
+        :param hook: See Area.get_options
+        :return: Generator of bulk.BulkResult, in order of completion. A
+                 failed item does not abort the others.
+        """
+        def upsert(attributes):
+            attributes = dict(attributes)
+            item_id = attributes.pop('item_id', None)
+            if item_id is None:
+                return self.create(app_id, attributes, silent=silent, hook=hook)
+            return self.update(item_id, attributes, silent=silent, hook=hook)
+
+        return self._bulk(upsert, items, workers)
+
+    def bulk_delete(self, item_ids, workers=None, silent=False, hook=True):
+        """Deletes many items concurrently, see bulk_upsert"""
+        return self._bulk(lambda item_id: self.delete(item_id, silent=silent, hook=hook),
+                          item_ids, workers)
+
+    def _bulk(self, func, operations, workers):
+        workers = bulk.default_workers(self.transport, workers)
+        bulk.check_workers(self.transport, workers)
+        return bulk.run(func, operations, workers)
+
+
+@tag_callers
 class Application(Area):
     def activate(self, app_id):
         """
@@ -166,7 +274,7 @@ class Application(Area):
     def create(self, attributes):
         if not isinstance(attributes, dict):
             raise TypeError('Must be of type dict')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/app/', body=attributes, type='application/json')
 
     def add_field(self, app_id, attributes):
@@ -182,7 +290,7 @@ class Application(Area):
         """
         if not isinstance(attributes, dict):
             raise TypeError('Must be of type dict')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/app/%s/field/' % app_id, body=attributes,
                                    type='application/json')
 
@@ -215,7 +323,7 @@ class Application(Area):
         :return: Python dict of JSON response
         :rtype: dict
         """
-        return self.transport.GET(url='/app/%s' % app_id)
+        return self.transport.call(endpoints.APP_FIND, app_id)
 
     def dependencies(self, app_id):
         """
@@ -228,8 +336,27 @@ class Application(Area):
         """
         return self.transport.GET(url='/app/%s/dependencies/' % app_id)
 
+    def schema(self, app_id):
+        """
+        Returns the models.AppSchema of an app, for compact models.Item
+        objects with constant time field lookups.
+        """
+        return models.AppSchema.from_app(self.find(app_id))
+
     def get_items(self, app_id, **kwargs):
-        return self.transport.GET(url='/item/app/%s/' % app_id, **kwargs)
+        return self.transport.call(endpoints.APP_ITEMS, app_id, **kwargs)
+
+    def iter_items(self, app_id, limit=500, prefetch=False, **kwargs):
+        """
+        Generator over all items of an app, see get_items and
+        Item.iter_filter.
+        """
+        start = kwargs.pop('offset', 0)
+
+        def fetch_page(offset, page_limit):
+            return self.get_items(app_id, offset=offset, limit=page_limit, **kwargs)
+
+        return iter_items(fetch_page, limit, offset=start, prefetch=prefetch)
 
     def list_in_space(self, space_id):
         """
@@ -241,6 +368,7 @@ class Application(Area):
         return self.transport.GET(url='/app/space/%s/' % space_id)
 
 
+@tag_callers
 class Task(Area):
     def get(self, **kwargs):
         """
@@ -275,7 +403,7 @@ class Task(Area):
         """
         # if not isinstance(attributes, dict):
         #    raise TypeError('Must be of type dict')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/task/%s' % self.get_options(silent=silent, hook=hook),
                                    body=attributes,
                                    type='application/json')
@@ -288,7 +416,7 @@ class Task(Area):
         """
         # if not isinstance(attributes, dict):
         #    raise TypeError('Must be of type dict')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(body=attributes,
                                    type='application/json',
                                    url='/task/%s/%s/%s' % (ref_type, ref_id,
@@ -296,26 +424,30 @@ class Task(Area):
                                                                             hook=hook)))
 
 
+@tag_callers
 class User(Area):
     def current(self):
         return self.transport.get(url='/user/')
 
 
+@tag_callers
 class Org(Area):
     def get_all(self):
         return self.transport.get(url='/org/')
 
 
+@tag_callers
 class Status(Area):
     def find(self, status_id):
         return self.transport.GET(url='/status/%s' % status_id)
 
     def create(self, space_id, attributes):
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/status/space/%s/' % space_id,
                                    body=attributes, type='application/json')
 
 
+@tag_callers
 class Space(Area):
     def find(self, space_id):
         return self.transport.GET(url='/space/%s' % space_id)
@@ -356,10 +488,11 @@ class Space(Area):
         """
         if not isinstance(attributes, dict):
             raise TypeError('Dictionary of values expected')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/space/', body=attributes, type='application/json')
 
 
+@tag_callers
 class Stream(Area):
     """
     The stream API will supply the different streams. Currently
@@ -367,17 +500,26 @@ class Stream(Area):
     space stream.
 
     For details, see: https://developers.podio.com/doc/stream/
+
+    With ``incremental=True`` the find_all methods return a
+    jsonstream.ArrayStream that yields the stream objects as they are
+    received.
     """
-    def find_all_by_app_id(self, app_id):
+    def _get_stream(self, url, incremental):
+        if incremental:
+            return self.transport.GET(url=url, **self.incremental_options())
+        return self.transport.GET(url=url)
+
+    def find_all_by_app_id(self, app_id, incremental=False):
         """
         Returns the stream for the given app. This includes items from
         the app and tasks on the app.
 
         For details, see: https://developers.podio.com/doc/stream/get-app-stream-264673
         """
-        return self.transport.GET(url='/stream/app/%s/' % app_id)
+        return self._get_stream('/stream/app/%s/' % app_id, incremental)
 
-    def find_all(self):
+    def find_all(self, incremental=False):
         """
         Returns the global stream. The types of objects in the stream
         can be either "item", "status", "task", "action" or
@@ -386,31 +528,31 @@ class Stream(Area):
 
         https://developers.podio.com/doc/stream/get-global-stream-80012
         """
-        return self.transport.GET(url='/stream/')
+        return self._get_stream('/stream/', incremental)
 
-    def find_all_by_org_id(self, org_id):
+    def find_all_by_org_id(self, org_id, incremental=False):
         """
         Returns the activity stream for the given organization.
 
         For details, see: https://developers.podio.com/doc/stream/get-organization-stream-80038
         """
-        return self.transport.GET(url='/stream/org/%s/' % org_id)
+        return self._get_stream('/stream/org/%s/' % org_id, incremental)
 
-    def find_all_personal(self):
+    def find_all_personal(self, incremental=False):
         """
         Returns the personal stream from personal spaces and sub-orgs.
 
         For details, see: https://developers.podio.com/doc/stream/get-personal-stream-1656647
         """
-        return self.transport.GET(url='/stream/personal/')
+        return self._get_stream('/stream/personal/', incremental)
 
-    def find_all_by_space_id(self, space_id):
+    def find_all_by_space_id(self, space_id, incremental=False):
         """
         Returns the activity stream for the space.
 
         For details, see: https://developers.podio.com/doc/stream/get-space-stream-80039
         """
-        return self.transport.GET(url='/stream/space/%s/' % space_id)
+        return self._get_stream('/stream/space/%s/' % space_id, incremental)
 
     def find_by_ref(self, ref_type, ref_id):
         """
@@ -424,9 +566,10 @@ class Stream(Area):
         return self.transport.GET(url='/stream/%s/%s' % (ref_type, ref_id))
 
 
+@tag_callers
 class Hook(Area):
     def create(self, hookable_type, hookable_id, attributes):
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/hook/%s/%s/' % (hookable_type, hookable_id),
                                    body=attributes, type='application/json')
 
@@ -443,9 +586,10 @@ class Hook(Area):
         return self.transport.GET(url='/hook/%s/%s/' % (hookable_type, hookable_id))
 
 
+@tag_callers
 class Connection(Area):
     def create(self, attributes):
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/connection/', body=attributes, type='application/json')
 
     def find(self, conn_id):
@@ -458,6 +602,7 @@ class Connection(Area):
         return self.transport.POST(url='/connection/%s/load' % conn_id)
 
 
+@tag_callers
 class Notification(Area):
     def find(self, notification_id):
         return self.transport.GET(url='/notification/%s' % notification_id)
@@ -481,6 +626,7 @@ class Notification(Area):
         return self.transport.DELETE(url='/notification/%s/star' % notification_id)
 
 
+@tag_callers
 class Conversation(Area):
     def find_all(self):
         return self.transport.GET(url='/conversation/')
@@ -489,7 +635,7 @@ class Conversation(Area):
         return self.transport.GET(url='/conversation/%s' % conversation_id)
 
     def create(self, attributes):
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/conversation/', body=attributes, type='application/json')
 
     def star(self, conversation_id):
@@ -502,6 +648,7 @@ class Conversation(Area):
         return self.transport.POST(url='/conversation/%s/leave' % conversation_id)
 
 
+@tag_callers
 class Files(Area):
     def find(self, file_id):
         pass
@@ -511,19 +658,102 @@ class Files(Area):
         raw_handler = lambda resp, data: data
         return self.transport.GET(url='/file/%d/raw' % file_id, handler=raw_handler)
 
+    def download(self, file_id, dest, resume=False, progress=None, chunk_size=65536):
+        """
+        Streams a file to ``dest`` in chunks of ``chunk_size`` bytes, so
+        memory use does not depend on the size of the file.
+
+        :param file_id: File ID
+        :param dest: Path to write to, or a file object opened for writing in
+                     binary mode
+        :param resume: If true, only the part of the file that is not in
+                       ``dest`` yet is requested: everything after the end of
+                       an existing file at the path, or after the current
+                       position of a file object.
+        :param progress: Callable called with (bytes_written, total_bytes)
+                         after every chunk. total_bytes is None if unknown.
+        :return: Size of the downloaded file in bytes
+        :rtype: int
+        """
+        if hasattr(dest, 'write'):
+            return self._download_to(file_id, dest, dest.tell() if resume else 0,
+                                     progress, chunk_size)
+        offset = 0
+        if resume and os.path.exists(dest):
+            offset = os.path.getsize(dest)
+        with open(dest, 'ab' if offset else 'wb') as fileobj:
+            return self._download_to(file_id, fileobj, offset, progress, chunk_size)
+
+    def _download_to(self, file_id, fileobj, offset, progress, chunk_size):
+        # Ranges and progress totals refer to the file itself, not to a
+        # compressed representation of it
+        headers = {'accept-encoding': 'identity'}
+        if offset:
+            headers['range'] = 'bytes=%d-' % offset
+        try:
+            stream = self.transport.GET(url='/file/%d/raw' % file_id, stream=True,
+                                        headers=headers)
+        except TransportException as e:
+            if offset and e.status.status == 416:
+                # Nothing left to download
+                return offset
+            raise
+        with stream:
+            if stream.status != 206 and offset:
+                # The range was ignored, the whole file is coming
+                fileobj.seek(fileobj.tell() - offset)
+                fileobj.truncate()
+                offset = 0
+            length = stream.response.get('content-length')
+            total = offset + int(length) if length is not None else None
+            written = offset
+            for chunk in stream.iter_chunks(chunk_size):
+                fileobj.write(chunk)
+                written += len(chunk)
+                if progress:
+                    progress(written, total)
+        return written
+
     def attach(self, file_id, ref_type, ref_id):
         attributes = {
             'ref_type': ref_type,
             'ref_id': ref_id
         }
-        return self.transport.POST(url='/file/%s/attach' % file_id, body=json.dumps(attributes),
+        return self.transport.POST(url='/file/%s/attach' % file_id, body=jsoncodec.dumps(attributes),
                                    type='application/json')
 
-    def create(self, filename, filedata):
-        """Create a file from raw data"""
+    def create(self, filename, filedata, cb=None):
+        """
+        Create a file from raw data or a file object. The upload is streamed,
+        so file objects are never read into memory as a whole.
+
+        :param filename: Name of the file in Podio
+        :param filedata: File contents, or a file object opened in binary mode
+        :param cb: Progress callback, called with (param, bytes_sent, total)
+                   as the upload is sent
+        :return: Details of the new file
+        :rtype: dict
+        """
+        if hasattr(filedata, 'read'):
+            filedata = MultipartParam('source', filename=filename, fileobj=filedata,
+                                      filetype=mimetypes.guess_type(filename)[0])
         attributes = {'filename': filename,
                       'source': filedata}
-        return self.transport.POST(url='/file/v2/', body=attributes, type='multipart/form-data')
+        return self.transport.POST(url='/file/v2/', body=attributes, type='multipart/form-data',
+                                   cb=cb)
+
+    def upload(self, path, filename=None, cb=None):
+        """
+        Create a file from a local path, see create.
+
+        :param path: Path of the file to upload
+        :param filename: Name of the file in Podio, defaults to the name of
+                         the local file
+        """
+        if filename is None:
+            filename = os.path.basename(path)
+        with open(path, 'rb') as fileobj:
+            return self.create(filename, fileobj, cb=cb)
 
     def copy(self, file_id):
         """Copy a file to generate a new file_id"""
@@ -531,6 +761,7 @@ class Files(Area):
         return self.transport.POST(url='/file/%s/copy' % file_id)
 
 
+@tag_callers
 class View(Area):
 
     def create(self, app_id, attributes):
@@ -542,7 +773,7 @@ class View(Area):
         """
         if not isinstance(attributes, dict):
             raise TypeError('Must be of type dict')
-        attributes = json.dumps(attributes)
+        attributes = jsoncodec.dumps(attributes)
         return self.transport.POST(url='/view/app/{}/'.format(app_id),
                                    body=attributes, type='application/json')
 
@@ -595,7 +826,7 @@ class View(Area):
         """
         if not isinstance(attributes, dict):
             raise TypeError('Must be of type dict')
-        attribute_data = json.dumps(attributes)
+        attribute_data = jsoncodec.dumps(attributes)
         return self.transport.PUT(url='/view/app/{}/last'.format(app_id),
                                   body=attribute_data, type='application/json')
 
@@ -609,7 +840,7 @@ class View(Area):
         """
         if not isinstance(attributes, dict):
             raise TypeError('Must be of type dict')
-        attribute_data = json.dumps(attributes)
+        attribute_data = jsoncodec.dumps(attributes)
         return self.transport.PUT(url='/view/{}'.format(view_id),
                                   body=attribute_data, type='application/json')
 
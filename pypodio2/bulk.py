@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Runs many independent API calls through a bounded pool of threads.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class BulkResult(object):
+    """
+    Outcome of one operation of a bulk run.
+
+    ``index`` is the position of the operation in the input, ``operation``
+    the input itself. ``ok`` tells whether it succeeded; if so ``result``
+    holds the decoded response, otherwise ``error`` holds the exception.
+    """
+    __slots__ = ('index', 'operation', 'ok', 'result', 'error')
+
+    def __init__(self, index, operation, ok, result=None, error=None):
+        self.index = index
+        self.operation = operation
+        self.ok = ok
+        self.result = result
+        self.error = error
+
+    def __repr__(self):
+        if self.ok:
+            return 'BulkResult(%d, ok)' % self.index
+        return 'BulkResult(%d, %r)' % (self.index, self.error)
+
+
+def _call(func, index, operation):
+    try:
+        return BulkResult(index, operation, True, result=func(operation))
+    except Exception as e:
+        return BulkResult(index, operation, False, error=e)
+
+
+def check_workers(transport, workers):
+    """
+    Raises ValueError if ``workers`` threads can't share ``transport``,
+    i.e. it is not backed by a connection pool.
+    """
+    if workers > 1 and not getattr(transport, 'thread_safe', False):
+        raise ValueError("Concurrent operations need a pooled client (pool_size)")
+
+
+def default_workers(transport, workers=None, pooled=8):
+    """
+    Returns ``workers`` if given, otherwise ``pooled`` if ``transport`` can
+    be shared between threads and 1 if it can't.
+    """
+    if workers is not None:
+        return workers
+    return pooled if getattr(transport, 'thread_safe', False) else 1
+
+
+def run(func, operations, workers=8):
+    """
+    Calls ``func`` on every element of ``operations`` using ``workers``
+    threads and yields a BulkResult per element, in order of completion.
+    A failed call doesn't stop the others.
+
+    ``operations`` is consumed lazily, keeping at most two operations per
+    worker in flight, so arbitrarily long iterables run in constant memory.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for index, operation in enumerate(operations):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(_call, func, index, operation))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
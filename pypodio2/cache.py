@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in response cache for HttpTransport.
+
+GET responses are cached per method, URL and authorization, for a time
+that depends on the area of the URL. Once that has passed, the cached
+response is revalidated with If-None-Match/If-Modified-Since, so an
+unchanged resource costs a 304 instead of its full payload.
+"""
+import collections
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from httplib2 import Response
+
+from ._fileutil import atomic_open
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+# Seconds a response is used without revalidation, by path prefix. The
+# longest matching prefix wins; unlisted paths are always revalidated.
+DEFAULT_TTLS = {
+    '/app/': 300,
+    '/space/': 300,
+    '/view/': 300,
+    '/org/': 300,
+}
+
+# Paths of file downloads, which are never cached
+_raw_file = re.compile(r'^/file/\d+/raw')
+
+# Headers prepare() adds to revalidate a stale entry
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+class CacheEntry(object):
+    """A cached response: its headers, body and the time it goes stale"""
+
+    def __init__(self, headers, content, expires_at):
+        self.headers = headers
+        self.content = content
+        self.expires_at = expires_at
+
+    def is_fresh(self):
+        return time.time() < self.expires_at
+
+    def to_response(self):
+        response = Response(dict(self.headers, status='200'))
+        response.fromcache = True
+        return response, self.content
+
+
+class MemoryCache(object):
+    """Thread-safe in-memory LRU backend holding up to ``max_entries``"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileCache(object):
+    """
+    On-disk backend keeping one file per entry in ``directory``, at most
+    about ``max_entries``: every ``prune_interval`` writes, the least
+    recently used files beyond that are removed.
+    """
+    prune_interval = 100
+
+    def __init__(self, directory, max_entries=10000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                meta = json.loads(f.readline().decode("utf-8"))
+                entry = CacheEntry(meta['headers'], f.read(), meta['expires_at'])
+            # The modification time orders entries for pruning
+            os.utime(self._path(key), None)
+            return entry
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key, entry):
+        meta = json.dumps({'headers': entry.headers, 'expires_at': entry.expires_at})
+        with atomic_open(self._path(key), 0o600) as f:
+            f.write(meta.encode("utf-8") + b"\n")
+            f.write(entry.content)
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_interval == 0
+        if prune:
+            self.prune()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def prune(self):
+        """Removes the least recently used entries beyond ``max_entries``"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            try:
+                entries.append((os.path.getmtime(self._path(name)), name))
+            except OSError:
+                pass
+        entries.sort(reverse=True)
+        for _, name in entries[self.max_entries:]:
+            self.delete(name)
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            os.remove(self._path(name))
+
+
+class ResponseCache(object):
+    """
+    Caches GET responses for HttpTransport(cache=...).
+
+    :param backend: Where entries are kept, a MemoryCache by default. Any
+                    object with get/set/delete works.
+    :param ttls: Seconds responses stay fresh by path prefix, see
+                 DEFAULT_TTLS
+    :param default_ttl: Freshness of paths not in ``ttls``. With 0 cached
+                        responses are still used, but revalidated first.
+    :param max_entry_size: Larger responses are not cached. Raw file
+                           downloads (``/file/{id}/raw``) never are.
+
+    Successful PUT, POST and DELETE requests drop the cached GETs of their
+    path, whatever their query string or identity; the backend keeps an
+    index of them per path. Other methods, e.g. HEAD, bypass the cache.
+    ``hits``, ``revalidated`` and ``misses`` count lookups.
+    """
+    cached_headers = ('content-type', 'etag', 'last-modified')
+    # Methods that change the resource at their path
+    writes = ('POST', 'PUT', 'DELETE')
+
+    def __init__(self, backend=None, ttls=None, default_ttl=0, max_entry_size=256 << 10):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_entry_size = max_entry_size
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def ttl(self, url):
+        path = urlsplit(url).path
+        prefixes = [prefix for prefix in self.ttls if path.startswith(prefix)]
+        if not prefixes:
+            return self.default_ttl
+        return self.ttls[max(prefixes, key=len)]
+
+    @staticmethod
+    def key(method, url, headers, identity=None):
+        """
+        Entries are per ``identity``, the user or app requests are made as
+        (see transport.headers_identity), or else per authorization header.
+        """
+        if identity is None:
+            identity = headers.get('authorization', '')
+        return hashlib.sha256(("%s %s %s" % (method, url, identity)).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def path_key(url):
+        """Key of the index of the entries cached for the path of ``url``"""
+        return hashlib.sha256(("PATH %s" % url.split('?', 1)[0]).encode("utf-8")).hexdigest()
+
+    def prepare(self, method, url, headers, identity=None):
+        """
+        Looks up a request before it is sent. Returns (key, cached) where
+        cached is a fresh (response, data) to use instead of sending the
+        request, or None. If a stale entry exists, conditional headers for
+        it are added to ``headers``.
+        """
+        if method in self.writes:
+            return self.path_key(url), None
+        if method != 'GET':
+            return None, None
+        key = self.key('GET', url, headers, identity)
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            return key, None
+        if entry.is_fresh():
+            self.hits += 1
+            return key, entry.to_response()
+        if 'etag' in entry.headers:
+            headers[CONDITIONAL_HEADERS[0]] = entry.headers['etag']
+        if 'last-modified' in entry.headers:
+            headers[CONDITIONAL_HEADERS[1]] = entry.headers['last-modified']
+        return key, None
+
+    def update(self, key, method, url, response, data):
+        """
+        Records the response to a request prepared with prepare(). Returns
+        the (response, data) to hand to the caller, which is the cached
+        response if the server answered 304 Not Modified.
+
+        Returns None for a 304 whose entry is gone since prepare(), e.g.
+        evicted by another thread: the request has to be sent again
+        without the CONDITIONAL_HEADERS to get the full response.
+        """
+        if response is None:
+            return response, data
+        if method != 'GET':
+            if response.status < 400:
+                self.invalidate(url)
+            return response, data
+        expires_at = time.time() + self.ttl(url)
+        if response.status == 304:
+            entry = self.backend.get(key)
+            if entry is not None:
+                self.revalidated += 1
+                entry.expires_at = expires_at
+                self.backend.set(key, entry)
+                return entry.to_response()
+            return None
+        elif response.status == 200 and isinstance(data, bytes) and \
+                len(data) <= self.max_entry_size and not _raw_file.match(urlsplit(url).path):
+            headers = dict((name, response[name]) for name in self.cached_headers
+                           if name in response)
+            if expires_at > time.time() or 'etag' in headers or 'last-modified' in headers:
+                self.backend.set(key, CacheEntry(headers, data, expires_at))
+                self._add_to_index(url, key)
+        return response, data
+
+    def invalidate(self, url):
+        """Drops the cached GETs of the path of ``url``, with any query string"""
+        path_key = self.path_key(url)
+        with self._lock:
+            for key in self._index(path_key):
+                self.backend.delete(key)
+            self.backend.delete(path_key)
+
+    def _index(self, path_key):
+        entry = self.backend.get(path_key)
+        return json.loads(entry.content.decode("utf-8")) if entry is not None else []
+
+    def _add_to_index(self, url, key):
+        path_key = self.path_key(url)
+        with self._lock:
+            keys = self._index(path_key)
+            if key not in keys:
+                keys.append(key)
+                self.backend.set(path_key, CacheEntry({}, json.dumps(keys).encode("utf-8"), 0))
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Compression of request and response bodies.
+
+Responses are requested with ``Accept-Encoding: gzip, deflate``; buffered
+ones are decoded by httplib2, streamed ones by a Decoder as they are read.
+Request bodies can be gzipped too, see HttpTransport(compress_min_size=).
+TransferStats counts the bytes on the wire and after decoding.
+"""
+import threading
+import zlib
+
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+def gzip_compress(data, level=6):
+    """Returns ``data`` compressed in the gzip format"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class Decoder(object):
+    """
+    Incremental decoder of a gzip or deflate encoded body. Servers differ
+    on whether "deflate" means zlib-wrapped or raw deflate data; both are
+    accepted.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        wbits = 16 + zlib.MAX_WBITS if encoding in ('gzip', 'x-gzip') else zlib.MAX_WBITS
+        self._decompressor = zlib.decompressobj(wbits)
+        self._started = False
+
+    @property
+    def unconsumed_tail(self):
+        """Input not decoded yet because of ``max_length``"""
+        return self._decompressor.unconsumed_tail
+
+    def decode(self, data, max_length=0):
+        """Decodes the next piece of the body, at most ``max_length`` bytes"""
+        try:
+            decoded = self._decompressor.decompress(data, max_length)
+        except zlib.error:
+            if self._started or self.encoding != 'deflate':
+                raise
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            decoded = self._decompressor.decompress(data, max_length)
+        self._started = True
+        return decoded
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+def decoder_for(encoding):
+    """Returns a Decoder for a Content-Encoding, or None if not encoded"""
+    encoding = (encoding or '').strip().lower()
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        return Decoder(encoding)
+    return None
+
+
+class TransferStats(object):
+    """
+    Counts body bytes as sent or received on the wire and before encoding
+    or after decoding, and how many bodies were compressed. The numbers
+    cover all responses, compressed or not, so ``saved`` is what
+    compression spared the network.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.responses = 0
+            self.compressed_responses = 0
+            self.response_wire_bytes = 0
+            self.response_bytes = 0
+            self.requests = 0
+            self.compressed_requests = 0
+            self.request_wire_bytes = 0
+            self.request_bytes = 0
+
+    def record_response(self, wire_bytes, decoded_bytes, compressed):
+        with self._lock:
+            self.responses += 1
+            self.compressed_responses += bool(compressed)
+            self.response_wire_bytes += wire_bytes
+            self.response_bytes += decoded_bytes
+
+    def record_request(self, wire_bytes, raw_bytes, compressed):
+        with self._lock:
+            self.requests += 1
+            self.compressed_requests += bool(compressed)
+            self.request_wire_bytes += wire_bytes
+            self.request_bytes += raw_bytes
+
+    @property
+    def saved(self):
+        """Bytes not transferred thanks to compression"""
+        return (self.response_bytes - self.response_wire_bytes +
+                self.request_bytes - self.request_wire_bytes)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'responses': self.responses,
+                'compressed_responses': self.compressed_responses,
+                'response_wire_bytes': self.response_wire_bytes,
+                'response_bytes': self.response_bytes,
+                'requests': self.requests,
+                'compressed_requests': self.compressed_requests,
+                'request_wire_bytes': self.request_wire_bytes,
+                'request_bytes': self.request_bytes,
+            }
@@ -3,14 +3,20 @@
 This module provides functions that faciliate encoding name/value pairs
 as multipart/form-data suitable for a HTTP POST or PUT request.
 
-multipart/form-data is the standard way to upload files over HTTP"""
+multipart/form-data is the standard way to upload files over HTTP
+
+Encoded data is always bytes. Boundaries and headers are native strings."""
 
 import mimetypes
 import os
-import re
-import urllib
+import uuid
 from email.header import Header
 
+try:
+    from urllib.parse import quote_plus
+except ImportError:
+    from urllib import quote_plus
+
 __all__ = ['gen_boundary', 'encode_and_quote', 'MultipartParam',
            'encode_string', 'encode_file_header', 'get_body_size', 'get_headers',
            'multipart_encode']
@@ -21,42 +27,52 @@ except ImportError:
     UnsupportedOperation = None
 
 try:
-    import uuid
+    text_type = unicode
+except NameError:
+    text_type = str
 
-
-    def gen_boundary():
-        """Returns a random string to use as the boundary for a message"""
-        return uuid.uuid4().hex
-except ImportError:
-    import random
-    import sha
+# Files are read in blocks of this many bytes
+DEFAULT_BLOCKSIZE = 65536
 
 
-    def gen_boundary():
-        """Returns a random string to use as the boundary for a message"""
-        bits = random.getrandbits(160)
-        return sha.new(str(bits)).hexdigest()
+def gen_boundary():
+    """Returns a random string to use as the boundary for a message"""
+    return uuid.uuid4().hex
 
 
 def encode_and_quote(data):
-    """If ``data`` is unicode, return urllib.quote_plus(data.encode("utf-8"))
-    otherwise return urllib.quote_plus(data)"""
+    """If ``data`` is unicode, return quote_plus(data.encode("utf-8"))
+    otherwise return quote_plus(data)"""
     if data is None:
         return None
 
-    if isinstance(data, unicode):
+    if isinstance(data, text_type):
         data = data.encode("utf-8")
-    return urllib.quote_plus(data)
+    return quote_plus(data)
 
 
 def _strify(s):
     """If s is a unicode string, encode it to UTF-8 and return the results,
-    otherwise return str(s), or None if s is None"""
+    otherwise return bytes(s), or None if s is None"""
     if s is None:
         return None
-    if isinstance(s, unicode):
+    if isinstance(s, text_type):
         return s.encode("utf-8")
-    return str(s)
+    if isinstance(s, bytes):
+        return s
+    return str(s).encode("utf-8")
+
+
+def _native(s):
+    """Returns s as a native string, or None if s is None"""
+    if s is None or isinstance(s, str):
+        return s
+    return s.decode("utf-8")
+
+
+def _delimiter(boundary):
+    """Returns the bytes that must not occur in encoded data"""
+    return ("--%s" % encode_and_quote(boundary)).encode("ascii")
 
 
 class MultipartParam(object):
@@ -64,8 +80,8 @@ class MultipartParam(object):
 
     ``name`` is the name of this parameter.
 
-    If ``value`` is set, it must be a string or unicode object to use as the
-    data for this parameter.
+    If ``value`` is set, it must be a string, bytes or unicode object to use
+    as the data for this parameter.
 
     If ``filename`` is set, it is what to say that this parameter's filename
     is.  Note that this does not have to be the actual filename any local file.
@@ -76,7 +92,7 @@ class MultipartParam(object):
     If ``filesize`` is set, it specifies the length of the file ``fileobj``
 
     If ``fileobj`` is set, it must be a file-like object that supports
-    .read().
+    .read(), opened in binary mode.
 
     Both ``value`` and ``fileobj`` must not be set, doing so will
     raise a ValueError assertion.
@@ -99,14 +115,12 @@ class MultipartParam(object):
         if filename is None:
             self.filename = None
         else:
-            if isinstance(filename, unicode):
+            if isinstance(filename, text_type):
                 # Encode with XML entities
-                self.filename = filename.encode("ascii", "xmlcharrefreplace")
-            else:
-                self.filename = str(filename)
-            self.filename = self.filename.encode("string_escape"). \
-                replace('"', '\\"')
-        self.filetype = _strify(filetype)
+                filename = filename.encode("ascii", "xmlcharrefreplace")
+            self.filename = _native(filename).replace('\\', '\\\\'). \
+                replace('"', '\\"').replace('\r', '\\r').replace('\n', '\\n')
+        self.filetype = _native(filetype)
 
         self.filesize = filesize
         self.fileobj = fileobj
@@ -127,11 +141,17 @@ class MultipartParam(object):
                 except:
                     raise ValueError("Could not determine filesize")
 
-    def __cmp__(self, other):
-        attrs = ['name', 'value', 'filename', 'filetype', 'filesize', 'fileobj']
-        myattrs = [getattr(self, a) for a in attrs]
-        oattrs = [getattr(other, a) for a in attrs]
-        return cmp(myattrs, oattrs)
+    def _attrs(self):
+        return [getattr(self, a) for a in
+                ('name', 'value', 'filename', 'filetype', 'filesize', 'fileobj')]
+
+    def __eq__(self, other):
+        return isinstance(other, MultipartParam) and self._attrs() == other._attrs()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
 
     def reset(self):
         if self.fileobj is not None:
@@ -216,24 +236,30 @@ class MultipartParam(object):
         headers.append("")
         headers.append("")
 
-        return "\r\n".join(headers)
+        return "\r\n".join(headers).encode("utf-8")
 
     def encode(self, boundary):
-        """Returns the string encoding of this parameter"""
+        """Returns the bytes encoding of this parameter"""
         if self.value is None:
             value = self.fileobj.read()
         else:
             value = self.value
 
-        if re.search("^--%s$" % re.escape(boundary), value, re.M):
+        if _delimiter(boundary) in value:
             raise ValueError("boundary found in encoded string")
 
-        return "%s%s\r\n" % (self.encode_hdr(boundary), value)
+        return self.encode_hdr(boundary) + value + b"\r\n"
 
-    def iter_encode(self, boundary, blocksize=4096):
+    def iter_encode(self, boundary, blocksize=DEFAULT_BLOCKSIZE, reuse_buffer=False):
         """Yields the encoding of this parameter
         If self.fileobj is set, then blocks of ``blocksize`` bytes are read and
-        yielded."""
+        yielded.
+
+        If ``reuse_buffer`` is true and the file supports readinto(), every
+        block is read into the same buffer and yielded as a memoryview of it,
+        avoiding a copy per block. Each such block is only valid until the
+        next one is requested, so it must be consumed (e.g. written to a
+        socket) right away."""
         total = self.get_size(boundary)
         current = 0
         if self.value is not None:
@@ -248,23 +274,40 @@ class MultipartParam(object):
             yield block
             if self.cb:
                 self.cb(self, current, total)
-            last_block = ""
-            encoded_boundary = "--%s" % encode_and_quote(boundary)
-            boundary_exp = re.compile("^%s$" % re.escape(encoded_boundary),
-                                      re.M)
+            delimiter = _delimiter(boundary)
+            overlap = len(delimiter) - 1
+            # End of the previous block, to find delimiters spanning two blocks
+            tail = b""
+            if reuse_buffer and hasattr(self.fileobj, 'readinto'):
+                buf = bytearray(blocksize)
+                view = memoryview(buf)
+                read = self.fileobj.readinto
+            else:
+                buf = None
             while True:
-                block = self.fileobj.read(blocksize)
-                if not block:
+                if buf is not None:
+                    size = read(buf)
+                    block = view[:size] if size else None
+                    found = buf.find(delimiter, 0, size or 0) != -1
+                    head = bytes(buf[:min(overlap, size or 0)])
+                else:
+                    block = self.fileobj.read(blocksize)
+                    size = len(block)
+                    found = delimiter in block
+                    head = block[:overlap]
+                if not size:
                     current += 2
-                    yield "\r\n"
+                    yield b"\r\n"
                     if self.cb:
                         self.cb(self, current, total)
                     break
-                last_block += block
-                if boundary_exp.search(last_block):
+                if found or delimiter in tail + head:
                     raise ValueError("boundary found in file data")
-                last_block = last_block[-len(encoded_boundary) - 2:]
-                current += len(block)
+                if size >= overlap:
+                    tail = bytes(block[size - overlap:])
+                else:
+                    tail = (tail + bytes(block))[-overlap:]
+                current += size
                 yield block
                 if self.cb:
                     self.cb(self, current, total)
@@ -323,17 +366,20 @@ def get_headers(params, boundary):
     """Returns a dictionary with Content-Type and Content-Length headers
     for the multipart/form-data encoding of ``params``."""
     headers = {}
-    boundary = urllib.quote_plus(boundary)
+    boundary = quote_plus(boundary)
     headers['Content-Type'] = "multipart/form-data; boundary=%s" % boundary
     headers['Content-Length'] = str(get_body_size(params, boundary))
     return headers
 
 
-class MultipartYielder:
-    def __init__(self, params, boundary, cb):
+class MultipartYielder(object):
+    def __init__(self, params, boundary, cb, blocksize=DEFAULT_BLOCKSIZE,
+                 reuse_buffer=False):
         self.params = params
         self.boundary = boundary
         self.cb = cb
+        self.blocksize = blocksize
+        self.reuse_buffer = reuse_buffer
 
         self.i = 0
         self.p = None
@@ -342,47 +388,56 @@ class MultipartYielder:
         self.total = get_body_size(params, boundary)
 
     def __iter__(self):
+        if self.current:
+            # Iterated before, e.g. by a retried request: start over
+            self.reset()
         return self
 
-    def next(self):
+    def __next__(self):
         """generator function to yield multipart/form-data representation
         of parameters"""
-        if self.param_iter is not None:
-            try:
-                block = self.param_iter.next()
+        while True:
+            if self.param_iter is not None:
+                try:
+                    block = next(self.param_iter)
+                    self.current += len(block)
+                    if self.cb:
+                        self.cb(self.p, self.current, self.total)
+                    return block
+                except StopIteration:
+                    self.p = None
+                    self.param_iter = None
+
+            if self.i is None:
+                raise StopIteration
+            elif self.i >= len(self.params):
+                self.param_iter = None
+                self.p = None
+                self.i = None
+                block = ("--%s--\r\n" % self.boundary).encode("ascii")
                 self.current += len(block)
                 if self.cb:
                     self.cb(self.p, self.current, self.total)
                 return block
-            except StopIteration:
-                self.p = None
-                self.param_iter = None
 
-        if self.i is None:
-            raise StopIteration
-        elif self.i >= len(self.params):
-            self.param_iter = None
-            self.p = None
-            self.i = None
-            block = "--%s--\r\n" % self.boundary
-            self.current += len(block)
-            if self.cb:
-                self.cb(self.p, self.current, self.total)
-            return block
+            self.p = self.params[self.i]
+            self.param_iter = self.p.iter_encode(self.boundary, self.blocksize,
+                                                 self.reuse_buffer)
+            self.i += 1
 
-        self.p = self.params[self.i]
-        self.param_iter = self.p.iter_encode(self.boundary)
-        self.i += 1
-        return self.next()
+    next = __next__
 
     def reset(self):
         self.i = 0
+        self.p = None
+        self.param_iter = None
         self.current = 0
         for param in self.params:
             param.reset()
 
 
-def multipart_encode(params, boundary=None, cb=None):
+def multipart_encode(params, boundary=None, cb=None, blocksize=DEFAULT_BLOCKSIZE,
+                     reuse_buffer=False):
     """Encode ``params`` as multipart/form-data.
 
     ``params`` should be a sequence of (name, value) pairs or MultipartParam
@@ -401,33 +456,36 @@ def multipart_encode(params, boundary=None, cb=None):
     indicating the current parameter being encoded, the current amount encoded,
     and the total amount to encode.
 
+    ``blocksize`` and ``reuse_buffer`` control how files are read, see
+    MultipartParam.iter_encode.
+
     Returns a tuple of `datagen`, `headers`, where `datagen` is a
-    generator that will yield blocks of data that make up the encoded
+    generator that will yield blocks of bytes that make up the encoded
     parameters, and `headers` is a dictionary with the assoicated
     Content-Type and Content-Length headers.
 
     Examples:
 
     >>> datagen, headers = multipart_encode( [("key", "value1"), ("key", "value2")] )
-    >>> s = "".join(datagen)
-    >>> assert "value2" in s and "value1" in s
+    >>> s = b"".join(datagen)
+    >>> assert b"value2" in s and b"value1" in s
 
     >>> p = MultipartParam("key", "value2")
     >>> datagen, headers = multipart_encode( [("key", "value1"), p] )
-    >>> s = "".join(datagen)
-    >>> assert "value2" in s and "value1" in s
+    >>> s = b"".join(datagen)
+    >>> assert b"value2" in s and b"value1" in s
 
     >>> datagen, headers = multipart_encode( {"key": "value1"} )
-    >>> s = "".join(datagen)
-    >>> assert "value2" not in s and "value1" in s
+    >>> s = b"".join(datagen)
+    >>> assert b"value2" not in s and b"value1" in s
 
     """
     if boundary is None:
         boundary = gen_boundary()
     else:
-        boundary = urllib.quote_plus(boundary)
+        boundary = quote_plus(boundary)
 
     headers = get_headers(params, boundary)
     params = MultipartParam.from_params(params)
 
-    return MultipartYielder(params, boundary, cb), headers
+    return MultipartYielder(params, boundary, cb, blocksize, reuse_buffer), headers
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Precompiled API endpoints.
+
+An Endpoint is parsed once, when this module is imported, into a format
+string for its path and a schema for its query string. Areas request it
+with HttpTransport.call(), which then only has to fill in the path and
+encode the query, instead of collapsing attribute stacks and copying and
+filtering parameters on every call.
+"""
+import re
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+_placeholder = re.compile(r'\{(\w+)\}')
+
+
+class Endpoint(object):
+    """
+    :param method: HTTP method
+    :param path: Path with {placeholders}, e.g. '/item/{item_id}'
+    :param query: Accepted query parameters and their defaults, or None to
+                  accept any. Parameters equal to their default are left
+                  out of the URL; booleans are sent as 'true'/'false'.
+    """
+    __slots__ = ('method', 'path', 'query', 'args', '_template')
+
+    def __init__(self, method, path, query=None):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.args = tuple(_placeholder.findall(path))
+        self._template = _placeholder.sub('%s', path.replace('%', '%%'))
+
+    def url(self, base, args, params=None):
+        """Returns the URL for path arguments ``args`` and query ``params``"""
+        if len(args) != len(self.args):
+            raise TypeError("%s %s takes %d path arguments (%d given)"
+                            % (self.method, self.path, len(self.args), len(args)))
+        url = base + self._template % tuple(args)
+        if params:
+            query = self.encode_query(params)
+            if query:
+                url += '?' + query
+        return url
+
+    def encode_query(self, params):
+        if self.query is not None:
+            unknown = set(params) - set(self.query)
+            if unknown:
+                raise TypeError("Unexpected query parameters for %s %s: %s"
+                                % (self.method, self.path, ', '.join(sorted(unknown))))
+        pairs = []
+        for name, value in params.items():
+            if self.query is not None and value == self.query[name]:
+                continue
+            if isinstance(value, bool):
+                value = 'true' if value else 'false'
+            pairs.append((name, value))
+        return urlencode(pairs)
+
+    def __repr__(self):
+        return 'Endpoint(%r, %r)' % (self.method, self.path)
+
+
+_change_options = {'silent': False, 'hook': True}
+
+APP_FIND = Endpoint('GET', '/app/{app_id}')
+APP_ITEMS = Endpoint('GET', '/item/app/{app_id}/')
+ITEM_FIND = Endpoint('GET', '/item/{item_id}')
+ITEM_FIND_BASIC = Endpoint('GET', '/item/{item_id}/basic')
+ITEM_FILTER = Endpoint('POST', '/item/app/{app_id}/filter/')
+ITEM_CREATE = Endpoint('POST', '/item/app/{app_id}/', query=_change_options)
+ITEM_UPDATE = Endpoint('PUT', '/item/{item_id}', query=_change_options)
+ITEM_DELETE = Endpoint('DELETE', '/item/{item_id}', query=_change_options)
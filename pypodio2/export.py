@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel export of the items of whole orgs and spaces.
+
+An Exporter lists the apps to export, then hands them out one by one to a
+pool of worker processes. Each worker builds its own client, so it has
+its own connections and decodes JSON on its own core; the workers share
+one OAuth token through a token store. The items of each app are written
+to a newline-delimited JSON file, gzipped if asked.
+
+A manifest in the output directory records every app that was exported
+completely. An export that is interrupted and run again skips those and
+exports only the others; an app that was being written starts over.
+"""
+import gzip
+import json
+import multiprocessing
+import os
+
+from . import api, jsoncodec
+from ._fileutil import atomic_open, atomic_write
+from .tokenstore import FileTokenStore
+
+
+class OAuthClientFactory(object):
+    """
+    Creates the client of each worker process. Unlike a client, it can be
+    pickled and sent to the workers. With ``token_directory`` the clients
+    share their token through a FileTokenStore, so only the first one
+    logs in.
+
+    Extra keyword arguments are passed on to api.OAuthClient.
+    """
+
+    def __init__(self, api_key, api_secret, login, password, token_directory=None,
+                 **client_options):
+        self.credentials = (api_key, api_secret, login, password)
+        self.token_directory = token_directory
+        self.client_options = client_options
+
+    def __call__(self):
+        options = dict(self.client_options)
+        if self.token_directory is not None:
+            options['token_store'] = FileTokenStore(self.token_directory)
+        return api.OAuthClient(*self.credentials, **options)
+
+
+class ExportResult(object):
+    """
+    Outcome of the export of one app. ``ok`` tells whether it succeeded;
+    if so ``items`` is the number of items written to ``path``, otherwise
+    ``error`` describes the failure.
+    """
+    __slots__ = ('app_id', 'ok', 'path', 'items', 'error')
+
+    def __init__(self, app_id, ok, path=None, items=0, error=None):
+        self.app_id = app_id
+        self.ok = ok
+        self.path = path
+        self.items = items
+        self.error = error
+
+    def __repr__(self):
+        if self.ok:
+            return 'ExportResult(%d, %d items)' % (self.app_id, self.items)
+        return 'ExportResult(%d, %r)' % (self.app_id, self.error)
+
+
+def export_app(client, app_id, path, compress=False, limit=500):
+    """
+    Writes all items of ``app_id`` to ``path``, one JSON document per
+    line, and returns their number. Pages are decoded incrementally, so
+    memory use doesn't depend on the page size.
+
+    The items are written to a temporary file first, which replaces
+    ``path`` once complete.
+    """
+    count = 0
+    with atomic_open(path) as f:
+        if compress:
+            f = gzip.GzipFile(path, 'wb', fileobj=f)
+        with f:
+            while True:
+                page = client.Item.filter(app_id, {'limit': limit, 'offset': count},
+                                          incremental=True)
+                page_count = 0
+                for item in page:
+                    f.write(jsoncodec.dumps(item) + b'\n')
+                    page_count += 1
+                count += page_count
+                if page_count < limit:
+                    break
+    return count
+
+
+class Manifest(object):
+    """
+    The apps already exported to a directory, kept in a JSON file at
+    ``path`` that is rewritten as a whole after every app.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.apps = json.load(f).get('apps', {})
+        except (IOError, OSError, ValueError):
+            self.apps = {}
+
+    def done(self, app_id):
+        """Whether ``app_id`` was exported and its file is still there"""
+        entry = self.apps.get(str(app_id))
+        return entry is not None and os.path.exists(entry['path'])
+
+    def record(self, result):
+        self.apps[str(result.app_id)] = {'path': result.path, 'items': result.items}
+        atomic_write(self.path, json.dumps({'apps': self.apps}, indent=1,
+                                           sort_keys=True).encode("utf-8"))
+
+
+# The client of a worker process, created once by _init_worker
+_client = None
+
+
+def _init_worker(client_factory):
+    global _client
+    _client = client_factory()
+
+
+def _export(task, client=None):
+    app_id, path, compress, limit = task
+    try:
+        count = export_app(client or _client, app_id, path, compress, limit)
+        return ExportResult(app_id, True, path, count)
+    except Exception as e:
+        # Exceptions may not survive pickling, their description does
+        return ExportResult(app_id, False, path, error='%s: %s' % (type(e).__name__, e))
+
+
+class Exporter(object):
+    """
+    Exports apps to one file per app in ``directory``.
+
+    :param client_factory: Picklable callable returning a client, e.g. an
+                           OAuthClientFactory. Called once per worker, and
+                           once in the calling process to list apps.
+    :param directory: Where files and the manifest are written
+    :param processes: Number of worker processes, the number of CPUs by
+                      default. With 1 apps are exported in the calling
+                      process.
+    :param compress: Write gzipped files
+    :param limit: Page size, at most 500
+    """
+
+    def __init__(self, client_factory, directory, processes=None, compress=False, limit=500):
+        self.client_factory = client_factory
+        self.directory = directory
+        self.processes = processes or multiprocessing.cpu_count()
+        self.compress = compress
+        self.limit = limit
+        self._client = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.manifest = Manifest(os.path.join(directory, 'manifest.json'))
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    def path(self, app_id):
+        name = 'app-%s.ndjson' % app_id
+        if self.compress:
+            name += '.gz'
+        return os.path.join(self.directory, name)
+
+    def apps_in_space(self, space_id):
+        return [app['app_id'] for app in self.client.Application.list_in_space(space_id)]
+
+    def apps_in_org(self, org_id):
+        app_ids = []
+        for space in self.client.Space.find_all_for_org(org_id):
+            app_ids.extend(self.apps_in_space(space['space_id']))
+        return app_ids
+
+    def export_org(self, org_id):
+        """Exports all apps of all spaces in an org, see export()"""
+        return self.export(self.apps_in_org(org_id))
+
+    def export_space(self, space_id):
+        """Exports all apps of a space, see export()"""
+        return self.export(self.apps_in_space(space_id))
+
+    def export(self, app_ids):
+        """
+        Exports the apps not in the manifest yet and yields an ExportResult
+        per app, in order of completion. Successful apps are added to the
+        manifest before their result is yielded; failed ones are tried
+        again by the next run.
+        """
+        tasks = [(app_id, self.path(app_id), self.compress, self.limit)
+                 for app_id in app_ids if not self.manifest.done(app_id)]
+        if not tasks:
+            return
+        if self.processes <= 1 or len(tasks) == 1:
+            results = (_export(task, self.client) for task in tasks)
+            for result in self._record(results):
+                yield result
+            return
+
+        pool = multiprocessing.Pool(min(self.processes, len(tasks)),
+                                    initializer=_init_worker, initargs=(self.client_factory,))
+        try:
+            for result in self._record(pool.imap_unordered(_export, tasks)):
+                yield result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _record(self, results):
+        for result in results:
+            if result.ok:
+                self.manifest.record(result)
+            yield result
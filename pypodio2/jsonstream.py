@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental decoding of large JSON arrays.
+
+Instead of reading a whole response and decoding it at once, an
+ArrayParser is fed the body chunk by chunk as it arrives and decodes each
+element of one array (the ``items`` of a filter page, or a top-level
+array such as a stream) as soon as its last byte is in. Only the element
+being received is kept in memory, not the whole body and its decoded form.
+"""
+import re
+
+from . import jsoncodec
+from .transport import _handle_stream_response
+
+# A complete string, or a structural character; a lone quote starts a
+# string that is not complete yet
+_token = re.compile(br'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{},"]', re.DOTALL)
+
+
+class ArrayParser(object):
+    """
+    Finds the array under ``key`` in a top-level object, or the top-level
+    array itself if ``key`` is None, and decodes its elements one by one.
+
+    feed() takes the next chunk of the document and returns the elements
+    completed by it; close() returns the rest of the document with an
+    empty array in place of the elements, e.g. {'filtered': 12, 'items': []}.
+    """
+
+    def __init__(self, key=None):
+        self.key = key.encode("utf-8") if key is not None else None
+        self._buf = b''
+        self._pos = 0
+        self._depth = 0
+        self._last_string = None
+        self._array_depth = None
+        self._element_start = None
+        self._done = False
+        self._skeleton = []
+        self._skeleton_start = 0
+
+    def _element(self, end, elements):
+        element = self._buf[self._element_start:end].strip()
+        if element:
+            elements.append(jsoncodec.loads(element))
+
+    def feed(self, data):
+        buf = self._buf = self._buf + bytes(data)
+        pos = len(buf)
+        depth = self._depth
+        array_depth = self._array_depth
+        elements = []
+        for match in _token.finditer(buf, self._pos):
+            token = match.group()
+            if token[:1] == b'"':
+                if len(token) == 1:
+                    # The rest of the string is yet to come
+                    pos = match.start()
+                    break
+                if depth == 1:
+                    self._last_string = token[1:-1]
+                continue
+            end = match.end()
+            if token == b'{':
+                depth += 1
+            elif token == b'[':
+                depth += 1
+                if array_depth is None and not self._done and (
+                        depth == 1 if self.key is None
+                        else depth == 2 and self._last_string == self.key):
+                    array_depth = depth
+                    self._skeleton.append(buf[self._skeleton_start:end])
+                    self._element_start = end
+            elif depth != array_depth:
+                if token != b',':
+                    depth -= 1
+            elif token == b',':
+                self._element(end - 1, elements)
+                self._element_start = end
+            else:
+                self._element(end - 1, elements)
+                array_depth = self._element_start = None
+                self._done = True
+                self._skeleton_start = end - 1
+                depth -= 1
+        self._depth = depth
+        self._array_depth = array_depth
+
+        # Drop what is no longer needed: everything before the element
+        # being received, or before the current position outside the array
+        if self._array_depth is not None:
+            keep = self._element_start
+        else:
+            keep = pos
+            self._skeleton.append(buf[self._skeleton_start:keep])
+            self._skeleton_start = 0
+        self._buf = buf[keep:]
+        self._pos = pos - keep
+        if self._element_start is not None:
+            self._element_start -= keep
+        return elements
+
+    def close(self):
+        """Returns the document without the array's elements"""
+        if self._array_depth is not None or self._depth:
+            raise ValueError("Incomplete JSON document")
+        return jsoncodec.loads(b''.join(self._skeleton) + self._buf)
+
+
+class ArrayStream(object):
+    """
+    Iterates over the elements of an array in a streamed response, see
+    ArrayParser. Once exhausted, ``meta`` holds the rest of the document,
+    e.g. the 'filtered' and 'total' counts of a filter page.
+
+    The connection is released when the iteration ends; call close() (or
+    use a with block) when stopping early.
+    """
+
+    def __init__(self, stream, key=None, chunk_size=65536):
+        self.response = stream.response
+        self.meta = None
+        self._stream = stream
+        self._parser = ArrayParser(key)
+        self._chunk_size = chunk_size
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream.iter_chunks(self._chunk_size):
+                for element in self._parser.feed(chunk):
+                    yield element
+            self.meta = self._parser.close()
+        finally:
+            self.close()
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def array_handler(key=None, chunk_size=65536):
+    """
+    Returns a transport handler that turns a streamed response into an
+    ArrayStream, for ``stream=True`` requests.
+    """
+    def handler(response, stream):
+        return ArrayStream(_handle_stream_response(response, stream), key, chunk_size)
+    return handler
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Request hooks and metrics for HttpTransport.
+
+Hooks are objects with the methods of TransportHooks, passed as
+HttpTransport(hooks=[...]). They are called for every request sent, each
+retry included, with a RequestInfo describing it. Requests answered from
+the response cache are not sent and don't reach hooks.
+
+MetricsCollector is a hook that aggregates latency, payload sizes, status
+codes and retries per endpoint template, e.g. ``GET /item/{id}``.
+"""
+import re
+import threading
+import time
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_id_segment = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_template(url):
+    """
+    Returns the path of ``url`` with numeric IDs replaced by ``{id}``, so
+    that requests for different objects are grouped together.
+    """
+    return _id_segment.sub('/{id}', urlsplit(url).path) or '/'
+
+
+class RequestInfo(object):
+    """
+    One request as seen by hooks.
+
+    ``attempt`` counts from 1 and grows with each retry. ``request_bytes``
+    is the size of the body sent. ``response_bytes``, ``status`` and
+    ``elapsed`` (seconds) are set once the response arrived; for streamed
+    responses ``response_bytes`` is the announced Content-Length, if any.
+    ``caller`` is the 'Area.method' that issued the request, e.g.
+    'Item.find', or None for direct transport calls.
+    """
+    __slots__ = ('method', 'url', 'attempt', 'caller', 'request_bytes', 'response_bytes',
+                 'status', 'started', 'elapsed', '_endpoint')
+
+    def __init__(self, method, url, body=None, headers=None, attempt=1, caller=None):
+        self.method = method
+        self.url = url
+        self.attempt = attempt
+        self.caller = caller
+        self.request_bytes = _body_size(body, headers or {})
+        self.response_bytes = None
+        self.status = None
+        self.started = time.time()
+        self.elapsed = None
+        self._endpoint = None
+
+    @property
+    def endpoint(self):
+        """The endpoint template of the URL, see endpoint_template"""
+        if self._endpoint is None:
+            self._endpoint = endpoint_template(self.url)
+        return self._endpoint
+
+    def finish(self, response=None, data=None):
+        self.elapsed = time.time() - self.started
+        if response is not None:
+            self.status = response.status
+            if isinstance(data, (bytes, str)):
+                self.response_bytes = len(data)
+            elif data is not None and 'content-length' in response:
+                self.response_bytes = int(response['content-length'])
+
+
+def _body_size(body, headers):
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    for name, value in headers.items():
+        if name.lower() == 'content-length':
+            return int(value)
+    return 0
+
+
+class TransportHooks(object):
+    """No-op base class for transport hooks"""
+
+    def before_request(self, request):
+        """Called before ``request`` (a RequestInfo) is sent"""
+
+    def after_response(self, request, response, data):
+        """Called with the response of ``request``, whatever its status"""
+
+    def on_error(self, request, error):
+        """Called when sending ``request`` raised ``error``"""
+
+
+class EndpointStats(object):
+    """Counters of one method and endpoint template"""
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.statuses = {}
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(buckets)
+
+    def as_dict(self, buckets):
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'errors': self.errors,
+            'statuses': dict(self.statuses),
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'latency_sum': self.latency_sum,
+            'latency_buckets': dict(zip(buckets, self.latency_buckets)),
+        }
+
+
+class MetricsCollector(TransportHooks):
+    """
+    Aggregates request metrics per (method, endpoint template). Latencies
+    go into a cumulative histogram with upper bounds ``buckets``.
+
+    Export with as_dict(), or prometheus() for the Prometheus text format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='podio'):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _get(self, request):
+        key = (request.method, request.endpoint)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats.setdefault(key, EndpointStats(self.buckets))
+        return stats
+
+    def _record(self, request, stats):
+        stats.requests += 1
+        if request.attempt > 1:
+            stats.retries += 1
+        stats.bytes_out += request.request_bytes
+        stats.latency_sum += request.elapsed
+        for i, bound in enumerate(self.buckets):
+            if request.elapsed <= bound:
+                stats.latency_buckets[i] += 1
+
+    def after_response(self, request, response, data):
+        with self._lock:
+            stats = self._get(request)
+            self._record(request, stats)
+            stats.statuses[request.status] = stats.statuses.get(request.status, 0) + 1
+            stats.bytes_in += request.response_bytes or 0
+
+    def on_error(self, request, error):
+        with self._lock:
+            stats = self._get(request)
+            self._record(request, stats)
+            stats.errors += 1
+
+    def as_dict(self):
+        """Stats by 'METHOD /endpoint/{id}'"""
+        with self._lock:
+            return dict(('%s %s' % key, stats.as_dict(self.buckets))
+                        for key, stats in self._stats.items())
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format"""
+        prefix = self.prefix
+        with self._lock:
+            stats = sorted(self._stats.items())
+            lines = []
+
+            def family(name, kind, help_text):
+                lines.append('# HELP %s_%s %s' % (prefix, name, help_text))
+                lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+
+            def sample(name, labels, value):
+                text = ','.join('%s="%s"' % (label, _escape(str(v))) for label, v in labels)
+                lines.append('%s_%s{%s} %s' % (prefix, name, text, _number(value)))
+
+            family('requests_total', 'counter', 'Requests sent, by response status')
+            for (method, endpoint), s in stats:
+                labels = (('method', method), ('endpoint', endpoint))
+                for status, count in sorted(s.statuses.items()):
+                    sample('requests_total', labels + (('status', status),), count)
+                if s.errors:
+                    sample('requests_total', labels + (('status', 'error'),), s.errors)
+            for name, attribute, help_text in (
+                    ('retries_total', 'retries', 'Retried requests'),
+                    ('request_bytes_total', 'bytes_out', 'Request body bytes sent'),
+                    ('response_bytes_total', 'bytes_in', 'Response body bytes received')):
+                family(name, 'counter', help_text)
+                for (method, endpoint), s in stats:
+                    sample(name, (('method', method), ('endpoint', endpoint)),
+                           getattr(s, attribute))
+
+            family('request_duration_seconds', 'histogram', 'Request latency')
+            for (method, endpoint), s in stats:
+                labels = (('method', method), ('endpoint', endpoint))
+                for bound, count in zip(self.buckets, s.latency_buckets):
+                    sample('request_duration_seconds_bucket', labels + (('le', bound),), count)
+                sample('request_duration_seconds_bucket', labels + (('le', '+Inf'),), s.requests)
+                sample('request_duration_seconds_sum', labels, s.latency_sum)
+                sample('request_duration_seconds_count', labels, s.requests)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
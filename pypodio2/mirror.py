@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Local SQLite mirror of apps and their items.
+
+A Mirror keeps app schemas and items in a SQLite database, indexed by
+item ID, app, external ID and field values, so that repeated lookups are
+answered locally instead of with Item.filter or find_all_by_external_id
+calls. refresh() brings an app up to date with an IncrementalSync, which
+only fetches the items edited since the previous refresh:
+
+    mirror = Mirror(c, 'podio.sqlite')
+    mirror.refresh(app_id)
+    mirror.find_by_external_id(app_id, 'order-1234')
+    mirror.find_by_value(app_id, 'status', 'Open')
+
+Deleted items are not noticed by refresh(); remove them with delete(),
+e.g. from an item.delete webhook.
+"""
+import sqlite3
+import threading
+
+from . import jsoncodec, models
+from .sync import IncrementalSync
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    app_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    watermark BLOB
+);
+CREATE TABLE IF NOT EXISTS fields (
+    field_id INTEGER PRIMARY KEY,
+    app_id INTEGER NOT NULL,
+    external_id TEXT,
+    type TEXT,
+    label TEXT
+);
+CREATE INDEX IF NOT EXISTS fields_by_external_id ON fields (app_id, external_id);
+CREATE TABLE IF NOT EXISTS items (
+    item_id INTEGER PRIMARY KEY,
+    app_id INTEGER NOT NULL,
+    external_id TEXT,
+    last_edit_on TEXT,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_by_external_id ON items (app_id, external_id);
+CREATE TABLE IF NOT EXISTS item_values (
+    item_id INTEGER NOT NULL,
+    field_id INTEGER NOT NULL,
+    value
+);
+CREATE INDEX IF NOT EXISTS item_values_by_value ON item_values (field_id, value);
+CREATE INDEX IF NOT EXISTS item_values_by_item ON item_values (item_id);
+"""
+
+# Keys that identify a structured value, e.g. the referenced item of an
+# app reference or the text of a category option, in order of preference
+_VALUE_KEYS = ('item_id', 'text', 'start', 'profile_id', 'id', 'value')
+
+
+def _index_value(value):
+    """
+    The scalar a field value is indexed by, or None if it has none. See
+    models._simplify for the unwrapping of plain values.
+    """
+    value = models._simplify(value)
+    if isinstance(value, dict):
+        for key in _VALUE_KEYS:
+            if key in value and not isinstance(value[key], (dict, list)):
+                return value[key]
+        return None
+    if isinstance(value, list):
+        return None
+    return value
+
+
+def _encode(document):
+    return sqlite3.Binary(jsoncodec.dumps(document))
+
+
+def _decode(data):
+    return jsoncodec.loads(bytes(data)) if data is not None else None
+
+
+class Mirror(object):
+    """
+    :param client: Podio client used by refresh()
+    :param path: SQLite database file, in memory by default
+
+    The mirror can be shared between threads; the database connection is
+    used by one at a time. It also serves as the watermark store of the
+    IncrementalSync run by refresh(), so an item page and the watermark
+    that covers it are committed together.
+    """
+
+    def __init__(self, client, path=':memory:'):
+        self.client = client
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # Watermark store interface, see sync.FileWatermarkStore
+
+    def load(self, app_id):
+        rows = self._query('SELECT watermark FROM apps WHERE app_id = ?', (app_id,))
+        return _decode(rows[0][0]) if rows else None
+
+    def save(self, app_id, watermark):
+        with self._lock:
+            self._db.execute('UPDATE apps SET watermark = ? WHERE app_id = ?',
+                             (_encode(watermark), app_id))
+            self._db.commit()
+
+    # Updates
+
+    def store_app(self, app):
+        """Stores an app and its fields, as returned by Application.find"""
+        with self._lock:
+            self._db.execute(
+                'INSERT OR IGNORE INTO apps (app_id, data) VALUES (?, ?)',
+                (app['app_id'], _encode(app)))
+            self._db.execute('UPDATE apps SET data = ? WHERE app_id = ?',
+                             (_encode(app), app['app_id']))
+            self._db.executemany(
+                'INSERT OR REPLACE INTO fields (field_id, app_id, external_id, type, label) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(field['field_id'], app['app_id'], field.get('external_id'),
+                  field.get('type'), field.get('label')) for field in app.get('fields') or ()])
+            self._db.commit()
+
+    def store_items(self, app_id, items):
+        """Adds or replaces items given as dicts of the API"""
+        with self._lock:
+            for item in items:
+                self._store_item(app_id, item)
+            self._db.commit()
+
+    def _store_item(self, app_id, item):
+        item_id = item['item_id']
+        self._db.execute(
+            'INSERT OR REPLACE INTO items (item_id, app_id, external_id, last_edit_on, data) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (item_id, app_id, item.get('external_id'), item.get('last_edit_on'),
+             _encode(item)))
+        self._db.execute('DELETE FROM item_values WHERE item_id = ?', (item_id,))
+        rows = []
+        for field in item.get('fields') or ():
+            for value in field.get('values') or ():
+                value = _index_value(value)
+                if value is not None:
+                    rows.append((item_id, field['field_id'], value))
+        self._db.executemany(
+            'INSERT INTO item_values (item_id, field_id, value) VALUES (?, ?, ?)', rows)
+
+    def delete(self, item_id):
+        with self._lock:
+            self._db.execute('DELETE FROM items WHERE item_id = ?', (item_id,))
+            self._db.execute('DELETE FROM item_values WHERE item_id = ?', (item_id,))
+            self._db.commit()
+
+    def refresh(self, app_id, limit=500):
+        """
+        Updates the app's schema and fetches the items edited since the
+        last refresh. Returns the number of items fetched.
+        """
+        self.store_app(self.client.Application.find(app_id))
+        count = 0
+        for item in IncrementalSync(self.client, self, limit).changes(app_id):
+            # Committed together with the watermark of its page, by save()
+            with self._lock:
+                self._store_item(app_id, item)
+            count += 1
+        with self._lock:
+            self._db.commit()
+        return count
+
+    # Lookups
+
+    def schema(self, app_id):
+        """The models.AppSchema of a mirrored app, or None"""
+        rows = self._query('SELECT data FROM apps WHERE app_id = ?', (app_id,))
+        return models.AppSchema.from_app(_decode(rows[0][0])) if rows else None
+
+    def item(self, item_id):
+        """The item dict with ``item_id``, or None"""
+        rows = self._query('SELECT data FROM items WHERE item_id = ?', (item_id,))
+        return _decode(rows[0][0]) if rows else None
+
+    def items(self, app_id):
+        """All mirrored items of an app, by item ID"""
+        return [_decode(data) for data, in self._query(
+            'SELECT data FROM items WHERE app_id = ? ORDER BY item_id', (app_id,))]
+
+    def find_by_external_id(self, app_id, external_id):
+        """The items of an app with an item external ID, like Item.find_all_by_external_id"""
+        return [_decode(data) for data, in self._query(
+            'SELECT data FROM items WHERE app_id = ? AND external_id = ? ORDER BY item_id',
+            (app_id, external_id))]
+
+    def find_by_value(self, app_id, key, value):
+        """
+        The items of an app with ``value`` among the values of field
+        ``key``, an external ID or field ID. Structured values are matched
+        by the referenced item ID, the category text, the start of a date
+        or the profile ID of a contact.
+        """
+        if isinstance(key, int):
+            field_ids = [key]
+        else:
+            field_ids = [field_id for field_id, in self._query(
+                'SELECT field_id FROM fields WHERE app_id = ? AND external_id = ?',
+                (app_id, key))]
+        if not field_ids:
+            raise KeyError("No field %r in app %s" % (key, app_id))
+        return [_decode(data) for _, data in self._query(
+            'SELECT DISTINCT items.item_id, items.data'
+            ' FROM item_values CROSS JOIN items ON items.item_id = item_values.item_id'
+            ' WHERE item_values.field_id = ? AND item_values.value = ? AND items.app_id = ?'
+            ' ORDER BY items.item_id', (field_ids[0], value, app_id))]
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Optional compact models for items.
+
+The API returns every item with the full definition of each of its
+fields (ID, external ID, type, label, config), which makes large sets of
+items expensive to keep in memory and tedious to read. Here the field
+definitions live once per app in an AppSchema, and an Item only keeps the
+values of its fields, in the order of the schema:
+
+    schema = c.Application.schema(app_id)
+    items = schema.items(c.Item.iter_filter(app_id))
+    for item in items:
+        print(item['org-name'])
+"""
+import threading
+
+
+class Field(object):
+    """Definition of an app field, shared by all items of the app"""
+    __slots__ = ('field_id', 'external_id', 'type', 'label', 'position')
+
+    def __init__(self, field_id, external_id, type, label, position):
+        self.field_id = field_id
+        self.external_id = external_id
+        self.type = type
+        self.label = label
+        self.position = position
+
+    def __repr__(self):
+        return 'Field(%r, %r)' % (self.field_id, self.external_id)
+
+
+class AppSchema(object):
+    """
+    The fields of an app, indexed by field ID and external ID.
+
+    Build it once per app with from_app(); fields of items that aren't in
+    the schema yet (e.g. added after it was built) are appended on the fly.
+    """
+
+    def __init__(self, app_id=None, fields=()):
+        self.app_id = app_id
+        self.fields = []
+        self._index = {}
+        self._lock = threading.Lock()
+        for field in fields:
+            self.add(field)
+
+    @classmethod
+    def from_app(cls, app):
+        """Builds the schema from an Application.find response"""
+        return cls(app.get('app_id'), app.get('fields') or ())
+
+    def add(self, field):
+        """Adds a field given as a dict of the API, returns its Field"""
+        known = self._index.get(field['field_id'])
+        if known is not None:
+            return known
+        with self._lock:
+            known = self._index.get(field['field_id'])
+            if known is None:
+                known = Field(field['field_id'], field.get('external_id'), field.get('type'),
+                              field.get('label'), len(self.fields))
+                self.fields.append(known)
+                if known.external_id is not None:
+                    self._index[known.external_id] = known
+                self._index[known.field_id] = known
+            return known
+
+    def field(self, key):
+        """Returns the Field with external ID or field ID ``key``"""
+        try:
+            return self._index[key]
+        except KeyError:
+            raise KeyError("No field %r in app %s" % (key, self.app_id))
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self.fields)
+
+    def item(self, data):
+        """Returns the Item of an item dict of the API"""
+        return Item.from_dict(self, data)
+
+    def items(self, iterable):
+        """Generator of the Items of item dicts, e.g. from Item.iter_filter"""
+        for data in iterable:
+            yield Item.from_dict(self, data)
+
+
+def _simplify(value):
+    """
+    Drops the wrapping {'value': ...} around values of most field types.
+    Values with other keys (dates, money, ...) are kept as they are.
+    """
+    if isinstance(value, dict) and len(value) == 1 and 'value' in value:
+        return value['value']
+    return value
+
+
+class Item(object):
+    """
+    An item whose field values are looked up by external ID or field ID
+    in constant time. ``item[key]`` is the first value of the field (None
+    if empty), ``item.values(key)`` all of them.
+    """
+    __slots__ = ('schema', 'item_id', 'app_item_id', 'title', 'created_on',
+                 'last_edit_on', '_values')
+
+    def __init__(self, schema, item_id, app_item_id=None, title=None, created_on=None,
+                 last_edit_on=None, values=()):
+        self.schema = schema
+        self.item_id = item_id
+        self.app_item_id = app_item_id
+        self.title = title
+        self.created_on = created_on
+        self.last_edit_on = last_edit_on
+        self._values = tuple(values)
+
+    @classmethod
+    def from_dict(cls, schema, data):
+        values = [()] * len(schema)
+        for field in data.get('fields') or ():
+            position = schema.add(field).position
+            if position >= len(values):
+                values.extend([()] * (position + 1 - len(values)))
+            values[position] = tuple(_simplify(value) for value in field.get('values') or ())
+        return cls(schema, data['item_id'], data.get('app_item_id'), data.get('title'),
+                   data.get('created_on'), data.get('last_edit_on'), values)
+
+    def values(self, key):
+        position = self.schema.field(key).position
+        if position < len(self._values):
+            return list(self._values[position])
+        return []
+
+    def get(self, key, default=None):
+        """Like item[key], but returns ``default`` for unknown fields"""
+        if key not in self.schema:
+            return default
+        return self[key]
+
+    def __getitem__(self, key):
+        position = self.schema.field(key).position
+        if position < len(self._values) and self._values[position]:
+            return self._values[position][0]
+        return None
+
+    def to_dict(self):
+        """The values of the non-empty fields, by external ID"""
+        return dict((field.external_id or field.field_id, list(self._values[field.position]))
+                    for field in self.schema.fields
+                    if field.position < len(self._values) and self._values[field.position])
+
+    def __repr__(self):
+        return 'Item(%r, %r)' % (self.item_id, self.title)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for walking offset/limit paginated endpoints.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+def iter_pages(fetch_page, limit, offset=0, prefetch=False):
+    """
+    Yields the response of every page of an offset/limit paginated endpoint.
+
+    :param fetch_page: Callable taking (offset, limit) and returning the
+                       decoded response of that page, a dict with an 'items'
+                       list and a 'filtered' or 'total' count.
+    :param limit: Page size
+    :param offset: Offset of the first page
+    :param prefetch: If true, the next page is requested in a background
+                     thread while the caller processes the current one. Use
+                     a pooled client (``pool_size``) if the loop body makes
+                     calls of its own.
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = fetch_page(offset, limit)
+        while True:
+            items = page.get('items') or []
+            count = page.get('filtered', page.get('total'))
+            offset += len(items)
+            has_more = len(items) >= limit and (count is None or offset < count)
+            if has_more and executor is not None:
+                next_page = executor.submit(fetch_page, offset, limit)
+            yield page
+            if not has_more:
+                return
+            if executor is not None:
+                page = next_page.result()
+            else:
+                page = fetch_page(offset, limit)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def iter_items(fetch_page, limit, offset=0, prefetch=False):
+    """Yields the items of every page, see iter_pages"""
+    for page in iter_pages(fetch_page, limit, offset=offset, prefetch=prefetch):
+        for item in page.get('items') or []:
+            yield item
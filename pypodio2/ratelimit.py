@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Client side rate limiting, driven by the X-Rate-Limit-* headers Podio
+sends with every response.
+"""
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket holding up to ``capacity`` tokens, refilled
+    at ``rate`` tokens per second.
+    """
+
+    def __init__(self, rate, capacity, clock=time.time, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def set_tokens(self, tokens):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, float(tokens))
+
+    def configure(self, rate, capacity):
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = float(capacity)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def acquire(self, tokens=1, blocking=True):
+        """
+        Takes ``tokens`` from the bucket, sleeping until enough are
+        available. Returns False instead of sleeping if ``blocking`` is
+        false and the bucket is short.
+        """
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return True
+            if not blocking:
+                return False
+            self._sleep(wait)
+
+    def try_acquire(self, tokens=1):
+        """
+        Takes ``tokens`` from the bucket if it holds enough and returns 0,
+        otherwise returns the seconds until it will.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+
+class RateLimiter(object):
+    """
+    Paces requests so a client stays within its Podio rate limit.
+
+    The bucket starts out with a full hour of requests and is corrected
+    from the X-Rate-Limit-Limit and X-Rate-Limit-Remaining headers of every
+    response. A 420 or 429 response empties it, so further requests are
+    spread out at the sustainable rate. One limiter can be shared by all
+    threads using a client.
+    """
+    throttled_statuses = (420, 429)
+
+    def __init__(self, limit=5000, period=3600, clock=time.time, sleep=time.sleep):
+        self.period = period
+        self.limit = limit
+        self.remaining = None
+        self.throttled = 0
+        self.bucket = TokenBucket(float(limit) / period, limit, clock=clock, sleep=sleep)
+
+    def acquire(self):
+        """Blocks until a request may be sent"""
+        self.bucket.acquire()
+
+    def try_acquire(self):
+        """
+        Returns 0 if a request may be sent now, otherwise the seconds to
+        wait before asking again. For callers that can't block, e.g.
+        coroutines.
+        """
+        return self.bucket.try_acquire()
+
+    def update(self, response):
+        """Adjusts the budget from the headers of an httplib2 response"""
+        limit = _int_header(response, 'x-rate-limit-limit')
+        remaining = _int_header(response, 'x-rate-limit-remaining')
+        if limit is not None and limit != self.limit:
+            self.limit = limit
+            self.bucket.configure(float(limit) / self.period, limit)
+        if remaining is not None:
+            self.remaining = remaining
+            if remaining < self.bucket.tokens:
+                self.bucket.set_tokens(remaining)
+        if response.status in self.throttled_statuses:
+            self.throttled += 1
+            self.bucket.set_tokens(0)
+
+    def budget(self):
+        """
+        Returns the current budget as a dict, for schedulers deciding how
+        much work to start.
+
+        :return: 'limit' and 'remaining' as last reported by Podio, 'tokens'
+                 requests that can be sent right now without waiting, 'rate'
+                 sustainable requests per second, and 'throttled' the number
+                 of throttled responses seen.
+        """
+        return {'limit': self.limit,
+                'remaining': self.remaining,
+                'tokens': int(self.bucket.tokens),
+                'rate': self.bucket.rate,
+                'throttled': self.throttled}
+
+
+def _int_header(response, name):
+    try:
+        return int(response[name])
+    except (KeyError, TypeError, ValueError):
+        return None
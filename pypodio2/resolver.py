@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Batched lookup of items by external ID.
+
+Item.find_all_by_external_id resolves one external ID per request. An
+ExternalIdResolver resolves many at once: they are grouped into Item.filter
+calls matching any of a batch of external IDs, the batches run
+concurrently, and results are remembered in a bounded LRU memo so that
+repeated lookups cost nothing:
+
+    resolver = ExternalIdResolver(c)
+    found = resolver.resolve(app_id, ['order-1', 'order-2', ...])
+    found['order-1']  # list of matching items, empty if none
+
+Apps where the filter is refused are resolved with one
+find_all_by_external_id call per external ID instead, concurrently as well.
+Calls run concurrently on a client created with ``pool_size``, one at a
+time on other clients.
+"""
+import threading
+
+from . import bulk
+from .cache import MemoryCache
+from .transport import TransportException
+
+
+def _status(error):
+    return getattr(error.status, 'status', error.status)
+
+
+def _as_items(data):
+    """The items of a find_all_by_external_id response"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        if 'items' in data:
+            return data['items'] or []
+        if 'item_id' in data:
+            return [data]
+    return []
+
+
+class ExternalIdResolver(object):
+    """
+    :param client: Podio client
+    :param batch_size: External IDs per filter call
+    :param workers: Number of calls run concurrently, by default 8 with a
+                    pooled client and 1 with others, which can't run more
+    :param max_entries: Number of (app, external ID) results remembered,
+                        0 to disable the memo
+
+    ``requests`` counts the API calls made, ``hits`` the lookups answered
+    by the memo.
+    """
+
+    def __init__(self, client, batch_size=100, workers=None, max_entries=10000):
+        workers = bulk.default_workers(client.transport, workers)
+        bulk.check_workers(client.transport, workers)
+        self.client = client
+        self.batch_size = batch_size
+        self.workers = workers
+        self.memo = MemoryCache(max_entries) if max_entries else None
+        self.requests = 0
+        self.hits = 0
+        self._unfilterable = set()
+        self._lock = threading.Lock()
+
+    def _count(self, requests=0, hits=0):
+        with self._lock:
+            self.requests += requests
+            self.hits += hits
+
+    def invalidate(self, app_id, external_id=None):
+        """Forgets the result for an external ID, or the whole memo"""
+        if self.memo is None:
+            return
+        if external_id is None:
+            self.memo.clear()
+        else:
+            self.memo.delete((app_id, external_id))
+
+    def resolve_one(self, app_id, external_id):
+        """The items of ``app_id`` with ``external_id``, see resolve()"""
+        return self.resolve(app_id, [external_id])[external_id]
+
+    def resolve(self, app_id, external_ids):
+        """
+        Returns a dict mapping each of ``external_ids`` to the list of items
+        of ``app_id`` that have it, empty if there are none. Errors other
+        than a refused filter are raised.
+        """
+        found = {}
+        missing = []
+        for external_id in external_ids:
+            if external_id in found:
+                continue
+            items = self.memo.get((app_id, external_id)) if self.memo is not None else None
+            if items is not None:
+                found[external_id] = list(items)
+                self._count(hits=1)
+            else:
+                found[external_id] = None
+                missing.append(external_id)
+        if not missing:
+            return found
+
+        singles = []
+        if app_id in self._unfilterable:
+            singles = missing
+        else:
+            batches = [missing[start:start + self.batch_size]
+                       for start in range(0, len(missing), self.batch_size)]
+            for result in bulk.run(lambda batch: self._filter(app_id, batch), batches,
+                                   self.workers):
+                if result.ok:
+                    self._remember(app_id, result.result, found)
+                elif isinstance(result.error, TransportException) and \
+                        _status(result.error) == 400:
+                    # This app can't be filtered by external ID
+                    self._unfilterable.add(app_id)
+                    singles.extend(result.operation)
+                else:
+                    raise result.error
+
+        for result in bulk.run(lambda external_id: self._find(app_id, external_id), singles,
+                               self.workers):
+            if not result.ok:
+                raise result.error
+            self._remember(app_id, {result.operation: result.result}, found)
+        return found
+
+    def _filter(self, app_id, batch):
+        """Looks up a batch with filter pages matching any of its external IDs"""
+        results = dict((external_id, []) for external_id in batch)
+        offset = 0
+        while True:
+            self._count(requests=1)
+            page = self.client.Item.filter(app_id, {'filters': {'external_id': batch},
+                                                    'limit': 500, 'offset': offset})
+            items = page.get('items') or []
+            for item in items:
+                if item.get('external_id') in results:
+                    results[item['external_id']].append(item)
+            offset += len(items)
+            if len(items) < 500 or offset >= page.get('filtered', offset):
+                return results
+
+    def _find(self, app_id, external_id):
+        self._count(requests=1)
+        try:
+            return _as_items(self.client.Item.find_all_by_external_id(app_id, external_id))
+        except TransportException as e:
+            if _status(e) == 404:
+                return []
+            raise
+
+    def _remember(self, app_id, results, found):
+        for external_id, items in results.items():
+            found[external_id] = items
+            if self.memo is not None:
+                self.memo.set((app_id, external_id), tuple(items))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Retrying of transient failures with exponential backoff and jitter.
+"""
+import random
+import socket
+import threading
+import time
+
+try:
+    from http.client import HTTPException
+except ImportError:
+    from httplib import HTTPException
+
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "PUT", "DELETE"))
+RETRYABLE_STATUSES = frozenset((420, 429, 500, 502, 503, 504))
+RETRYABLE_ERRORS = (socket.error, HTTPException)
+
+
+class RetryPolicy(object):
+    """
+    Decides whether a failed request is sent again, and how long to wait
+    before doing so.
+
+    :param max_attempts: Total number of attempts, including the first one
+    :param backoff_base: Delay in seconds before the first retry, doubled
+                         for every further retry
+    :param backoff_max: Upper bound of the delay in seconds
+    :param jitter: If true, the delay is drawn uniformly between zero and
+                   the exponential backoff ("full jitter"), so clients that
+                   failed together don't retry together
+    :param retry_statuses: HTTP statuses that are retried
+    :param methods: HTTP methods that are retried. Requests flagged as
+                    idempotent by their area (e.g. Item.filter) are
+                    retried regardless of their method.
+
+    A policy may be shared between threads; ``stats`` counts its retries.
+    """
+
+    def __init__(self, max_attempts=3, backoff_base=0.5, backoff_max=30.0, jitter=True,
+                 retry_statuses=RETRYABLE_STATUSES, methods=IDEMPOTENT_METHODS,
+                 sleep=time.sleep, random=random.random):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.methods = frozenset(methods)
+        self.stats = RetryStats()
+        self._sleep = sleep
+        self._random = random
+
+    def allows(self, method, idempotent=False):
+        return idempotent or method in self.methods
+
+    def should_retry(self, attempt, response=None, error=None):
+        """
+        True if a request that got ``response`` (or raised ``error``) on
+        its ``attempt``-th try should be sent again.
+        """
+        if error is not None:
+            retryable = isinstance(error, RETRYABLE_ERRORS)
+        else:
+            retryable = response.status in self.retry_statuses
+        if retryable and attempt >= self.max_attempts:
+            self.stats.record_give_up()
+            return False
+        return retryable
+
+    def backoff(self, attempt, response=None):
+        """Seconds to wait after the ``attempt``-th try"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        if self.jitter:
+            delay *= self._random()
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, min(self.backoff_max, retry_after))
+        return delay
+
+    def delay(self, attempt, response=None, error=None):
+        """Records a retry and returns its backoff, for callers that wait themselves"""
+        if error is not None:
+            reason = type(error).__name__
+        else:
+            reason = response.status
+        self.stats.record(reason)
+        return self.backoff(attempt, response)
+
+    def wait(self, attempt, response=None, error=None):
+        """Records a retry and sleeps for its backoff"""
+        self._sleep(self.delay(attempt, response, error))
+
+
+class RetryStats(object):
+    """Thread-safe retry counters, for monitoring"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.gave_up = 0
+        self.by_reason = {}
+
+    def record(self, reason):
+        with self._lock:
+            self.retries += 1
+            self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+
+    def record_give_up(self):
+        with self._lock:
+            self.gave_up += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {'retries': self.retries,
+                    'gave_up': self.gave_up,
+                    'by_reason': dict(self.by_reason)}
+
+
+def _retry_after(response):
+    try:
+        return float(response['retry-after'])
+    except (KeyError, TypeError, ValueError):
+        return None
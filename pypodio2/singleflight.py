@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Collapses concurrent identical calls into one.
+
+With HttpTransport(single_flight=SingleFlight()), a read request that is
+issued while an identical one is already on the wire waits for that one
+instead of being sent, and gets its response. This avoids a burst of
+duplicate requests when many threads look up the same app or space at
+once, e.g. on a cold start.
+"""
+import threading
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time. ``calls`` counts the calls
+    made, ``collapsed`` the ones that shared the result of another.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.collapsed = 0
+
+    def do(self, key, func):
+        """
+        Returns func(), or the result of the func() already running for
+        ``key``. Exceptions are raised in every waiting thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.collapsed += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Token stores let OAuth tokens outlive the process that requested them.
+
+An authorization object given a store looks for a usable token in it
+before asking Podio for a new one, and saves every token it gets. Any
+object with the methods of TokenStore can be used as a store.
+"""
+import contextlib
+import errno
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from ._fileutil import atomic_write
+
+
+class TokenStore(object):
+    """
+    Interface of token stores. Tokens are dicts as returned by
+    OAuthToken.to_dict, ``key`` identifies the grant they belong to.
+    """
+
+    def load(self, key):
+        """Returns the stored token, or None"""
+        raise NotImplementedError
+
+    def save(self, key, token):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """
+        Context manager held while a token is requested, so that only one
+        of the processes sharing the store asks Podio for it.
+        """
+        yield
+
+
+class MemoryTokenStore(TokenStore):
+    """Keeps tokens in memory, shared by the clients of one process"""
+
+    def __init__(self):
+        self._tokens = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def load(self, key):
+        token = self._tokens.get(key)
+        return dict(token) if token is not None else None
+
+    def save(self, key, token):
+        self._tokens[key] = dict(token)
+
+    def delete(self, key):
+        self._tokens.pop(key, None)
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.RLock())
+        with lock:
+            yield
+
+
+class FileTokenStore(MemoryTokenStore):
+    """
+    Keeps each token in a JSON file in ``directory``, readable only by its
+    owner. On POSIX systems the lock is an exclusive flock on a lock file
+    next to the token, so it also holds across processes.
+    """
+
+    def __init__(self, directory):
+        super(FileTokenStore, self).__init__()
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+
+    def _path(self, key, suffix='.json'):
+        return os.path.join(self.directory, key + suffix)
+
+    def load(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def save(self, key, token):
+        atomic_write(self._path(key), json.dumps(token).encode("utf-8"), 0o600)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        with super(FileTokenStore, self).lock(key):
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(self._path(key, '.lock'), os.O_WRONLY | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
@@ -1,15 +1,34 @@
 # -*- coding: utf-8 -*-
-from httplib2 import Http
+import contextlib
+import hashlib
+import socket
+import ssl
+import threading
+import time
+
+from httplib2 import Http, Response
 
 try:
-    from urllib.parse import urlencode
+    from http.client import HTTPConnection, HTTPException, HTTPSConnection
 except ImportError:
-    from urllib import urlencode
+    from httplib import HTTPConnection, HTTPException, HTTPSConnection
 
-from .encode import multipart_encode
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
+try:
+    from urllib.parse import urlencode, urlsplit
+except ImportError:
+    from urllib import urlencode
+    from urlparse import urlsplit
 
-import json
+from . import jsoncodec
+from .cache import CONDITIONAL_HEADERS
+from .compression import ACCEPT_ENCODING, TransferStats, decoder_for, gzip_compress
+from .encode import multipart_encode
+from .metrics import RequestInfo
 
 
 class OAuthToken(object):
@@ -24,46 +43,163 @@ class OAuthToken(object):
         self.expires_in = resp['expires_in']
         self.access_token = resp['access_token']
         self.refresh_token = resp['refresh_token']
+        self.expires_at = resp.get('expires_at') or time.time() + self.expires_in
+
+    def to_dict(self):
+        return {'expires_in': self.expires_in,
+                'expires_at': self.expires_at,
+                'access_token': self.access_token,
+                'refresh_token': self.refresh_token}
+
+    def expires_within(self, seconds):
+        return time.time() + seconds >= self.expires_at
 
     def to_headers(self):
         return {'authorization': "OAuth2 %s" % self.access_token}
 
 
-class OAuthAuthorization(object):
-    """Generates headers for Podio OAuth2 Authorization"""
+class BaseOAuthAuthorization(object):
+    """
+    Generates headers for Podio OAuth2 Authorization, refreshing the token
+    shortly before it expires.
+
+    Subclasses provide the grant used to get the first token, which is
+    also the fallback if the refresh token is rejected. Refreshes are
+    single-flight: when several threads find the token expired, one of
+    them refreshes it and the others use the result.
 
-    def __init__(self, login, password, key, secret, domain):
-        body = {'grant_type': 'password',
-                'client_id': key,
-                'client_secret': secret,
-                'username': login,
-                'password': password}
-        h = Http(disable_ssl_certificate_validation=True)
+    With a ``token_store`` (see pypodio2.tokenstore) tokens are shared with
+    other processes: a stored token that is still valid is used instead of
+    a new grant, and every new token is saved.
+    """
+    # Seconds before expiry at which the token is refreshed
+    refresh_margin = 60
+
+    def __init__(self, key, secret, domain, token_store=None):
+        self.key = key
+        self.secret = secret
+        self.domain = domain
+        self.token_store = token_store
+        self._lock = threading.Lock()
+        self.token = None
+        with self._store_lock():
+            self.token = self._load_token()
+            if self.token is None:
+                self.token = self._request_token(self._grant())
+                self._save_token()
+
+    def _grant(self):
+        raise NotImplementedError
+
+    def _identity(self):
+        """What the grant authenticates as, used to key the token store"""
+        raise NotImplementedError
+
+    def store_key(self):
+        identity = "\0".join(str(part) for part in
+                             (self.domain, self.key) + tuple(self._identity()))
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def identity(self):
+        """Who requests are made as; unlike the token, stable across refreshes"""
+        return self.store_key()
+
+    def _store_lock(self):
+        if self.token_store is None:
+            return _nullcontext()
+        return self.token_store.lock(self.store_key())
+
+    def _load_token(self):
+        """Returns a stored token that is newer than ours and still valid"""
+        if self.token_store is None:
+            return None
+        stored = self.token_store.load(self.store_key())
+        if not stored:
+            return None
+        token = OAuthToken(stored)
+        if token.expires_within(self.refresh_margin):
+            return None
+        if self.token is not None and token.access_token == self.token.access_token:
+            return None
+        return token
+
+    def _save_token(self):
+        if self.token_store is not None:
+            self.token_store.save(self.store_key(), self.token.to_dict())
+
+    def _request_token(self, body):
+        body.update(client_id=self.key, client_secret=self.secret)
+        h = _default_http()
         headers = {'content-type': 'application/x-www-form-urlencoded'}
-        response, data = h.request(domain + "/oauth/token", "POST",
+        response, data = h.request(self.domain + "/oauth/token", "POST",
                                    urlencode(body), headers=headers)
-        self.token = OAuthToken(_handle_response(response, data))
+        return OAuthToken(_handle_response(response, data))
+
+    def refresh(self, stale_headers=None):
+        """
+        Replaces the token. If ``stale_headers`` are given, the token is
+        only replaced if they are still the current ones, so that threads
+        that got a 401 together refresh once.
+        """
+        with self._lock, self._store_lock():
+            if stale_headers is not None and \
+                    stale_headers.get('authorization') != self.token.to_headers()['authorization']:
+                return True
+            stored = self._load_token()
+            if stored is not None:
+                # Another process has refreshed it already
+                self.token = stored
+                return True
+            try:
+                self.token = self._request_token({'grant_type': 'refresh_token',
+                                                  'refresh_token': self.token.refresh_token})
+            except TransportException:
+                self.token = self._request_token(self._grant())
+            self._save_token()
+        return True
+
+    def refresh_due(self):
+        """True if the next call will refresh the token first"""
+        return self.token.expires_within(self.refresh_margin)
 
     def __call__(self):
+        token = self.token
+        if token.expires_within(self.refresh_margin):
+            self.refresh(token.to_headers())
         return self.token.to_headers()
 
 
-class OAuthAppAuthorization(object):
+class OAuthAuthorization(BaseOAuthAuthorization):
+    """Generates headers for Podio OAuth2 Authorization"""
 
-    def __init__(self, app_id, app_token, key, secret, domain):
-        body = {'grant_type': 'app',
-                'client_id': key,
-                'client_secret': secret,
-                'app_id': app_id,
-                'app_token': app_token}
-        h = Http(disable_ssl_certificate_validation=True)
-        headers = {'content-type': 'application/x-www-form-urlencoded'}
-        response, data = h.request(domain + "/oauth/token", "POST",
-                                   urlencode(body), headers=headers)
-        self.token = OAuthToken(_handle_response(response, data))
+    def __init__(self, login, password, key, secret, domain, token_store=None):
+        self.login = login
+        self.password = password
+        super(OAuthAuthorization, self).__init__(key, secret, domain, token_store)
 
-    def __call__(self):
-        return self.token.to_headers()
+    def _identity(self):
+        return 'password', self.login
+
+    def _grant(self):
+        return {'grant_type': 'password',
+                'username': self.login,
+                'password': self.password}
+
+
+class OAuthAppAuthorization(BaseOAuthAuthorization):
+
+    def __init__(self, app_id, app_token, key, secret, domain, token_store=None):
+        self.app_id = app_id
+        self.app_token = app_token
+        super(OAuthAppAuthorization, self).__init__(key, secret, domain, token_store)
+
+    def _identity(self):
+        return 'app', self.app_id
+
+    def _grant(self):
+        return {'grant_type': 'app',
+                'app_id': self.app_id,
+                'app_token': self.app_token}
 
 
 class UserAgentHeaders(object):
@@ -76,6 +212,15 @@ class UserAgentHeaders(object):
         headers['User-Agent'] = self.user_agent
         return headers
 
+    def refresh(self, stale_headers=None):
+        return refresh_headers(self.base_headers_factory, stale_headers)
+
+    def identity(self):
+        return headers_identity(self.base_headers_factory)
+
+    def refresh_due(self):
+        return headers_refresh_due(self.base_headers_factory)
+
 
 class KeepAliveHeaders(object):
 
@@ -87,6 +232,48 @@ class KeepAliveHeaders(object):
         headers['Connection'] = 'Keep-Alive'
         return headers
 
+    def refresh(self, stale_headers=None):
+        return refresh_headers(self.base_headers_factory, stale_headers)
+
+    def identity(self):
+        return headers_identity(self.base_headers_factory)
+
+    def refresh_due(self):
+        return headers_refresh_due(self.base_headers_factory)
+
+
+def refresh_headers(headers_factory, stale_headers=None):
+    """
+    Asks a headers factory to renew its credentials. Returns False if it
+    has none to renew.
+    """
+    refresh = getattr(headers_factory, 'refresh', None)
+    if refresh is None:
+        return False
+    return refresh(stale_headers)
+
+
+def headers_refresh_due(headers_factory):
+    """
+    True if calling a headers factory will renew its credentials first,
+    which blocks while the new token is requested.
+    """
+    refresh_due = getattr(headers_factory, 'refresh_due', None)
+    if refresh_due is None:
+        return False
+    return refresh_due()
+
+
+def headers_identity(headers_factory):
+    """
+    Returns a stable identifier of whom a headers factory authenticates
+    as, or None if it can't tell.
+    """
+    identity = getattr(headers_factory, 'identity', None)
+    if identity is None:
+        return None
+    return identity()
+
 
 class TransportException(Exception):
 
@@ -99,50 +286,539 @@ class TransportException(Exception):
         return "TransportException(%s): %s" % (self.status, self.content)
 
 
+class _CountingConnection(object):
+    """Proxy of an http.client connection counting response body bytes"""
+
+    def __init__(self, connection):
+        self.__dict__['_connection'] = connection
+        self.__dict__['wire_bytes'] = 0
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+    def getresponse(self):
+        response = self._connection.getresponse()
+        read = response.read
+
+        def counting_read(*args):
+            data = read(*args)
+            self.__dict__['wire_bytes'] += len(data)
+            return data
+
+        response.read = counting_read
+        return response
+
+
+class CountingHttp(Http):
+    """
+    httplib2.Http that keeps the size of compressed response bodies as
+    received, in '-content-length', next to the '-content-encoding' that
+    httplib2 keeps once it decoded the body.
+    """
+
+    def _conn_request(self, conn, request_uri, method, body, headers):
+        counting = _CountingConnection(conn)
+        response, content = Http._conn_request(self, counting, request_uri, method, body,
+                                               headers)
+        if '-content-encoding' in response:
+            response['-content-length'] = str(counting.wire_bytes)
+        return response, content
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of httplib2.Http instances.
+
+    httplib2.Http is not safe to share between threads, but each instance
+    keeps one keep-alive connection per host. Handing out a whole Http
+    object per request therefore gives at most ``size`` concurrent
+    keep-alive connections per host. Idle instances are reused most
+    recently used first so warm connections are preferred.
+    """
+
+    def __init__(self, size=10, http_factory=None):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self._http_factory = http_factory or _default_http
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Blocks until a connection is available and returns it"""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self._http_factory()
+            except Exception:
+                self._slots.release()
+                raise
+
+    def release(self, http):
+        self._idle.put(http)
+        self._slots.release()
+
+    def request(self, *args, **kwargs):
+        """Same signature as httplib2.Http.request"""
+        http = self.acquire()
+        try:
+            return http.request(*args, **kwargs)
+        finally:
+            self.release(http)
+
+
+class StreamingResponse(object):
+    """
+    A response whose body has not been read yet. ``response`` holds the
+    status and headers as an httplib2.Response; the body is read with
+    read() or iter_chunks(). Close it (or use it as a context manager) when
+    done, which returns a fully read connection to its StreamingHttp.
+    """
+
+    def __init__(self, http_response, connection, streaming_http=None):
+        self.response = Response(http_response)
+        self.status = self.response.status
+        self._http_response = http_response
+        self._connection = connection
+        self._streaming_http = streaming_http
+        self._decoder = decoder_for(self.response.get('content-encoding'))
+        if self._decoder is not None:
+            # Like httplib2, keep the original headers under other names
+            # since they no longer describe the body that is read
+            self.response['-content-encoding'] = self.response.pop('content-encoding')
+            if 'content-length' in self.response:
+                self.response['-content-length'] = self.response.pop('content-length')
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+
+    def _read_raw(self, size=None):
+        data = self._http_response.read() if size is None else self._http_response.read(size)
+        self.wire_bytes += len(data)
+        return data
+
+    def read(self, size=None):
+        """
+        Reads and decodes up to ``size`` bytes of the body, or all of it.
+        gzip and deflate encoded bodies are decoded incrementally.
+        """
+        if self._decoder is None:
+            data = self._read_raw(size)
+        elif size is None:
+            data = self._decoder.decode(self._read_raw()) + self._decoder.flush()
+        else:
+            while True:
+                encoded = self._decoder.unconsumed_tail or self._read_raw(size)
+                if not encoded:
+                    data = self._decoder.flush()
+                    break
+                data = self._decoder.decode(encoded, size)
+                if data:
+                    break
+        self.decoded_bytes += len(data)
+        return data
+
+    def iter_chunks(self, chunk_size=65536):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        stats = getattr(self._streaming_http, 'stats', None)
+        if stats is not None:
+            stats.record_response(self.wire_bytes, self.decoded_bytes, self._decoder is not None)
+        if self._streaming_http is not None and self._http_response.isclosed() and \
+                not self._http_response.will_close:
+            self._streaming_http.release(connection)
+        else:
+            self._http_response.close()
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StreamingHttp(object):
+    """
+    Sends requests whose response body is read incrementally. httplib2
+    always reads whole bodies into memory, so this uses http.client
+    directly. Connections whose response was read completely are kept for
+    reuse, at most ``max_idle`` per host.
+    """
+
+    def __init__(self, timeout=None, max_idle=10, stats=None):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.stats = stats
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, key):
+        scheme, host, port = key
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        if scheme == 'https':
+            connection = HTTPSConnection(host, port, timeout=self.timeout,
+                                         context=ssl._create_unverified_context())
+        else:
+            connection = HTTPConnection(host, port, timeout=self.timeout)
+        connection._pypodio2_key = key
+        return connection, False
+
+    def release(self, connection):
+        with self._lock:
+            idle = self._idle.setdefault(connection._pypodio2_key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """Closes all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def request(self, uri, method="GET", body=None, headers=None):
+        """Like httplib2.Http.request, but returns (response, StreamingResponse)"""
+        parts = urlsplit(uri)
+        secure = parts.scheme == 'https'
+        key = (parts.scheme, parts.hostname, parts.port or (443 if secure else 80))
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = dict(headers or {})
+        names = set(name.lower() for name in headers)
+        if 'accept-encoding' not in names and 'range' not in names:
+            headers['accept-encoding'] = ACCEPT_ENCODING
+        while True:
+            connection, reused = self._connect(key)
+            try:
+                connection.request(method, path, body, headers)
+                stream = StreamingResponse(connection.getresponse(), connection, self)
+            except (socket.error, HTTPException):
+                connection.close()
+                if reused:
+                    # The server dropped an idle keep-alive connection
+                    continue
+                raise
+            return stream.response, stream
+
+
+class Request(object):
+    """
+    Accumulates the method and path of a single call on a transport.
+
+    A new Request is created for every attribute lookup on HttpTransport,
+    so the state of one call is never shared with calls made from other
+    threads.
+    """
+
+    def __init__(self, transport, method="GET"):
+        self._transport = transport
+        self._method = method
+        self._attribute_stack = []
+
+    def __call__(self, *args, **kwargs):
+        self._attribute_stack += [str(a) for a in args]
+        return self._transport.request(self._method, self._attribute_stack, kwargs)
+
+    def __getitem__(self, name):
+        self._attribute_stack.append(name)
+        return self
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name in self._transport._supported_methods:
+            self._method = name
+        elif not name.endswith(')'):
+            self._attribute_stack.append(name)
+        return self
+
+
+class CallerTransport(object):
+    """
+    View of a transport that passes ``caller``, the 'Area.method' making
+    the requests, as a request option, for hooks to see in RequestInfo.
+    """
+
+    def __init__(self, transport, caller):
+        self.transport = transport
+        self.caller = caller
+
+    def request(self, method, attribute_stack, kwargs):
+        kwargs.setdefault('caller', self.caller)
+        return self.transport.request(method, attribute_stack, kwargs)
+
+    def call(self, endpoint, *args, **kwargs):
+        kwargs.setdefault('caller', self.caller)
+        return self.transport.call(endpoint, *args, **kwargs)
+
+    def __call__(self, *args, **kwargs):
+        return Request(self)(*args, **kwargs)
+
+    def __getitem__(self, name):
+        return Request(self)[name]
+
+    def __getattr__(self, name):
+        # Attributes of the transport itself, e.g. thread_safe, are shared;
+        # anything else starts a request like it does on the transport
+        if name.startswith('_') or name in vars(self.transport) or \
+                hasattr(type(self.transport), name):
+            return getattr(self.transport, name)
+        return getattr(Request(self), name)
+
+
 class HttpTransport(object):
-    def __init__(self, url, headers_factory):
+    _request_options = ('retry', 'idempotent', 'cb', 'stream', 'headers', 'caller')
+
+    def __init__(self, url, headers_factory, pool_size=None, rate_limiter=None,
+                 retry_policy=None, streaming_http=None, cache=None, hooks=None,
+                 single_flight=None, compress_min_size=None):
         self._api_url = url
         self._headers_factory = headers_factory
         self._supported_methods = ("GET", "POST", "PUT", "HEAD", "DELETE",)
-        self._attribute_stack = []
-        self._method = "GET"
-        self._posts = []
-        self._http = Http(disable_ssl_certificate_validation=True)
-        self._params = {}
+        if pool_size is None:
+            self._http = _default_http()
+        else:
+            self._http = ConnectionPool(pool_size)
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.transfer_stats = TransferStats()
+        self.compress_min_size = compress_min_size
+        self._streaming_http = streaming_http or StreamingHttp()
+        if self._streaming_http.stats is None:
+            self._streaming_http.stats = self.transfer_stats
+        self.cache = cache
+        self.hooks = list(hooks or ())
+        self.single_flight = single_flight
         self._url_template = '%(domain)s/%(generated_url)s'
         self._stack_collapser = "/".join
         self._params_template = '?%s'
 
     def __call__(self, *args, **kwargs):
-        self._attribute_stack += [str(a) for a in args]
-        self._params = kwargs
+        return Request(self)(*args, **kwargs)
+
+    @property
+    def thread_safe(self):
+        """True if requests may be sent from several threads at once"""
+        return isinstance(self._http, ConnectionPool)
+
+    def request(self, method, attribute_stack, kwargs):
+        url, body, headers, handler, options = self._prepare(method, attribute_stack, kwargs)
+        return self._execute(method, url, body, headers, handler, options)
+
+    def call(self, endpoint, *args, **kwargs):
+        """
+        Requests a precompiled endpoints.Endpoint. ``args`` fill its path,
+        ``body`` is sent as JSON unless it is bytes (then ``type`` is its
+        content type), request options work as for the other calls and any
+        other keyword argument is a query parameter.
+
+        This skips the URL building of the attribute based calls, e.g.
+        ``transport.call(endpoints.ITEM_FIND, 42)``.
+        """
+        body = kwargs.pop('body', None)
+        content_type = kwargs.pop('type', None)
+        handler = kwargs.pop('handler', None)
+        options = {}
+        if kwargs:
+            for name in self._request_options:
+                if name in kwargs:
+                    options[name] = kwargs.pop(name)
+        url = endpoint.url(self._api_url, args, kwargs)
 
         headers = self._headers_factory()
-
-        if 'url' not in kwargs:
-            url = self.get_url()
+        if options:
+            headers.update(options.get('headers') or {})
+        if body is not None:
+            if not isinstance(body, bytes):
+                body = jsoncodec.dumps(body)
+                content_type = content_type or 'application/json'
+            if content_type is not None:
+                headers['content-type'] = content_type
+            body = self._encode_body(body, headers)
+        if handler is None:
+            handler = _handle_stream_response if options.get('stream') else _handle_response
+        return self._execute(endpoint.method, url, body, headers, handler, options)
+
+    def _execute(self, method, url, body, headers, handler, options):
+        """Sends a prepared request and returns what its handler makes of it"""
+        cache_key = None
+        if self.cache is not None and not options.get('stream'):
+            cache_key, cached = self.cache.prepare(method, url, headers,
+                                                   headers_identity(self._headers_factory))
+            if cached is not None:
+                return handler(*cached)
+        if self.single_flight is not None and self._collapsible(method, body, options):
+            # Identical reads in flight at the same time share one response
+            key = (method, url, body, tuple(sorted(headers.items())))
+            response, data = self.single_flight.do(
+                key, lambda: self._fetch(url, method, body, headers, options))
         else:
-            url = self.get_url(kwargs['url'])
+            response, data = self._fetch(url, method, body, headers, options)
+        if cache_key is not None:
+            cached = self.cache.update(cache_key, method, url, response, data)
+            if cached is None:
+                # Not modified, but the cached entry was evicted meanwhile
+                for name in CONDITIONAL_HEADERS:
+                    headers.pop(name, None)
+                response, data = self._fetch(url, method, body, headers, options)
+                cached = self.cache.update(cache_key, method, url, response, data)
+            response, data = cached or (response, data)
+        return handler(response, data)
 
-        if (self._method == "POST" or self._method == "PUT") and 'type' not in kwargs:
+    @staticmethod
+    def _collapsible(method, body, options):
+        if options.get('stream') or not isinstance(body, (bytes, str, type(None))):
+            return False
+        return method in ('GET', 'HEAD') or options.get('idempotent', False)
+
+    def _fetch(self, url, method, body, headers, options):
+        response, data = self._send_with_retries(url, method, body, headers, options)
+        if response is not None and response.status == 401 and \
+                refresh_headers(self._headers_factory, headers):
+            # The token was revoked or expired early, retry once with a new one
+            _discard(data)
+            headers.update(self._headers_factory())
+            response, data = self._send_with_retries(url, method, body, headers, options)
+        return response, data
+
+    def _send_with_retries(self, url, method, body, headers, options):
+        """
+        Sends a request, retrying it as allowed by the retry policy. The
+        'retry' option overrides the transport's policy for one request;
+        pass False to disable retries.
+        """
+        policy = options.get('retry', self.retry_policy)
+        stream = options.get('stream', False)
+        caller = options.get('caller')
+        if not policy or not policy.allows(method, options.get('idempotent', False)):
+            return self._send(url, method, body, headers, stream, caller=caller)
+
+        attempt = 1
+        while True:
+            try:
+                response, data = self._send(url, method, body, headers, stream, attempt,
+                                            caller)
+            except Exception as e:
+                if not policy.should_retry(attempt, error=e):
+                    raise
+                policy.wait(attempt, error=e)
+            else:
+                if not policy.should_retry(attempt, response=response):
+                    return response, data
+                _discard(data)
+                policy.wait(attempt, response=response)
+            attempt += 1
+
+    def _send(self, url, method, body, headers, stream=False, attempt=1, caller=None):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        http = self._streaming_http if stream else self._http
+        info = self._before_request(method, url, body, headers, attempt, caller)
+        try:
+            response, data = http.request(url, method, body=body, headers=headers)
+        except Exception as e:
+            self._on_error(info, e)
+            raise
+        if isinstance(response, Response) and isinstance(data, bytes):
+            # Streamed responses are counted when closed
+            self.transfer_stats.record_response(
+                int(response.get('-content-length', len(data))), len(data),
+                '-content-encoding' in response)
+        self._after_response(info, response, data)
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(response)
+        return response, data
+
+    def _before_request(self, method, url, body, headers, attempt=1, caller=None):
+        """Runs the before_request hooks, returns the RequestInfo or None"""
+        if not self.hooks:
+            return None
+        info = RequestInfo(method, url, body, headers, attempt, caller)
+        for hook in self.hooks:
+            hook.before_request(info)
+        return info
+
+    def _after_response(self, info, response, data):
+        if info is not None:
+            info.finish(response, data)
+            for hook in self.hooks:
+                hook.after_response(info, response, data)
+
+    def _on_error(self, info, error):
+        if info is not None:
+            info.finish()
+            for hook in self.hooks:
+                hook.on_error(info, error)
+
+    def _prepare(self, method, attribute_stack, kwargs):
+        """
+        Returns the (url, body, headers, handler, options) of a request.
+        Options are keyword arguments that configure the transport for this
+        request instead of being sent to Podio.
+        """
+        params = dict(kwargs)
+        options = dict((name, params.pop(name)) for name in self._request_options
+                       if name in params)
+        url = self.get_url(method, attribute_stack, params, params.pop('url', None))
+
+        headers = self._headers_factory()
+        headers.update(options.get('headers') or {})
+
+        if (method == "POST" or method == "PUT") and 'type' not in params:
             headers.update({'content-type': 'application/json'})
             # Not sure if this will always work, but for validate/verfiy nothing else was working:
-            body = json.dumps(kwargs)
-        elif 'type' in kwargs:
-            if kwargs['type'] == 'multipart/form-data':
-                body, new_headers = multipart_encode(kwargs['body'])
-                body = "".join(body)
+            body = jsoncodec.dumps(dict((k, v) for k, v in params.items() if k != 'handler'))
+        elif 'type' in params:
+            if params['type'] == 'multipart/form-data':
+                # The encoded body is streamed to the socket block by block,
+                # using the Content-Length computed by multipart_encode
+                body, new_headers = multipart_encode(params['body'], cb=options.get('cb'),
+                                                     reuse_buffer=True)
                 headers.update(new_headers)
             else:
-                body = kwargs['body']
-                headers.update({'content-type': kwargs['type']})
+                body = params['body']
+                headers.update({'content-type': params['type']})
         else:
-            body = self._generate_body()  # hack
-        response, data = self._http.request(url, self._method, body=body, headers=headers)
+            body = self._generate_body(method, params)  # hack
 
-        self._attribute_stack = []
-        handler = kwargs.get('handler', _handle_response)
-        return handler(response, data)
+        body = self._encode_body(body, headers)
+
+        if options.get('stream'):
+            default_handler = _handle_stream_response
+        else:
+            default_handler = _handle_response
+        return url, body, headers, params.get('handler', default_handler), options
+
+    def _encode_body(self, body, headers):
+        """Gzips large JSON bodies if enabled, and counts request bytes"""
+        if isinstance(body, bytes) and headers.get('content-type') == 'application/json':
+            compress = self.compress_min_size is not None and len(body) >= self.compress_min_size
+            if compress:
+                raw_size, body = len(body), gzip_compress(body)
+                headers['content-encoding'] = 'gzip'
+            self.transfer_stats.record_request(len(body), raw_size if compress else len(body),
+                                               compress)
+        return body
 
     def _generate_params(self, params):
         body = self._params_template % urlencode(params)
@@ -150,9 +826,9 @@ class HttpTransport(object):
             return ''
         return body
 
-    def _generate_body(self):
-        if self._method == 'POST':
-            internal_params = self._params.copy()
+    def _generate_body(self, method, params):
+        if method == 'POST':
+            internal_params = params.copy()
 
             if 'GET' in internal_params:
                 del internal_params['GET']
@@ -168,26 +844,25 @@ class HttpTransport(object):
         """Clear all headers"""
         self._headers = {}
 
-    def get_url(self, url=None):
+    def get_url(self, method, attribute_stack, params, url=None):
         if url is None:
             url = self._url_template % {
                 "domain": self._api_url,
-                "generated_url": self._stack_collapser(self._attribute_stack),
+                "generated_url": self._stack_collapser(attribute_stack),
             }
         else:
             url = self._url_template % {
                 'domain': self._api_url,
                 'generated_url': url[1:]
             }
-            del self._params['url']
 
-        if len(self._params):
-            internal_params = self._params.copy()
+        if len(params):
+            internal_params = params.copy()
 
             if 'handler' in internal_params:
                 del internal_params['handler']
 
-            if self._method == 'POST' or self._method == "PUT":
+            if method == 'POST' or method == "PUT":
                 if "GET" not in internal_params:
                     return url
                 internal_params = internal_params['GET']
@@ -195,22 +870,42 @@ class HttpTransport(object):
         return url
 
     def __getitem__(self, name):
-        self._attribute_stack.append(name)
-        return self
+        return Request(self)[name]
 
     def __getattr__(self, name):
-        if name in self._supported_methods:
-            self._method = name
-        elif not name.endswith(')'):
-            self._attribute_stack.append(name)
-        return self
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(Request(self), name)
+
+
+@contextlib.contextmanager
+def _nullcontext():
+    yield
+
+
+def _default_http():
+    return CountingHttp(disable_ssl_certificate_validation=True)
+
+
+def _discard(data):
+    """Releases the connection of an unwanted streamed response"""
+    if isinstance(data, StreamingResponse):
+        data.close()
+
+
+def _handle_stream_response(response, stream):
+    if response.status >= 400:
+        try:
+            data = stream.read()
+        finally:
+            stream.close()
+        _handle_response(response, data)
+    return stream
 
 
 def _handle_response(response, data):
-    if not data:
-        data = '{}'
-    else:
-        data = data.decode("utf-8")
     if response.status >= 400:
-        raise TransportException(response, data)
-    return json.loads(data)
+        raise TransportException(response, data.decode("utf-8") if data else '{}')
+    if not data:
+        return {}
+    return jsoncodec.loads(data)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Receiving side of Podio webhooks.
+
+A WebhookReceiver is a WSGI application to register as the URL of hooks
+created with Hook.create. It answers the verification handshake itself,
+and queues the other events instead of handling them in the request.
+Events that arrive within ``window`` seconds of each other are handled
+together: notifications for the same item are merged into one event, the
+items are then fetched concurrently, one request per item, and the
+handler gets the whole batch. A burst of item.update hooks thus costs one
+Item.find per changed item. Items are fetched concurrently on a client
+created with ``pool_size``, one at a time on other clients.
+
+    def handle(events):
+        for event in events:
+            if event.type == 'item.delete':
+                mirror.delete(event.item_id)
+            elif event.item is not None:
+                mirror.store_items(app_id, [event.item])
+
+    receiver = WebhookReceiver(c, handle, window=2.0)
+    wsgiref.simple_server.make_server('', 8080, receiver).serve_forever()
+"""
+import collections
+import threading
+import time
+
+from . import bulk
+
+try:
+    from urllib.parse import parse_qsl
+except ImportError:
+    from urlparse import parse_qsl
+
+ITEM_EVENTS = ('item.create', 'item.update', 'item.delete')
+
+
+class WebhookEvent(object):
+    """
+    One event, possibly merged from several notifications (``count``).
+
+    ``params`` are the parameters Podio posted, e.g. hook_id, item_id and
+    item_revision_id, those of the latest notification if merged. For
+    item events other than deletes, ``item`` holds the item as fetched
+    after the window, or ``error`` the exception fetching it raised.
+    """
+    __slots__ = ('type', 'params', 'count', 'item', 'error')
+
+    def __init__(self, type, params):
+        self.type = type
+        self.params = params
+        self.count = 1
+        self.item = None
+        self.error = None
+
+    @property
+    def hook_id(self):
+        return _int(self.params.get('hook_id'))
+
+    @property
+    def item_id(self):
+        return _int(self.params.get('item_id'))
+
+    def merge(self, other):
+        """Folds a later notification for the same object into this one"""
+        self.count += 1
+        self.params = other.params
+        if other.type == 'item.delete':
+            self.type = other.type
+        elif self.type == 'item.delete':
+            # Can't be updated after being deleted, the delete stands
+            pass
+        elif self.type != 'item.create':
+            self.type = other.type
+
+    def __repr__(self):
+        return 'WebhookEvent(%r, %r)' % (self.type, self.params)
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _key(event):
+    """Events with the same key are merged"""
+    if event.type in ITEM_EVENTS and event.item_id is not None:
+        return ('item', event.item_id)
+    return (event.type,) + tuple(sorted(event.params.items()))
+
+
+class WebhookReceiver(object):
+    """
+    :param client: Podio client, to validate hooks and fetch items
+    :param handler: Called with a list of WebhookEvents per batch, from a
+                    background thread
+    :param window: Seconds events are collected after the first one of a
+                   batch arrives
+    :param workers: Number of items fetched concurrently, by default 4
+                    with a pooled client (``pool_size``) and 1 with others,
+                    which can't fetch more
+    :param hook_ids: If given, notifications of other hooks are refused
+    :param fetch_items: Fetch the items of item events before calling the
+                        handler
+
+    ``stats`` counts notifications received, events handled, items
+    fetched and handler errors; the last handler error is kept in
+    ``last_error``.
+    """
+
+    def __init__(self, client, handler, window=1.0, workers=None, hook_ids=None,
+                 fetch_items=True):
+        workers = bulk.default_workers(client.transport, workers, pooled=4)
+        bulk.check_workers(client.transport, workers if fetch_items else 1)
+        self.client = client
+        self.handler = handler
+        self.window = window
+        self.workers = workers
+        self.hook_ids = set(hook_ids) if hook_ids is not None else None
+        self.fetch_items = fetch_items
+        self.stats = {'received': 0, 'events': 0, 'fetched': 0, 'handler_errors': 0}
+        self.last_error = None
+        self._pending = collections.OrderedDict()
+        self._first_at = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._process_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') != 'POST':
+            return self._respond(start_response, '405 Method Not Allowed')
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length) if length else b''
+        params = dict(parse_qsl(body.decode("utf-8")))
+        event_type = params.get('type')
+        if not event_type:
+            return self._respond(start_response, '400 Bad Request')
+        if self.hook_ids is not None and _int(params.get('hook_id')) not in self.hook_ids:
+            return self._respond(start_response, '403 Forbidden')
+
+        if event_type == 'hook.verify':
+            self.client.Hook.validate(params['hook_id'], params.get('code'))
+        else:
+            self.receive(WebhookEvent(event_type, params))
+        return self._respond(start_response, '200 OK')
+
+    @staticmethod
+    def _respond(start_response, status):
+        start_response(status, [('Content-Type', 'text/plain'), ('Content-Length', '0')])
+        return [b'']
+
+    def receive(self, event):
+        """Queues an event, merging it with a pending one for the same object"""
+        with self._condition:
+            self.stats['received'] += 1
+            key = _key(event)
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.merge(event)
+            else:
+                self._pending[key] = event
+            if self._first_at is None:
+                self._first_at = time.time()
+                self._condition.notify_all()
+
+    def _take(self):
+        events = list(self._pending.values())
+        self._pending.clear()
+        self._first_at = None
+        return events
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._first_at is None and not self._closed:
+                    self._condition.wait()
+                while self._first_at is not None and not self._closed:
+                    remaining = self._first_at + self.window - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+                events = self._take()
+            self._process(events)
+
+    def flush(self):
+        """Handles the pending events now, in the calling thread"""
+        with self._condition:
+            events = self._take()
+        self._process(events)
+
+    def close(self):
+        """Stops the background thread after handling the pending events"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def _fetch(self, events):
+        events = [event for event in events
+                  if event.type in ITEM_EVENTS and event.type != 'item.delete'
+                  and event.item_id is not None]
+        for result in bulk.run(lambda event: self.client.Item.find(event.item_id), events,
+                               self.workers):
+            event = result.operation
+            if result.ok:
+                event.item = result.result
+            else:
+                event.error = result.error
+        with self._condition:
+            self.stats['fetched'] += len(events)
+
+    def _process(self, events):
+        if not events:
+            return
+        with self._process_lock:
+            if self.fetch_items:
+                self._fetch(events)
+            try:
+                self.handler(events)
+            except Exception as e:
+                with self._condition:
+                    self.stats['handler_errors'] += 1
+                self.last_error = e
+            with self._condition:
+                self.stats['events'] += len(events)
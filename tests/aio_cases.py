@@ -0,0 +1,433 @@
+"""
+Unit tests for pypodio2.aio. Area calls are checked against a mocked
+connection pool, the pool itself against a local asyncio server.
+
+They need Python 3.5+ syntax and are collected through test_aio.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from mock import Mock
+from nose.tools import assert_raises, eq_
+
+from benchmarks.stub_server import StubServer
+from pypodio2 import jsoncodec
+from pypodio2.aio import AsyncClient, AsyncConnectionPool, AsyncHttpTransport
+from pypodio2.ratelimit import RateLimiter
+from pypodio2.retry import RetryPolicy
+from pypodio2.transport import TransportException
+from tests.utils import URL_BASE
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def get_client_and_http(returned_object):
+    transport = AsyncHttpTransport(URL_BASE, headers_factory=dict)
+    response = Mock()
+    response.status = 200
+    requests = []
+
+    async def request(url, method, body=None, headers=None):
+        requests.append((url, method, body, headers))
+        return response, json.dumps(returned_object).encode("utf-8")
+
+    transport._http.request = request
+    return AsyncClient(transport), requests
+
+
+def test_area_call_is_awaitable():
+    client, requests = get_client_and_http({'item_id': 5})
+    eq_({'item_id': 5}, run(client.Item.find(5)))
+    eq_([(URL_BASE + '/item/5', 'GET', None, {})], requests)
+
+
+def test_post_body():
+    client, requests = get_client_and_http({})
+    run(client.Item.filter(3, {'limit': 10}))
+    eq_((URL_BASE + '/item/app/3/filter/', 'POST', jsoncodec.dumps({'limit': 10}),
+         {'content-type': 'application/json'}), requests[0])
+
+
+def test_space_find_by_url():
+    client, _ = get_client_and_http({'space_id': 11})
+    eq_(11, run(client.Space.find_by_url('https://podio.com/x')))
+
+
+def get_paging_client(total):
+    """Client whose filter and app item pages hold items 1..total"""
+    transport = AsyncHttpTransport(URL_BASE, headers_factory=dict)
+    response = Mock()
+    response.status = 200
+    requests = []
+
+    async def request(url, method, body=None, headers=None):
+        requests.append((url, method, body))
+        if method == 'DELETE':
+            result = {}
+        else:
+            params = json.loads(body) if body else \
+                dict((name, int(value)) for name, value in parse_qsl(urlsplit(url).query))
+            ids = range(params['offset'] + 1, min(total, params['offset'] + params['limit']) + 1)
+            result = {'items': [{'item_id': i} for i in ids], 'filtered': total}
+        await asyncio.sleep(0)
+        return response, json.dumps(result).encode("utf-8")
+
+    transport._http.request = request
+    return AsyncClient(transport), requests
+
+
+def collect(iterator):
+    async def scenario():
+        results = []
+        async for value in iterator:
+            results.append(value)
+        return results
+    return run(scenario())
+
+
+def test_iter_filter_is_async_iterator():
+    client, requests = get_paging_client(5)
+    items = collect(client.Item.iter_filter(3, limit=2, prefetch=True))
+    eq_([1, 2, 3, 4, 5], [item['item_id'] for item in items])
+    eq_(3, len(requests))
+
+
+def test_hooks_see_caller():
+    callers = []
+    hook = Mock()
+    hook.before_request.side_effect = lambda request: callers.append(request.caller)
+    client, _ = get_paging_client(3)
+    client.transport.hooks.append(hook)
+    collect(client.Item.iter_filter(3, limit=2))
+    eq_(['Item.iter_filter', 'Item.iter_filter'], callers)
+
+
+def test_app_iter_items_and_schema():
+    client, requests = get_paging_client(3)
+    items = collect(client.Application.iter_items(3, limit=2))
+    eq_([1, 2, 3], [item['item_id'] for item in items])
+
+    client, _ = get_client_and_http({'app_id': 3, 'fields': [
+        {'field_id': 1, 'external_id': 'title', 'type': 'text', 'label': 'Title'}]})
+    eq_('title', run(client.Application.schema(3)).field(1).external_id)
+
+
+def test_bulk_delete():
+    client, requests = get_paging_client(0)
+    results = collect(client.Item.bulk_delete([1, 2, 3], workers=2, hook=False))
+    eq_([0, 1, 2], sorted(result.index for result in results))
+    assert all(result.ok for result in results), results
+    eq_(set([URL_BASE + '/item/%d?hook=false' % i for i in (1, 2, 3)]),
+        set(url for url, _, _ in requests))
+
+
+def with_stub_client(scenario, **server_options):
+    """Runs ``scenario(client)`` with an AsyncClient of a benchmarks stub server"""
+    server = StubServer(**server_options).start()
+
+    async def main():
+        client = AsyncClient(AsyncHttpTransport(server.url, headers_factory=dict,
+                                                max_concurrency=1))
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+    try:
+        return run(main())
+    finally:
+        server.stop()
+
+
+def test_incremental_filter_streams_items():
+    async def scenario(client):
+        items = await client.Item.filter(3, {'limit': 120}, incremental=True)
+        ids = []
+        async for item in items:
+            ids.append(item['item_id'])
+        # The connection went back to the pool, max_concurrency is 1
+        await client.Item.find(1)
+        return ids, items.meta
+
+    ids, meta = with_stub_client(scenario, items=150)
+    eq_(list(range(1, 121)), ids)
+    eq_({'filtered': 150, 'total': 150, 'items': []}, meta)
+
+
+def test_download_and_resume():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'file.bin')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 1000)
+        progress = []
+
+        async def scenario(client):
+            resumed = await client.Files.download(1, path, resume=True, chunk_size=1000,
+                                                  progress=lambda *args: progress.append(args))
+            complete = await client.Files.download(1, path, resume=True)
+            return resumed, complete
+
+        eq_((5000, 5000), with_stub_client(scenario, file_size=5000))
+        eq_((2000, 5000), progress[0])
+        eq_((5000, 5000), progress[-1])
+        eq_(5000, os.path.getsize(path))
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_streamed_error_is_raised_and_released():
+    async def scenario(client):
+        stream = await client.transport.GET(url='/file/1/raw', stream=True)
+        eq_(b'xxx', await stream.read(3))
+        stream.close()
+        try:
+            await client.transport.GET(url='/file/1/raw', stream=True,
+                                       headers={'range': 'bytes=10-'})
+        except TransportException as e:
+            # Both connections were released, max_concurrency is 1
+            await client.Item.find(1)
+            return e.status.status
+
+    eq_(416, with_stub_client(scenario, file_size=10))
+
+
+def get_replaying_transport(statuses, **kwargs):
+    """Transport answering its requests with ``statuses`` in turn"""
+    transport = AsyncHttpTransport(URL_BASE, **kwargs)
+    statuses = list(statuses)
+    requests = []
+
+    async def request(url, method, body=None, headers=None):
+        requests.append(dict(headers))
+        response = Mock()
+        response.status = statuses.pop(0)
+        response.__getitem__ = Mock(side_effect=KeyError)
+        return response, b'{}'
+
+    transport._http.request = request
+    return transport, requests
+
+
+def test_retries_transient_status():
+    policy = RetryPolicy(max_attempts=3, backoff_base=0)
+    transport, requests = get_replaying_transport([503, 502, 200], headers_factory=dict,
+                                                  retry_policy=policy)
+    eq_({}, run(AsyncClient(transport).Item.find(5)))
+    eq_(3, len(requests))
+    eq_(2, policy.stats.retries)
+
+
+def test_refreshes_token_on_401():
+    class Headers(object):
+        token = 'a'
+
+        def __call__(self):
+            return {'authorization': 'OAuth2 ' + self.token}
+
+        def refresh(self, stale_headers):
+            self.token = 'b'
+            return True
+
+    transport, requests = get_replaying_transport([401, 200], headers_factory=Headers())
+    eq_({}, run(AsyncClient(transport).Item.find(5)))
+    eq_(['OAuth2 a', 'OAuth2 b'], [headers['authorization'] for headers in requests])
+
+
+class SlowRefreshingHeaders(object):
+    """Headers whose token refresh blocks for a while, like an OAuth request"""
+    token = 'a'
+    due = False
+
+    def __call__(self):
+        if self.due:
+            self.refresh(None)
+        return {'authorization': 'OAuth2 ' + self.token}
+
+    def refresh_due(self):
+        return self.due
+
+    def refresh(self, stale_headers):
+        time.sleep(0.2)
+        self.token = 'b'
+        self.due = False
+        return True
+
+
+def ticks_during(transport, coroutine_function):
+    """Counts how often another coroutine runs while the request is made"""
+    async def scenario():
+        ticks = []
+        done = []
+
+        async def ticker():
+            while not done:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        result = await coroutine_function(AsyncClient(transport))
+        done.append(True)
+        await task
+        return result, len(ticks)
+    return run(scenario())
+
+
+def test_refresh_on_401_does_not_block_loop():
+    headers = SlowRefreshingHeaders()
+    transport, requests = get_replaying_transport([401, 200], headers_factory=headers)
+    result, ticks = ticks_during(transport, lambda client: client.Item.find(5))
+    eq_({}, result)
+    eq_(['OAuth2 a', 'OAuth2 b'], [request['authorization'] for request in requests])
+    assert ticks >= 5, ticks
+
+
+def test_refresh_before_expiry_does_not_block_loop():
+    headers = SlowRefreshingHeaders()
+    headers.due = True
+    transport, requests = get_replaying_transport([200], headers_factory=headers)
+    result, ticks = ticks_during(transport, lambda client: client.Item.find(5))
+    eq_(['OAuth2 b'], [request['authorization'] for request in requests])
+    assert ticks >= 5, ticks
+
+
+def test_rate_limiter_is_updated():
+    limiter = RateLimiter(limit=10)
+    transport, _ = get_replaying_transport([429, 200], headers_factory=dict,
+                                           rate_limiter=limiter)
+    assert_raises(TransportException, run, AsyncClient(transport).Item.find(5))
+    eq_(1, limiter.throttled)
+    eq_(0, limiter.budget()['tokens'])
+
+
+def serve(handler):
+    async def start():
+        server = await asyncio.start_server(handler, '127.0.0.1', 0)
+        return server, 'http://127.0.0.1:%s' % server.sockets[0].getsockname()[1]
+    return start()
+
+
+def test_pool_keeps_connections_alive():
+    connections = []
+
+    async def handler(reader, writer):
+        connections.append(writer)
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            while (await reader.readline()) != b"\r\n":
+                pass
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}")
+            await writer.drain()
+        writer.close()
+
+    async def scenario():
+        server, url = await serve(handler)
+        pool = AsyncConnectionPool(max_concurrency=4)
+        for _ in range(3):
+            response, data = await pool.request(url + '/item/1')
+            eq_(200, response.status)
+            eq_(b"{}", data)
+        await pool.close()
+        server.close()
+
+    run(scenario())
+    eq_(1, len(connections))
+
+
+def test_pool_reads_chunked_response():
+    async def handler(reader, writer):
+        while (await reader.readline()) != b"\r\n":
+            pass
+        writer.write(b"HTTP/1.1 201 Created\r\nTransfer-Encoding: chunked\r\n"
+                     b"Connection: close\r\n\r\n3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def scenario():
+        server, url = await serve(handler)
+        pool = AsyncConnectionPool()
+        response, data = await pool.request(url + '/', 'POST', body='x')
+        await pool.close()
+        server.close()
+        return response, data
+
+    response, data = run(scenario())
+    eq_(201, response.status)
+    eq_(b"abcde", data)
+
+
+def test_pool_streams_chunked_response():
+    async def handler(reader, writer):
+        while (await reader.readline()) != b"\r\n":
+            pass
+        writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n"
+                     b"Connection: close\r\n\r\n3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def scenario():
+        server, url = await serve(handler)
+        pool = AsyncConnectionPool()
+        response, stream = await pool.request(url + '/', stream=True)
+        async with stream:
+            chunks = []
+            async for chunk in stream.iter_chunks(2):
+                chunks.append(chunk)
+        await pool.close()
+        server.close()
+        return chunks
+
+    eq_([b"ab", b"c", b"de"], run(scenario()))
+
+
+def test_upload_streams_file_through_pool():
+    received = []
+
+    async def handler(reader, writer):
+        head = []
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            head.append(line.decode("latin-1"))
+        length = int([line for line in head if line.lower().startswith('content-length')][0]
+                     .split(':')[1])
+        received.append(await reader.readexactly(length))
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 15\r\nConnection: close\r\n\r\n'
+                     b'{"file_id": 42}')
+        await writer.drain()
+        writer.close()
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'report.txt')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100000)
+
+        async def scenario():
+            server, url = await serve(handler)
+            client = AsyncClient(AsyncHttpTransport(url, headers_factory=dict))
+            result = await client.Files.upload(path)
+            await client.close()
+            server.close()
+            return result
+
+        eq_({'file_id': 42}, run(scenario()))
+    finally:
+        shutil.rmtree(directory)
+    assert b'filename="report.txt"' in received[0]
+    assert b'x' * 100000 + b'\r\n--' in received[0]
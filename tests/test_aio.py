@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.aio, see tests/aio_cases.py. They are only
+imported on Python 3.5+ since they use async syntax.
+"""
+
+import sys
+
+if sys.version_info >= (3, 5):
+    from tests.aio_cases import *  # noqa
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.areas.Files (via pypodio2.client.Client). Works
+by mocking httplib2, and making assertions about how pypodio2 calls
+it.
+"""
+
+import email
+import io
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from mock import Mock, patch
+from nose.tools import eq_
+
+from pypodio2.client import Client
+from pypodio2.transport import HttpTransport
+from tests.utils import get_client_and_http, start_local_server, URL_BASE
+
+
+def mock_upload():
+    client, http = get_client_and_http()
+    response = Mock()
+    response.status = 200
+    http.request = Mock(return_value=(response, json.dumps({'file_id': 1}).encode("utf-8")))
+    body = object()
+    encode = Mock(return_value=(body, {'Content-Type': 'multipart/form-data; boundary=b',
+                                       'Content-Length': '1234'}))
+    return client, http, encode, body
+
+
+def test_create_streams_body():
+    client, http, encode, body = mock_upload()
+    progress = Mock()
+
+    with patch('pypodio2.transport.multipart_encode', encode):
+        result = client.Files.create('a.txt', 'data', cb=progress)
+
+    eq_({'file_id': 1}, result)
+    encode.assert_called_once_with({'filename': 'a.txt', 'source': 'data'}, cb=progress,
+                                   reuse_buffer=True)
+    http.request.assert_called_once_with(
+        URL_BASE + '/file/v2/', 'POST', body=body,
+        headers={'Content-Type': 'multipart/form-data; boundary=b',
+                 'Content-Length': '1234'})
+
+
+def test_upload_path():
+    client, http, encode, body = mock_upload()
+
+    with patch('pypodio2.transport.multipart_encode', encode), \
+            patch('pypodio2.areas.MultipartParam') as param:
+        client.Files.upload(__file__)
+
+    eq_('source', param.call_args[0][0])
+    eq_('test_areas_files.py', param.call_args[1]['filename'])
+    eq_(__file__, param.call_args[1]['fileobj'].name)
+    eq_({'filename': 'test_areas_files.py', 'source': param.return_value},
+        encode.call_args[0][0])
+
+
+class FakeStream(object):
+    def __init__(self, status, content):
+        self.status = status
+        self.response = {'content-length': str(len(content))}
+        self.chunks = [content[i:i + 3] for i in range(0, len(content), 3)]
+        self.closed = False
+
+    def iter_chunks(self, chunk_size):
+        return iter(self.chunks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+
+def mock_download(status, content):
+    client, _ = get_client_and_http()
+    stream = FakeStream(status, content)
+    client.transport._send = Mock(return_value=(stream, stream))
+    return client, stream
+
+
+def test_download_to_file_object():
+    client, stream = mock_download(200, b'abcdefgh')
+    dest = io.BytesIO()
+    progress = []
+
+    eq_(8, client.Files.download(5, dest, progress=lambda *args: progress.append(args)))
+
+    eq_(b'abcdefgh', dest.getvalue())
+    eq_([(3, 8), (6, 8), (8, 8)], progress)
+    assert stream.closed
+    args = client.transport._send.call_args[0]
+    eq_((URL_BASE + '/file/5/raw', 'GET', None,
+         {'accept-encoding': 'identity'}, True), args)
+
+
+def test_download_resumes_path():
+    client, stream = mock_download(206, b'defgh')
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'f')
+        with open(path, 'wb') as f:
+            f.write(b'abc')
+
+        eq_(8, client.Files.download(5, path, resume=True))
+
+        with open(path, 'rb') as f:
+            eq_(b'abcdefgh', f.read())
+        eq_({'range': 'bytes=3-', 'accept-encoding': 'identity'},
+            client.transport._send.call_args[0][3])
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_download_restarts_when_range_is_ignored():
+    client, stream = mock_download(200, b'abcdefgh')
+    dest = io.BytesIO()
+    dest.write(b'xyz')
+
+    eq_(8, client.Files.download(5, dest, resume=True))
+    eq_(b'abcdefgh', dest.getvalue())
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        UploadHandler.received.append((self.headers['Content-Type'], body))
+        self.send_response(200)
+        self.send_header('Content-Length', '14')
+        self.end_headers()
+        self.wfile.write(b'{"file_id": 3}')
+
+    def log_message(self, *args):
+        pass
+
+
+def test_upload_to_server():
+    server = start_local_server(UploadHandler)
+    content = b"\x00\xff" * 100000
+    try:
+        transport = HttpTransport('http://127.0.0.1:%s' % server.server_address[1], dict)
+        client = Client(transport)
+        eq_({'file_id': 3}, client.Files.create('a.bin', io.BytesIO(content)))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    content_type, body = UploadHandler.received[0]
+    message = email.message_from_bytes(
+        b"Content-Type: " + content_type.encode("ascii") + b"\r\n\r\n" + body)
+    parts = dict((part.get_param('name', header='content-disposition'), part)
+                 for part in message.get_payload())
+    eq_(b'a.bin', parts['filename'].get_payload(decode=True))
+    eq_(content, parts['source'].get_payload(decode=True))
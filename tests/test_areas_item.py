@@ -5,11 +5,10 @@ by mocking httplib2, and making assertions about how pypodio2 calls
 it.
 """
 
-import json
-
 from mock import Mock
 from nose.tools import eq_
 
+from pypodio2 import jsoncodec
 from tests.utils import check_client_method, get_client_and_http, URL_BASE
 
 
@@ -34,7 +33,7 @@ def test_filters():
     check_assertions(result,
                      'POST',
                      '/item/app/%s/filter/' % app_id,
-                     expected_body=json.dumps(attributes),
+                     expected_body=jsoncodec.dumps(attributes),
                      expected_headers={'content-type': 'application/json'})
 
 
@@ -47,7 +46,7 @@ def test_filter_by_view():
     check_assertions(result,
                      'POST',
                      '/item/app/{}/filter/{}'.format(app_id, view_id),
-                     expected_body=json.dumps({}),
+                     expected_body=jsoncodec.dumps({}),
                      expected_headers={'content-type': 'application/json'})
 
 
@@ -110,7 +109,7 @@ def test_create():
     check_assertions(result,
                      'POST',
                      '/item/app/%s/' % app_id,
-                     json.dumps(attributes),
+                     jsoncodec.dumps(attributes),
                      {'content-type': 'application/json'})
 
 
@@ -123,7 +122,7 @@ def test_update():
     check_assertions(result,
                      'PUT',
                      '/item/%s' % app_id,
-                     json.dumps(attributes),
+                     jsoncodec.dumps(attributes),
                      {'content-type': 'application/json'})
 
     client, check_assertions = check_client_method()
@@ -131,7 +130,7 @@ def test_update():
     check_assertions(result,
                      'PUT',
                      '/item/%s?silent=true' % app_id,
-                     json.dumps(attributes),
+                     jsoncodec.dumps(attributes),
                      {'content-type': 'application/json'})
 
 
@@ -144,7 +143,24 @@ def test_delete():
     result = client.Item.delete(item_id)
 
     eq_(None, result)
-    http.request.assert_called_once_with("%s/item/%s?" % (URL_BASE, item_id),
+    http.request.assert_called_once_with("%s/item/%s" % (URL_BASE, item_id),
                                          'DELETE',
                                          body=None,
                                          headers={})
+
+
+def test_delete_options():
+    client, http = get_client_and_http()
+    http.request = Mock(return_value=(None, None))
+
+    client.Item.delete(1, silent=True, hook=False)
+
+    url = http.request.call_args[0][0]
+    assert url.startswith("%s/item/1?" % URL_BASE)
+    eq_(set(['silent=true', 'hook=false']), set(url.split('?', 1)[1].split('&')))
+
+
+def test_find_by_external_id_is_quoted():
+    client, check_assertions = check_client_method()
+    result = client.Item.find_all_by_external_id(13, "it's a&b")
+    check_assertions(result, 'GET', '/item/app/13/v2/?external_id=it%27s+a%26b')
@@ -5,8 +5,7 @@ by mocking httplib2, and making assertions about how pypodio2 calls
 it.
 """
 
-import json
-
+from pypodio2 import jsoncodec
 from tests.utils import check_client_method
 
 
@@ -17,7 +16,7 @@ def test_create():
     client, check_assertions = check_client_method()
     result = client.View.create(app_id, view_details)
     check_assertions(result, 'POST', '/view/app/{}/'.format(app_id),
-                     json.dumps(view_details),
+                     jsoncodec.dumps(view_details),
                      {'content-type': 'application/json'})
 
 
@@ -69,7 +68,7 @@ def test_make_default():
     client, check_assertions = check_client_method()
     result = client.View.make_default(view_id)
     check_assertions(result, 'POST', '/view/{}/default'.format(view_id),
-                     expected_body=json.dumps({}),
+                     expected_body=jsoncodec.dumps({}),
                      expected_headers={'content-type': 'application/json'})
 
 
@@ -79,7 +78,7 @@ def test_update_last_view():
     client, check_assertions = check_client_method()
     result = client.View.update_last_view(app_id, attributes)
     check_assertions(result, 'PUT', '/view/app/{}/last'.format(app_id),
-                     expected_body=json.dumps(attributes),
+                     expected_body=jsoncodec.dumps(attributes),
                      expected_headers={'content-type': 'application/json'})
 
 
@@ -89,6 +88,6 @@ def test_update_view():
     client, check_assertions = check_client_method()
     result = client.View.update_view(view_id, attributes)
     check_assertions(result, 'PUT', '/view/{}'.format(view_id),
-                     expected_body=json.dumps(attributes),
+                     expected_body=jsoncodec.dumps(attributes),
                      expected_headers={'content-type': 'application/json'})
 
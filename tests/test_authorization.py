@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Unit tests for the OAuth authorization objects in pypodio2.transport.
+"""
+
+import json
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+from mock import Mock, patch
+from nose.tools import eq_
+
+from pypodio2 import transport
+from tests.utils import get_client_and_http
+
+
+def token_response(access_token, expires_in=28800, status=200):
+    response = Mock()
+    response.status = status
+    return response, json.dumps({'access_token': access_token,
+                                 'refresh_token': 'refresh-' + access_token,
+                                 'expires_in': expires_in}).encode("utf-8")
+
+
+def grants(http):
+    return [parse_qs(call[0][2]) for call in http.request.call_args_list]
+
+
+def authorize(*responses):
+    http = Mock()
+    http.request = Mock(side_effect=list(responses))
+    with patch('pypodio2.transport._default_http', return_value=http):
+        auth = transport.OAuthAuthorization('login', 'pw', 'key', 'secret',
+                                            'https://api.example.com')
+    return auth, http
+
+
+def test_password_grant():
+    auth, http = authorize(token_response('a'))
+    eq_({'authorization': 'OAuth2 a'}, auth())
+    eq_(['password'], grants(http)[0]['grant_type'])
+    eq_(['login'], grants(http)[0]['username'])
+
+
+def test_refreshes_before_expiry():
+    auth, http = authorize(token_response('a', expires_in=30), token_response('b'))
+    headers = transport.KeepAliveHeaders(auth)
+    eq_(True, transport.headers_refresh_due(headers))
+    with patch('pypodio2.transport._default_http', return_value=http):
+        eq_({'authorization': 'OAuth2 b'}, auth())
+    eq_(False, transport.headers_refresh_due(headers))
+    eq_(['refresh_token'], grants(http)[1]['grant_type'])
+    eq_(['refresh-a'], grants(http)[1]['refresh_token'])
+
+
+def test_falls_back_to_grant_when_refresh_is_rejected():
+    auth, http = authorize(token_response('a', expires_in=30),
+                           token_response('x', status=400),
+                           token_response('c'))
+    with patch('pypodio2.transport._default_http', return_value=http):
+        eq_({'authorization': 'OAuth2 c'}, auth())
+    eq_(['password'], grants(http)[2]['grant_type'])
+
+
+def test_stale_refresh_is_single_flight():
+    auth, http = authorize(token_response('a'), token_response('b'))
+    with patch('pypodio2.transport._default_http', return_value=http):
+        auth.refresh({'authorization': 'OAuth2 a'})
+        auth.refresh({'authorization': 'OAuth2 a'})
+    eq_(2, http.request.call_count)
+    eq_({'authorization': 'OAuth2 b'}, auth())
+
+
+def test_transport_retries_once_on_401():
+    client, http = get_client_and_http()
+    auth = Mock(side_effect=[{'authorization': 'OAuth2 a'}, {'authorization': 'OAuth2 b'}])
+    stale = []
+    auth.refresh = Mock(side_effect=lambda headers: stale.append(dict(headers)) or True)
+    client.transport._headers_factory = transport.KeepAliveHeaders(auth)
+    unauthorized, ok = Mock(), Mock()
+    unauthorized.status, ok.status = 401, 200
+    http.request = Mock(side_effect=[(unauthorized, b'{}'), (ok, b'{"a": 1}')])
+
+    eq_({'a': 1}, client.Item.find(1))
+    eq_([{'authorization': 'OAuth2 a', 'Connection': 'Keep-Alive'}], stale)
+    eq_('OAuth2 b', http.request.call_args[1]['headers']['authorization'])
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+Smoke test of the benchmark suite: every scenario runs once against the
+Podio stub without errors, so the suite stays usable in CI.
+"""
+
+from nose.tools import eq_
+
+from benchmarks import suite
+from benchmarks.stub_server import StubServer
+from pypodio2 import api
+
+
+def test_scenarios_run_against_stub():
+    server = StubServer(items=600, file_size=1000).start()
+    try:
+        client = api.OAuthClient('key', 'secret', 'user', 'password', domain=server.url)
+        for name, func, _ in suite.SCENARIOS:
+            eq_(0, suite.run(func, client, 1)['errors'], name)
+        eq_(600, len(list(client.Item.iter_filter(1))))
+    finally:
+        client.transport._streaming_http.close()
+        server.stop()
+
+
+def test_regressions():
+    baseline = {'a': {'throughput': 100.0, 'p50_ms': 10.0, 'p99_ms': 20.0}}
+    eq_([], suite.regressions({'a': {'throughput': 90.0, 'p50_ms': 11.0, 'p99_ms': 24.0}},
+                              baseline, 0.25))
+    eq_([('a', 'throughput', 100.0, 50.0), ('a', 'p99_ms', 20.0, 30.0)],
+        suite.regressions({'a': {'throughput': 50.0, 'p50_ms': 10.0, 'p99_ms': 30.0}},
+                          baseline, 0.25))
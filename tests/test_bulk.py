@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.bulk and the bulk item methods.
+"""
+
+import json
+import threading
+
+from mock import Mock
+from nose.tools import eq_, assert_raises
+
+from pypodio2 import bulk
+from pypodio2.transport import ConnectionPool, TransportException
+from tests.utils import get_client_and_http, URL_BASE
+
+
+def test_run_collects_failures():
+    def func(n):
+        if n % 3 == 0:
+            raise ValueError(n)
+        return n * 2
+
+    results = sorted(bulk.run(func, range(10), workers=4), key=lambda r: r.index)
+
+    eq_(list(range(10)), [r.operation for r in results])
+    eq_([0, 3, 6, 9], [r.index for r in results if not r.ok])
+    eq_([2, 4, 8, 10, 14, 16], [r.result for r in results if r.ok])
+    assert isinstance(results[3].error, ValueError)
+
+
+def test_run_consumes_input_lazily():
+    consumed = []
+    release = threading.Event()
+
+    def operations():
+        for n in range(100):
+            consumed.append(n)
+            yield n
+
+    results = bulk.run(lambda n: release.wait(5), operations(), workers=2)
+    thread = threading.Thread(target=lambda: next(results))
+    thread.start()
+    thread.join(0.2)
+    eq_(5, len(consumed))
+    release.set()
+    thread.join()
+    eq_(99, len(list(results)))
+
+
+def pooled_client():
+    client, http = get_client_and_http()
+    client.transport._http = ConnectionPool(4, http_factory=lambda: http)
+    return client, http
+
+
+def test_bulk_upsert():
+    client, http = pooled_client()
+    ok = Mock()
+    ok.status = 200
+    failed = Mock()
+    failed.status = 400
+
+    def request(url, method, body=None, headers=None):
+        if json.loads(body).get('fail'):
+            return failed, b'{"error": "invalid_value"}'
+        return ok, b'{"item_id": 5}'
+
+    http.request = Mock(side_effect=request)
+    items = [{'fields': {'title': 'new'}},
+             {'item_id': 7, 'fields': {'title': 'changed'}},
+             {'fail': True}]
+
+    results = sorted(client.Item.bulk_upsert(3, items, silent=True), key=lambda r: r.index)
+
+    eq_([True, True, False], [r.ok for r in results])
+    assert isinstance(results[2].error, TransportException)
+    calls = sorted((c[0][1], c[0][0]) for c in http.request.call_args_list)
+    eq_([('POST', URL_BASE + '/item/app/3/?silent=true'),
+         ('POST', URL_BASE + '/item/app/3/?silent=true'),
+         ('PUT', URL_BASE + '/item/7?silent=true')], calls)
+
+
+def test_bulk_delete():
+    client, http = pooled_client()
+    http.request = Mock(return_value=(None, None))
+    results = list(client.Item.bulk_delete([1, 2, 3], hook=False))
+    eq_(3, len(results))
+    eq_([URL_BASE + '/item/%d?hook=false' % n for n in (1, 2, 3)],
+        sorted(c[0][0] for c in http.request.call_args_list))
+
+
+def test_bulk_needs_pooled_client_for_workers():
+    client, http = get_client_and_http()
+    http.request = Mock(return_value=(None, None))
+    assert_raises(ValueError, client.Item.bulk_delete, [1], workers=8)
+    # Without pool_size the default is one request at a time
+    eq_([True, True], [r.ok for r in client.Item.bulk_delete([1, 2])])
+    eq_(1, bulk.default_workers(client.transport))
+    eq_(8, bulk.default_workers(pooled_client()[0].transport))
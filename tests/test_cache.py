@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.cache and its use by HttpTransport.
+"""
+
+import os
+import shutil
+import tempfile
+
+from httplib2 import Response
+from mock import Mock
+from nose.tools import eq_
+
+from pypodio2.cache import CacheEntry, FileCache, MemoryCache, ResponseCache
+from pypodio2.transport import KeepAliveHeaders
+from tests.utils import get_client_and_http, URL_BASE
+
+
+def response(status, **headers):
+    headers['status'] = str(status)
+    return Response(headers)
+
+
+def cached_client(cache, *responses):
+    client, http = get_client_and_http()
+    client.transport.cache = cache
+    http.request = Mock(side_effect=list(responses))
+    return client, http
+
+
+def test_fresh_response_is_served_from_cache():
+    cache = ResponseCache(ttls={'/app/': 60})
+    client, http = cached_client(cache, (response(200), b'{"app_id": 1}'))
+
+    eq_({'app_id': 1}, client.Application.find(1))
+    eq_({'app_id': 1}, client.Application.find(1))
+    eq_(1, http.request.call_count)
+    eq_(1, cache.hits)
+
+
+def test_stale_response_is_revalidated():
+    cache = ResponseCache(ttls={})
+    client, http = cached_client(cache,
+                                 (response(200, etag='"v1"', **{'last-modified': 'Mon'}),
+                                  b'{"item_id": 1}'),
+                                 (response(304), b''))
+
+    eq_({'item_id': 1}, client.Item.find(1))
+    eq_({'item_id': 1}, client.Item.find(1))
+    headers = http.request.call_args[1]['headers']
+    eq_('"v1"', headers['If-None-Match'])
+    eq_('Mon', headers['If-Modified-Since'])
+    eq_(1, cache.revalidated)
+
+
+def test_not_modified_after_eviction_is_fetched_again():
+    cache = ResponseCache(ttls={})
+    client, http = cached_client(cache,
+                                 (response(200, etag='"v1"'), b'{"item_id": 1}'),
+                                 (response(304), b''),
+                                 (response(200, etag='"v1"'), b'{"item_id": 1}'))
+
+    client.Item.find(1)
+    entry = list(cache.backend._entries.values())[0]
+    # Evicted by another thread between prepare() and the 304
+    cache.backend.get = Mock(side_effect=[entry, None, None])
+    eq_({'item_id': 1}, client.Item.find(1))
+    eq_(3, http.request.call_count)
+    assert 'If-None-Match' not in http.request.call_args[1]['headers']
+    # The entry and the index of its path
+    eq_(2, len(cache.backend))
+
+
+def test_uncacheable_response_is_not_stored():
+    cache = ResponseCache(ttls={})
+    client, http = cached_client(cache, (response(200), b'{}'), (response(200), b'{}'))
+    client.Item.find(1)
+    client.Item.find(1)
+    eq_(2, http.request.call_count)
+    eq_(0, len(cache.backend))
+
+
+def test_cache_is_per_authorization():
+    cache = ResponseCache(ttls={'/app/': 60})
+    client, http = cached_client(cache, (response(200), b'{"a": 1}'), (response(200), b'{"a": 2}'))
+    headers = [{'authorization': 'OAuth2 a'}, {'authorization': 'OAuth2 b'}]
+    client.transport._headers_factory = lambda: headers.pop(0)
+    eq_({'a': 1}, client.Application.find(1))
+    eq_({'a': 2}, client.Application.find(1))
+
+
+class RefreshingHeaders(object):
+    """Headers of a token that changes on every request, for one identity"""
+
+    def __init__(self, identity):
+        self.tokens = 0
+        self._identity = identity
+
+    def __call__(self):
+        self.tokens += 1
+        return {'authorization': 'OAuth2 token-%d' % self.tokens}
+
+    def identity(self):
+        return self._identity
+
+
+def test_cache_outlives_token_refreshes():
+    cache = ResponseCache(ttls={'/app/': 60})
+    client, http = cached_client(cache, (response(200), b'{"a": 1}'), (response(200), b'{"a": 2}'))
+    client.transport._headers_factory = KeepAliveHeaders(RefreshingHeaders('user-a'))
+    eq_({'a': 1}, client.Application.find(1))
+    eq_({'a': 1}, client.Application.find(1))
+    client.transport._headers_factory = KeepAliveHeaders(RefreshingHeaders('user-b'))
+    eq_({'a': 2}, client.Application.find(1))
+
+
+def test_large_responses_and_files_are_not_stored():
+    cache = ResponseCache(ttls={'/': 60}, max_entry_size=10)
+    client, http = cached_client(cache,
+                                 (response(200, etag='"x"'), b'{"long": "value"}'),
+                                 (response(200, etag='"x"'), b'raw'))
+    client.Item.find(1)
+    client.transport.GET(url='/file/3/raw', handler=lambda response, data: data)
+    eq_(0, len(cache.backend))
+
+
+def test_update_invalidates():
+    cache = ResponseCache(ttls={'/item/': 60})
+    client, http = cached_client(cache,
+                                 (response(200), b'{"v": 1}'),
+                                 (response(200), b'{}'),
+                                 (response(200), b'{"v": 2}'))
+    client.Item.find(1)
+    client.Item.update(1, {}, silent=True)
+    eq_({'v': 2}, client.Item.find(1))
+
+
+def test_update_invalidates_every_query_and_identity():
+    cache = ResponseCache(ttls={'/item/': 60})
+    client, http = cached_client(cache,
+                                 (response(200), b'{"v": 1}'),
+                                 (response(200), b'{"v": 1, "b": true}'),
+                                 (response(200), b'{}'),
+                                 (response(200), b'{"v": 2}'),
+                                 (response(200), b'{"v": 2, "b": true}'))
+    client.transport.GET(url='/item/1?mark_as_viewed=false')
+    headers = client.transport._headers_factory
+    client.transport._headers_factory = lambda: {'authorization': 'OAuth2 b'}
+    client.transport.GET(url='/item/1?mark_as_viewed=false')
+    client.transport._headers_factory = headers
+    client.Item.update(1, {})
+    eq_({'v': 2}, client.transport.GET(url='/item/1?mark_as_viewed=false'))
+    client.transport._headers_factory = lambda: {'authorization': 'OAuth2 b'}
+    eq_({'v': 2, 'b': True}, client.transport.GET(url='/item/1?mark_as_viewed=false'))
+    eq_(5, http.request.call_count)
+
+
+def test_head_leaves_cache_alone():
+    cache = ResponseCache(ttls={'/item/': 60})
+    client, http = cached_client(cache, (response(200), b'{"v": 1}'), (response(200), b''))
+    client.Item.find(1)
+    client.transport.HEAD(url='/item/1')
+    eq_({'v': 1}, client.Item.find(1))
+    eq_(2, http.request.call_count)
+    eq_(1, cache.hits)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    backend = MemoryCache(max_entries=2)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')
+    backend.set('c', 3)
+    eq_(None, backend.get('b'))
+    eq_(1, backend.get('a'))
+
+
+def test_file_cache():
+    directory = tempfile.mkdtemp()
+    try:
+        backend = FileCache(directory)
+        backend.set('k', CacheEntry({'etag': 'x'}, b'\x00{}', 12.5))
+        entry = backend.get('k')
+        eq_(({'etag': 'x'}, b'\x00{}', 12.5), (entry.headers, entry.content, entry.expires_at))
+        backend.delete('k')
+        eq_(None, backend.get('k'))
+
+        backend = FileCache(directory, max_entries=3)
+        backend.prune_interval = 5
+        for n in range(5):
+            backend.set('k%d' % n, CacheEntry({}, b'', 0))
+            os.utime(os.path.join(directory, 'k%d' % n), (n, n))
+        eq_(['k2', 'k3', 'k4'], sorted(os.listdir(directory)))
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_ttl_uses_longest_prefix():
+    cache = ResponseCache(ttls={'/app/': 10, '/app/space/': 20}, default_ttl=1)
+    eq_(20, cache.ttl(URL_BASE + '/app/space/3/'))
+    eq_(10, cache.ttl(URL_BASE + '/app/3'))
+    eq_(1, cache.ttl(URL_BASE + '/item/3'))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.compression and compressed transfers in
+HttpTransport.
+"""
+
+import json
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from nose.tools import eq_
+
+from pypodio2 import client, jsoncodec
+from pypodio2.compression import Decoder, decoder_for, gzip_compress
+from pypodio2.transport import HttpTransport, StreamingHttp
+from tests.utils import start_local_server
+
+DOCUMENT = {'items': [{'item_id': n, 'title': 'Item %d' % n} for n in range(2000)]}
+BODY = json.dumps(DOCUMENT).encode("utf-8")
+
+
+def test_decoders():
+    eq_(BODY, Decoder('gzip').decode(gzip_compress(BODY)))
+    eq_(BODY, Decoder('deflate').decode(zlib.compress(BODY)))
+    raw = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    eq_(BODY, Decoder('deflate').decode(raw.compress(BODY) + raw.flush()))
+    eq_(None, decoder_for('identity'))
+    eq_(None, decoder_for(None))
+
+
+class GzipHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    received = []
+
+    def do_GET(self):
+        body = BODY
+        self.send_response(200)
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip_compress(BODY)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        GzipHandler.received.append((self.headers.get('Content-Encoding'), body))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+def test_streamed_responses_are_decoded_incrementally():
+    server = start_local_server(GzipHandler)
+    http = StreamingHttp()
+    try:
+        url = 'http://127.0.0.1:%s/item/app/1/' % server.server_address[1]
+        response, stream = http.request(url)
+        eq_('gzip', response['-content-encoding'])
+        assert 'content-length' not in response
+        chunks = list(stream.iter_chunks(4096))
+        stream.close()
+        eq_(BODY, b''.join(chunks))
+        assert max(len(chunk) for chunk in chunks) <= 4096
+        eq_(len(gzip_compress(BODY)), stream.wire_bytes)
+        eq_(len(BODY), stream.decoded_bytes)
+    finally:
+        http.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_transfer_stats():
+    server = start_local_server(GzipHandler)
+    url = 'http://127.0.0.1:%s' % server.server_address[1]
+    transport = HttpTransport(url, dict, compress_min_size=1000)
+    podio = client.Client(transport)
+    try:
+        podio.Item.filter(1, DOCUMENT)
+        eq_(DOCUMENT, podio.transport.GET(url='/item/app/1/'))
+        with podio.transport.GET(url='/item/app/1/', stream=True) as stream:
+            eq_(BODY, stream.read())
+        podio.Item.filter(1, {'limit': 1})
+    finally:
+        transport._streaming_http.close()
+        server.shutdown()
+        server.server_close()
+
+    encoding, received = GzipHandler.received[0]
+    eq_('gzip', encoding)
+    eq_(DOCUMENT, json.loads(zlib.decompress(received, 16 + zlib.MAX_WBITS).decode("utf-8")))
+    eq_(None, GzipHandler.received[1][0])
+
+    stats = transport.transfer_stats.as_dict()
+    eq_(4, stats['responses'])
+    eq_(2, stats['compressed_responses'])
+    eq_(2 * len(BODY) + 4, stats['response_bytes'])
+    eq_(2 * len(gzip_compress(BODY)) + 4, stats['response_wire_bytes'])
+    eq_((2, 1), (stats['requests'], stats['compressed_requests']))
+    eq_(len(received) + len(jsoncodec.dumps({'limit': 1})), stats['request_wire_bytes'])
+    eq_(len(jsoncodec.dumps(DOCUMENT)) + len(jsoncodec.dumps({'limit': 1})), stats['request_bytes'])
+    assert transport.transfer_stats.saved > len(BODY)
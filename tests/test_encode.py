@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.encode.
+"""
+
+import email
+import io
+
+from nose.tools import eq_, assert_raises
+
+from pypodio2.encode import MultipartParam, get_body_size, multipart_encode
+
+
+def parse(datagen, headers):
+    body = b"".join(bytes(block) for block in datagen)
+    eq_(int(headers['Content-Length']), len(body))
+    message = email.message_from_bytes(
+        b"Content-Type: " + headers['Content-Type'].encode("ascii") + b"\r\n\r\n" + body)
+    return dict((part.get_param('name', header='content-disposition'), part)
+                for part in message.get_payload())
+
+
+def test_encodes_values_and_files():
+    content = bytes(bytearray(range(256))) * 1000
+    datagen, headers = multipart_encode([
+        ('filename', u'r\xe9sum\xe9.txt'),
+        MultipartParam('source', filename='a.bin', filetype='application/octet-stream',
+                       fileobj=io.BytesIO(content)),
+    ], blocksize=1000)
+
+    parts = parse(datagen, headers)
+
+    eq_(u'r\xe9sum\xe9.txt'.encode("utf-8"), parts['filename'].get_payload(decode=True))
+    eq_(content, parts['source'].get_payload(decode=True))
+    eq_('a.bin', parts['source'].get_filename())
+
+
+def test_reused_buffer_matches_copies():
+    content = b"0123456789" * 10000
+    datagen, _ = multipart_encode([MultipartParam('source', fileobj=io.BytesIO(content))],
+                                  boundary='b', blocksize=4096)
+    copied = b"".join(datagen)
+    datagen, _ = multipart_encode([MultipartParam('source', fileobj=io.BytesIO(content))],
+                                  boundary='b', blocksize=4096, reuse_buffer=True)
+    blocks = [bytes(block) for block in datagen]
+    eq_(copied, b"".join(blocks))
+    assert max(len(block) for block in blocks) <= 4096 + 200
+
+
+def test_boundary_in_file_data():
+    for reuse_buffer in (False, True):
+        for offset in range(8):
+            # The delimiter straddles the end of every block at some offset
+            data = io.BytesIO(b"x" * offset + b"\r\n--abc\r\n" * 3)
+            datagen, _ = multipart_encode([MultipartParam('f', fileobj=data)], boundary='abc',
+                                          blocksize=4, reuse_buffer=reuse_buffer)
+            assert_raises(ValueError, b"".join, datagen)
+
+
+def test_boundary_in_value():
+    datagen, _ = multipart_encode([('f', 'x\r\n--abc--')], boundary='abc')
+    assert_raises(ValueError, list, datagen)
+
+
+def test_reiterating_starts_over():
+    datagen, headers = multipart_encode([MultipartParam('f', fileobj=io.BytesIO(b"data"))])
+    first = b"".join(datagen)
+    eq_(first, b"".join(datagen))
+
+
+def test_progress_callback():
+    progress = []
+    datagen, headers = multipart_encode(
+        [MultipartParam('f', fileobj=io.BytesIO(b"x" * 10))], blocksize=4,
+        cb=lambda param, current, total: progress.append((current, total)))
+    b"".join(datagen)
+    total = int(headers['Content-Length'])
+    eq_(total, progress[-1][0])
+    assert all(t == total for _, t in progress)
+    eq_(sorted(progress), progress)
+
+
+def test_filename_is_escaped():
+    param = MultipartParam('f', value='v', filename=u'a"b\\☃.txt')
+    eq_('a\\"b\\\\&#9731;.txt', param.filename)
+    assert b'filename="a\\"b\\\\&#9731;.txt"' in param.encode_hdr('x')
+
+
+def test_body_size():
+    params = [('a', 'b'), ('c', u'\xe9')]
+    datagen, _ = multipart_encode(params, boundary='xyz')
+    eq_(len(b"".join(datagen)), get_body_size(params, 'xyz'))
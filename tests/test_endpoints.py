@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.endpoints and HttpTransport.call.
+"""
+
+from mock import Mock
+from nose.tools import eq_, assert_raises
+
+from pypodio2 import endpoints
+from pypodio2.endpoints import Endpoint
+from tests.utils import get_client_and_http, URL_BASE
+
+
+def test_url():
+    endpoint = Endpoint('GET', '/item/{item_id}/revision/{revision}')
+    eq_(('item_id', 'revision'), endpoint.args)
+    eq_('http://a/item/1/revision/2', endpoint.url('http://a', (1, 2)))
+    eq_('http://a/item/1/revision/2?fields=x&limit=5',
+        endpoint.url('http://a', (1, 2), {'fields': 'x', 'limit': 5}))
+    assert_raises(TypeError, endpoint.url, 'http://a', (1,))
+
+
+def test_query_schema():
+    endpoint = endpoints.ITEM_UPDATE
+    eq_('http://a/item/1', endpoint.url('http://a', (1,), {'silent': False, 'hook': True}))
+    eq_('http://a/item/1?silent=true&hook=false',
+        endpoint.url('http://a', (1,), {'silent': True, 'hook': False}))
+    assert_raises(TypeError, endpoint.url, 'http://a', (1,), {'limit': 1})
+
+
+def test_call():
+    client, http = get_client_and_http()
+    response = Mock()
+    response.status = 200
+    http.request = Mock(return_value=(response, b'{"item_id": 1}'))
+
+    eq_({'item_id': 1}, client.transport.call(endpoints.ITEM_FIND, 1, fields='items.view(micro)',
+                                              headers={'x-test': '1'}, retry=False))
+    http.request.assert_called_once_with(URL_BASE + '/item/1?fields=items.view%28micro%29',
+                                         'GET', body=None, headers={'x-test': '1'})
+
+    http.request.reset_mock()
+    client.transport.call(endpoints.ITEM_CREATE, 3, body=b'raw', type='text/plain', silent=True)
+    http.request.assert_called_once_with(URL_BASE + '/item/app/3/?silent=true', 'POST',
+                                         body=b'raw', headers={'content-type': 'text/plain'})
+
+    eq_('handled', client.transport.call(endpoints.APP_FIND, 1, handler=lambda r, d: 'handled'))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.export
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from mock import Mock
+from nose.tools import eq_
+
+from benchmarks.stub_server import StubServer
+from pypodio2.export import Exporter, OAuthClientFactory
+from pypodio2.transport import TransportException
+
+
+def read_lines(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        return [json.loads(line.decode("utf-8")) for line in f]
+
+
+def test_export_org_with_worker_processes():
+    server = StubServer(items=120, fields=2, spaces=2, apps=2).start()
+    directory = tempfile.mkdtemp()
+    try:
+        factory = OAuthClientFactory('key', 'secret', 'user', 'password', domain=server.url,
+                                     token_directory=os.path.join(directory, 'tokens'))
+        exporter = Exporter(factory, os.path.join(directory, 'out'), processes=2,
+                            compress=True, limit=50)
+        results = list(exporter.export_org(1))
+        eq_([10000, 10001, 10100, 10101], sorted(result.app_id for result in results))
+        assert all(result.ok and result.items == 120 for result in results), results
+
+        items = read_lines(exporter.path(10001))
+        eq_(list(range(1, 121)), [item['item_id'] for item in items])
+        with open(os.path.join(directory, 'out', 'manifest.json')) as f:
+            eq_({'path': exporter.path(10100), 'items': 120}, json.load(f)['apps']['10100'])
+
+        # A second run finds everything done
+        eq_([], list(Exporter(factory, os.path.join(directory, 'out')).export_org(1)))
+    finally:
+        server.stop()
+        shutil.rmtree(directory)
+
+
+def test_failed_apps_are_retried_by_the_next_run():
+    response = Mock()
+    response.status = 500
+    failing = set([2])
+
+    def filter(app_id, attributes, incremental):
+        if app_id in failing:
+            raise TransportException(response, '{}')
+        return [{'item_id': app_id}] if attributes['offset'] == 0 else []
+
+    client = Mock()
+    client.Item.filter.side_effect = filter
+    directory = tempfile.mkdtemp()
+    try:
+        results = list(Exporter(lambda: client, directory, processes=1).export([1, 2, 3]))
+        eq_([True, False, True], [result.ok for result in results])
+        assert 'TransportException' in results[1].error
+        eq_(['app-1.ndjson', 'app-3.ndjson', 'manifest.json'], sorted(os.listdir(directory)))
+
+        failing.clear()
+        results = list(Exporter(lambda: client, directory, processes=1).export([1, 2, 3]))
+        eq_([(2, 1)], [(result.app_id, result.items) for result in results])
+        eq_([{'item_id': 2}], read_lines(os.path.join(directory, 'app-2.ndjson')))
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2._fileutil
+"""
+
+import os
+import shutil
+import stat
+import tempfile
+
+from nose.tools import assert_raises, eq_
+
+from pypodio2._fileutil import atomic_open, atomic_write
+
+
+def test_atomic_write_replaces_file():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'f')
+        atomic_write(path, b'old')
+        atomic_write(path, b'new', 0o600)
+        with open(path, 'rb') as f:
+            eq_(b'new', f.read())
+        eq_(0o600, stat.S_IMODE(os.stat(path).st_mode))
+        eq_(['f'], os.listdir(directory))
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_failed_write_keeps_file_and_removes_temporary():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'f')
+        atomic_write(path, b'old')
+        with assert_raises(ValueError):
+            with atomic_open(path) as f:
+                f.write(b'half')
+                raise ValueError()
+        with open(path, 'rb') as f:
+            eq_(b'old', f.read())
+        eq_(['f'], os.listdir(directory))
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.jsoncodec
+"""
+
+from mock import Mock
+from nose.tools import eq_
+
+from pypodio2 import jsoncodec
+from pypodio2.transport import TransportException, _handle_response
+from tests.utils import get_client_and_http
+
+
+def codecs():
+    yield jsoncodec.StdlibCodec()
+    try:
+        yield jsoncodec.OrjsonCodec()
+    except ImportError:
+        pass
+
+
+def test_round_trip():
+    for codec in codecs():
+        data = codec.dumps({'fields': {1234: u'caf\xe9'}, 'limit': 10})
+        assert isinstance(data, bytes)
+        eq_({'fields': {'1234': u'caf\xe9'}, 'limit': 10}, codec.loads(data))
+        eq_([1], codec.loads(u'[1]'))
+
+
+def test_set_codec():
+    codec = Mock()
+    codec.dumps.return_value = b'{}'
+    codec.loads.return_value = {'decoded': True}
+    previous = jsoncodec.get_codec()
+    jsoncodec.set_codec(codec)
+    try:
+        client, http = get_client_and_http()
+        response = Mock()
+        response.status = 200
+        http.request = Mock(return_value=(response, b'{"item_id": 1}'))
+        eq_({'decoded': True}, client.Item.filter(1, {'limit': 5}))
+        codec.dumps.assert_called_once_with({'limit': 5})
+        codec.loads.assert_called_once_with(b'{"item_id": 1}')
+    finally:
+        jsoncodec.set_codec(previous)
+
+
+def test_handle_response():
+    response = Mock()
+    response.status = 200
+    eq_({}, _handle_response(response, b''))
+    eq_({'a': 1}, _handle_response(response, b'{"a": 1}'))
+    response.status = 404
+    try:
+        _handle_response(response, b'{"error": "not_found"}')
+    except TransportException as e:
+        eq_('{"error": "not_found"}', e.content)
+    else:
+        raise AssertionError("TransportException not raised")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.jsonstream
+"""
+
+import json
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from nose.tools import assert_raises, eq_
+
+from pypodio2 import client
+from pypodio2.compression import gzip_compress
+from pypodio2.jsonstream import ArrayParser
+from pypodio2.transport import HttpTransport, TransportException
+from tests.utils import start_local_server
+
+ITEMS = [
+    {'item_id': 1, 'title': 'Quote " and \\ backslash', 'tags': ['a', 'b']},
+    {'item_id': 2, 'title': 'Brackets ] } [ { and , commas', 'fields': [{'values': []}]},
+    {'item_id': 3, 'title': u'Unicode æøå \\"', 'nested': {'items': [1, 2]}},
+    [], 7, None, 'string',
+]
+PAGE = {'filtered': 7, 'total': 12, 'items': ITEMS, 'after': {'items': [99]}}
+
+
+def parse(document, key, chunk_size):
+    parser = ArrayParser(key)
+    elements = []
+    for start in range(0, len(document), chunk_size):
+        elements.extend(parser.feed(document[start:start + chunk_size]))
+    return elements, parser.close()
+
+
+def test_elements_at_any_chunk_boundary():
+    document = json.dumps(PAGE, indent=1).encode("utf-8")
+    for chunk_size in range(1, 40):
+        elements, meta = parse(document, 'items', chunk_size)
+        eq_(ITEMS, elements)
+        eq_({'filtered': 7, 'total': 12, 'items': [], 'after': {'items': [99]}}, meta)
+
+
+def test_top_level_array():
+    document = json.dumps(ITEMS).encode("utf-8")
+    for chunk_size in (1, 2, 5, len(document)):
+        eq_((ITEMS, []), parse(document, None, chunk_size))
+    eq_(([], []), parse(b' [ ] ', None, 1))
+
+
+def test_missing_key_and_incomplete_documents():
+    eq_(([], {'filtered': 0}), parse(b'{"filtered": 0}', 'items', 3))
+    parser = ArrayParser('items')
+    eq_([{'a': 1}], parser.feed(b'{"items": [{"a": 1}, {"a"'))
+    assert_raises(ValueError, parser.close)
+
+
+def test_buffer_holds_one_element():
+    parser = ArrayParser('items')
+    parser.feed(b'{"total": 3, "items": [')
+    for n in range(1000):
+        eq_([{'item_id': n}], parser.feed(json.dumps({'item_id': n}).encode("utf-8") + b', '))
+        assert len(parser._buf) < 20
+    parser.feed(b'{"item_id": 1000}]}')
+    eq_({'total': 3, 'items': []}, parser.close())
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, document):
+        body = gzip_compress(json.dumps(document).encode("utf-8"))
+        self.send_response(status)
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        if '/app/2/' in self.path:
+            self._send(403, {'error': 'forbidden'})
+        else:
+            self._send(200, PAGE)
+
+    def do_GET(self):
+        self._send(200, ITEMS)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_incremental_areas():
+    server = start_local_server(PageHandler)
+    transport = HttpTransport('http://127.0.0.1:%s' % server.server_address[1], dict)
+    podio = client.Client(transport)
+    try:
+        page = podio.Item.filter(1, {'limit': 500}, incremental=True)
+        eq_(None, page.meta)
+        eq_(ITEMS, list(page))
+        eq_(7, page.meta['filtered'])
+        eq_(ITEMS, list(podio.Stream.find_all_by_space_id(1, incremental=True)))
+        with podio.Stream.find_all(incremental=True) as stream:
+            eq_(ITEMS[0], next(iter(stream)))
+        assert_raises(TransportException, podio.Item.filter, 2, {}, incremental=True)
+        eq_(PAGE, podio.Item.filter(1, {}))
+    finally:
+        transport._streaming_http.close()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.metrics and the hooks of HttpTransport.
+"""
+
+import socket
+
+from mock import Mock
+from nose.tools import eq_, assert_raises
+
+from pypodio2 import endpoints, jsoncodec
+from pypodio2.metrics import MetricsCollector, TransportHooks, endpoint_template
+from pypodio2.retry import RetryPolicy
+from tests.utils import URL_BASE, get_client_and_http
+
+
+def response(status):
+    resp = Mock()
+    resp.status = status
+    return resp
+
+
+def test_endpoint_template():
+    eq_('/item/{id}', endpoint_template('https://api.podio.com/item/12?fields=x'))
+    eq_('/item/app/{id}/filter/', endpoint_template('https://api.podio.com/item/app/3/filter/'))
+    eq_('/space/url', endpoint_template('https://api.podio.com/space/url?url=x'))
+
+
+def test_hooks_see_every_request():
+    calls = []
+
+    class Recorder(TransportHooks):
+        def before_request(self, request):
+            calls.append(('before', request.method, request.endpoint, request.caller))
+
+        def after_response(self, request, resp, data):
+            calls.append(('after', request.status, request.request_bytes,
+                          request.response_bytes, request.elapsed >= 0))
+
+    client, http = get_client_and_http()
+    client.transport.hooks.append(Recorder())
+    http.request = Mock(return_value=(response(200), b'{"a": 1}'))
+
+    client.Item.filter(3, {'limit': 10})
+    eq_([('before', 'POST', '/item/app/{id}/filter/', 'Item.filter'),
+         ('after', 200, len(jsoncodec.dumps({'limit': 10})), 8, True)], calls)
+
+    del calls[:]
+    client.transport.GET(url='/user/status')
+    eq_(('before', 'GET', '/user/status', None), calls[0])
+
+
+def test_caller_is_request_option():
+    callers = []
+
+    class Recorder(TransportHooks):
+        def before_request(self, request):
+            callers.append((request.caller, request.url))
+
+    client, http = get_client_and_http()
+    client.transport.hooks.append(Recorder())
+    http.request = Mock(return_value=(response(200), b'{"app_id": 3, "fields": []}'))
+
+    client.Application.schema(3)
+    client.transport.call(endpoints.APP_FIND, 3, caller='Report.apps')
+    client.transport.GET(url='/app/3', caller='Report.apps')
+    eq_([('Application.schema', URL_BASE + '/app/3'), ('Report.apps', URL_BASE + '/app/3'),
+         ('Report.apps', URL_BASE + '/app/3')], callers)
+
+
+def test_collector_counts_statuses_retries_and_errors():
+    collector = MetricsCollector(buckets=(1.0,))
+    client, http = get_client_and_http()
+    client.transport.hooks.append(collector)
+    client.transport.retry_policy = RetryPolicy(sleep=lambda seconds: None)
+    http.request = Mock(side_effect=[(response(503), b''), (response(200), b'{}'),
+                                     socket.error("reset"), socket.error("reset"),
+                                     socket.error("reset")])
+
+    client.Item.find(1)
+    assert_raises(socket.error, client.Item.find, 2)
+
+    stats = collector.as_dict()['GET /item/{id}']
+    eq_(5, stats['requests'])
+    eq_(3, stats['retries'])
+    eq_(3, stats['errors'])
+    eq_({503: 1, 200: 1}, stats['statuses'])
+    eq_(2, stats['bytes_in'])
+    eq_({1.0: 5}, stats['latency_buckets'])
+
+
+def test_prometheus_export():
+    collector = MetricsCollector(buckets=(0.5,))
+    client, http = get_client_and_http()
+    client.transport.hooks.append(collector)
+    http.request = Mock(return_value=(response(200), b'{"a": 1}'))
+    client.Item.find(1)
+
+    text = collector.prometheus()
+    labels = 'method="GET",endpoint="/item/{id}"'
+    for line in ('# TYPE podio_requests_total counter',
+                 'podio_requests_total{%s,status="200"} 1' % labels,
+                 'podio_retries_total{%s} 0' % labels,
+                 'podio_response_bytes_total{%s} 8' % labels,
+                 '# TYPE podio_request_duration_seconds histogram',
+                 'podio_request_duration_seconds_bucket{%s,le="0.5"} 1' % labels,
+                 'podio_request_duration_seconds_bucket{%s,le="+Inf"} 1' % labels,
+                 'podio_request_duration_seconds_count{%s} 1' % labels):
+        assert line in text.splitlines(), line
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.mirror
+"""
+
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_raises, eq_
+
+from pypodio2.mirror import Mirror
+from tests.test_sync import fake_client, ids
+
+APP = {'app_id': 7, 'fields': [
+    {'field_id': 1, 'external_id': 'status', 'type': 'category', 'label': 'Status'},
+    {'field_id': 2, 'external_id': 'customer', 'type': 'app', 'label': 'Customer'},
+    {'field_id': 3, 'external_id': 'amount', 'type': 'number', 'label': 'Amount'},
+]}
+
+
+def item(item_id, second, status, customer=None, amount=None):
+    fields = [{'field_id': 1, 'external_id': 'status',
+               'values': [{'value': {'id': 1, 'text': status}}]}]
+    if customer is not None:
+        fields.append({'field_id': 2, 'external_id': 'customer',
+                       'values': [{'value': {'item_id': customer, 'title': 'Customer'}}]})
+    if amount is not None:
+        fields.append({'field_id': 3, 'external_id': 'amount', 'values': [{'value': amount}]})
+    return {'item_id': item_id, 'external_id': 'order-%d' % item_id,
+            'last_edit_on': '2024-05-01 10:00:%02d' % second, 'fields': fields}
+
+
+def mirror_client(items):
+    client = fake_client(items)
+    client.Application.find.return_value = APP
+    return client
+
+
+def test_lookups():
+    items = [item(1, 1, 'Open', customer=90, amount=5), item(2, 2, 'Done', customer=91),
+             item(3, 3, 'Open', amount=7.5)]
+    mirror = Mirror(mirror_client(items))
+    eq_(3, mirror.refresh(7))
+
+    eq_(items[1], mirror.item(2))
+    eq_(None, mirror.item(4))
+    eq_([1, 2, 3], ids(mirror.items(7)))
+    eq_([2], ids(mirror.find_by_external_id(7, 'order-2')))
+    eq_([], ids(mirror.find_by_external_id(8, 'order-2')))
+    eq_([1, 3], ids(mirror.find_by_value(7, 'status', 'Open')))
+    eq_([2], ids(mirror.find_by_value(7, 'customer', 91)))
+    eq_([3], ids(mirror.find_by_value(7, 3, 7.5)))
+    assert_raises(KeyError, mirror.find_by_value, 7, 'missing', 1)
+    eq_('amount', mirror.schema(7).field(3).external_id)
+
+    mirror.delete(1)
+    eq_([3], ids(mirror.find_by_value(7, 'status', 'Open')))
+
+
+def test_refresh_is_incremental_and_persistent():
+    items = [item(1, 1, 'Open'), item(2, 2, 'Open')]
+    client = mirror_client(items)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'mirror.sqlite')
+        mirror = Mirror(client, path)
+        eq_(2, mirror.refresh(7))
+        mirror.close()
+
+        items[0] = item(1, 3, 'Done')
+        mirror = Mirror(client, path)
+        eq_(1, mirror.refresh(7))
+        eq_([2], ids(mirror.find_by_value(7, 'status', 'Open')))
+        eq_([1], ids(mirror.find_by_value(7, 'status', 'Done')))
+        eq_({'last_edit_on': '2024-05-01 10:00:03', 'item_ids': [1]}, mirror.load(7))
+        mirror.close()
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.models
+"""
+
+from mock import Mock
+from nose.tools import eq_, assert_raises
+
+from pypodio2 import jsoncodec
+from pypodio2.models import AppSchema
+from tests.utils import get_client_and_http
+
+APP = {'app_id': 3, 'fields': [
+    {'field_id': 10, 'external_id': 'org-name', 'type': 'text', 'label': 'Name'},
+    {'field_id': 11, 'external_id': 'due', 'type': 'date', 'label': 'Due'},
+    {'field_id': 12, 'external_id': 'tags', 'type': 'category', 'label': 'Tags'},
+]}
+
+ITEM = {'item_id': 7, 'app_item_id': 1, 'title': 'Acme', 'fields': [
+    {'field_id': 10, 'external_id': 'org-name', 'type': 'text', 'label': 'Name',
+     'values': [{'value': 'Acme'}]},
+    {'field_id': 12, 'external_id': 'tags', 'type': 'category', 'label': 'Tags',
+     'values': [{'value': {'id': 1, 'text': 'a'}}, {'value': {'id': 2, 'text': 'b'}}]},
+    {'field_id': 11, 'external_id': 'due', 'type': 'date', 'label': 'Due',
+     'values': [{'start': '2024-05-01 10:00:00', 'end': None}]},
+]}
+
+
+def test_field_lookups():
+    schema = AppSchema.from_app(APP)
+    item = schema.item(ITEM)
+
+    eq_((7, 1, 'Acme'), (item.item_id, item.app_item_id, item.title))
+    eq_('Acme', item['org-name'])
+    eq_('Acme', item[10])
+    eq_({'start': '2024-05-01 10:00:00', 'end': None}, item['due'])
+    eq_([{'id': 1, 'text': 'a'}, {'id': 2, 'text': 'b'}], item.values('tags'))
+    assert_raises(KeyError, lambda: item['missing'])
+    eq_('default', item.get('missing', 'default'))
+    eq_(['org-name', 'due', 'tags'], [field.external_id for field in schema.fields])
+
+
+def test_empty_and_unknown_fields():
+    schema = AppSchema.from_app(APP)
+    item = schema.item({'item_id': 8, 'fields': [
+        {'field_id': 13, 'external_id': 'added-later', 'values': [{'value': 5}]}]})
+
+    eq_(None, item['org-name'])
+    eq_([], item.values('tags'))
+    eq_(5, item['added-later'])
+    eq_({'added-later': [5]}, item.to_dict())
+    # Items built before the field was added still work
+    eq_(None, schema.item(ITEM)['added-later'])
+
+
+def test_items_have_no_dict():
+    item = AppSchema.from_app(APP).item(ITEM)
+    assert not hasattr(item, '__dict__')
+    assert not hasattr(item.schema.fields[0], '__dict__')
+
+
+def test_application_schema():
+    client, http = get_client_and_http()
+    response = Mock()
+    response.status = 200
+    http.request = Mock(return_value=(response, jsoncodec.dumps(APP)))
+    schema = client.Application.schema(3)
+    eq_(3, schema.app_id)
+    eq_(11, schema.field('due').field_id)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.pagination and the paginating area methods.
+"""
+
+import json
+
+from mock import Mock
+from nose.tools import eq_
+
+from pypodio2.pagination import iter_items, iter_pages
+from tests.utils import get_client_and_http
+
+
+def fake_endpoint(total):
+    calls = []
+
+    def fetch_page(offset, limit):
+        calls.append((offset, limit))
+        items = list(range(offset, min(offset + limit, total)))
+        return {'filtered': total, 'total': total, 'items': items}
+
+    return fetch_page, calls
+
+
+def test_iter_items():
+    fetch_page, calls = fake_endpoint(7)
+    eq_(list(range(7)), list(iter_items(fetch_page, 3)))
+    eq_([(0, 3), (3, 3), (6, 3)], calls)
+
+
+def test_iter_items_exact_multiple():
+    fetch_page, calls = fake_endpoint(6)
+    eq_(list(range(6)), list(iter_items(fetch_page, 3)))
+    eq_([(0, 3), (3, 3)], calls)
+
+
+def test_iter_items_with_prefetch():
+    fetch_page, calls = fake_endpoint(10)
+    eq_(list(range(2, 10)), list(iter_items(fetch_page, 4, offset=2, prefetch=True)))
+    eq_([(2, 4), (6, 4)], calls)
+
+
+def test_prefetch_requests_next_page_before_yielding():
+    fetch_page, calls = fake_endpoint(10)
+    pages = iter_pages(fetch_page, 5, prefetch=True)
+    next(pages)
+    pages.close()
+    eq_(2, len(calls))
+
+
+def test_iter_pages_without_count_stops_on_short_page():
+    pages = [{'items': [1, 2]}, {'items': [3]}]
+    fetch_page = Mock(side_effect=pages)
+    eq_(pages, list(iter_pages(fetch_page, 2)))
+
+
+def respond_with_pages(http, pages):
+    response = Mock()
+    response.status = 200
+    http.request = Mock(side_effect=[(response, json.dumps(page).encode("utf-8"))
+                                     for page in pages])
+
+
+def test_item_iter_filter():
+    client, http = get_client_and_http()
+    respond_with_pages(http, [{'filtered': 3, 'items': [{'item_id': 1}, {'item_id': 2}]},
+                              {'filtered': 3, 'items': [{'item_id': 3}]}])
+
+    items = list(client.Item.iter_filter(42, {'sort_by': 'created_on'}, limit=2))
+
+    eq_([1, 2, 3], [item['item_id'] for item in items])
+    bodies = [json.loads(call[1]['body']) for call in http.request.call_args_list]
+    eq_([{'sort_by': 'created_on', 'offset': 0, 'limit': 2},
+         {'sort_by': 'created_on', 'offset': 2, 'limit': 2}], bodies)
+
+
+def test_application_iter_items():
+    client, http = get_client_and_http()
+    respond_with_pages(http, [{'total': 2, 'items': [{'item_id': 1}]},
+                              {'total': 2, 'items': [{'item_id': 2}]}])
+
+    items = list(client.Application.iter_items(42, limit=1))
+
+    eq_([1, 2], [item['item_id'] for item in items])
+    urls = [call[0][0] for call in http.request.call_args_list]
+    assert 'offset=1' in urls[1] and 'limit=1' in urls[1]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.ratelimit, using a fake clock.
+"""
+
+from httplib2 import Response
+from mock import Mock
+from nose.tools import eq_
+
+from pypodio2.ratelimit import RateLimiter, TokenBucket
+from tests.utils import get_client_and_http
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(2, 4, clock=clock, sleep=clock.sleep)
+    for _ in range(4):
+        bucket.acquire()
+    eq_(False, bucket.acquire(blocking=False))
+    clock.now += 1
+    eq_(2, bucket.tokens)
+
+
+def test_bucket_sleeps_until_token_available():
+    clock = FakeClock()
+    bucket = TokenBucket(4, 1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+    eq_([0.25], clock.slept)
+
+
+def test_try_acquire_returns_wait_instead_of_sleeping():
+    clock = FakeClock()
+    limiter = RateLimiter(limit=4, period=1, clock=clock, sleep=clock.sleep)
+    limiter.bucket.set_tokens(1)
+    eq_(0, limiter.try_acquire())
+    eq_(0.25, limiter.try_acquire())
+    eq_([], clock.slept)
+
+
+def rate_limit_response(status, limit, remaining):
+    return Response({'status': str(status),
+                     'x-rate-limit-limit': str(limit),
+                     'x-rate-limit-remaining': str(remaining)})
+
+
+def test_limiter_follows_headers():
+    clock = FakeClock()
+    limiter = RateLimiter(limit=5000, clock=clock, sleep=clock.sleep)
+    limiter.update(rate_limit_response(200, 1000, 10))
+    budget = limiter.budget()
+    eq_(1000, budget['limit'])
+    eq_(10, budget['remaining'])
+    eq_(10, budget['tokens'])
+    eq_(1000 / 3600.0, budget['rate'])
+
+
+def test_limiter_drains_on_throttle():
+    clock = FakeClock()
+    limiter = RateLimiter(limit=3600, clock=clock, sleep=clock.sleep)
+    limiter.update(rate_limit_response(420, 3600, 5))
+    limiter.acquire()
+    eq_([1.0], clock.slept)
+    eq_(1, limiter.budget()['throttled'])
+
+
+def test_transport_uses_limiter():
+    client, http = get_client_and_http()
+    limiter = Mock()
+    client.transport.rate_limiter = limiter
+    response = rate_limit_response(200, 5000, 4999)
+    http.request = Mock(return_value=(response, b'{}'))
+
+    client.Item.find(1)
+
+    limiter.acquire.assert_called_once_with()
+    limiter.update.assert_called_once_with(response)
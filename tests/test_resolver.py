@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.resolver
+"""
+
+from mock import Mock
+from nose.tools import assert_raises, eq_
+
+from pypodio2.resolver import ExternalIdResolver
+from pypodio2.transport import TransportException
+
+ITEMS = dict(('ext-%d' % n, {'item_id': n, 'external_id': 'ext-%d' % n})
+             for n in range(0, 300, 2))
+
+
+def error(status):
+    response = Mock()
+    response.status = status
+    return TransportException(response, '{}')
+
+
+def filter(app_id, attributes):
+    wanted = attributes['filters']['external_id']
+    items = [ITEMS[external_id] for external_id in wanted if external_id in ITEMS]
+    return {'filtered': len(items), 'items': items[attributes['offset']:][:500]}
+
+
+def find_all_by_external_id(app_id, external_id):
+    if external_id not in ITEMS:
+        raise error(404)
+    return {'items': [ITEMS[external_id]]}
+
+
+def make_client(filter_error=None):
+    client = Mock()
+    client.Item.filter.side_effect = filter_error or filter
+    client.Item.find_all_by_external_id.side_effect = find_all_by_external_id
+    return client
+
+
+def test_batches_and_memo():
+    client = make_client()
+    resolver = ExternalIdResolver(client, batch_size=100, workers=3)
+    external_ids = ['ext-%d' % n for n in range(250)]
+
+    found = resolver.resolve(1, external_ids + ['ext-0'])
+    eq_(250, len(found))
+    eq_([ITEMS['ext-4']], found['ext-4'])
+    eq_([], found['ext-5'])
+    eq_(3, client.Item.filter.call_count)
+    eq_(0, client.Item.find_all_by_external_id.call_count)
+
+    eq_([ITEMS['ext-6']], resolver.resolve_one(1, 'ext-6'))
+    eq_([], resolver.resolve_one(1, 'ext-7'))
+    eq_((3, 2), (resolver.requests, resolver.hits))
+
+    resolver.invalidate(1, 'ext-6')
+    resolver.resolve_one(1, 'ext-6')
+    eq_(4, client.Item.filter.call_count)
+
+
+def test_falls_back_to_single_lookups():
+    client = make_client(filter_error=error(400))
+    resolver = ExternalIdResolver(client, batch_size=2, workers=2)
+
+    found = resolver.resolve(1, ['ext-0', 'ext-1', 'ext-2'])
+    eq_({'ext-0': [ITEMS['ext-0']], 'ext-1': [], 'ext-2': [ITEMS['ext-2']]}, found)
+    eq_(3, client.Item.find_all_by_external_id.call_count)
+
+    # The app is known not to take the filter now
+    filter_calls = client.Item.filter.call_count
+    resolver.resolve(1, ['ext-4'])
+    eq_(filter_calls, client.Item.filter.call_count)
+
+
+def test_bounded_memo_and_errors():
+    client = make_client()
+    resolver = ExternalIdResolver(client, max_entries=2)
+    resolver.resolve(1, ['ext-0', 'ext-2', 'ext-4'])
+    eq_(2, len(resolver.memo))
+
+    resolver = ExternalIdResolver(make_client(filter_error=error(500)))
+    assert_raises(TransportException, resolver.resolve, 1, ['ext-0'])
+
+
+def test_needs_pooled_client_for_workers():
+    client = make_client()
+    client.transport.thread_safe = False
+    assert_raises(ValueError, ExternalIdResolver, client, workers=8)
+    resolver = ExternalIdResolver(client)
+    eq_(1, resolver.workers)
+    eq_([ITEMS['ext-0']], resolver.resolve_one(1, 'ext-0'))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.retry and the retrying in HttpTransport.
+"""
+
+import socket
+
+from mock import Mock
+from nose.tools import eq_, assert_raises
+
+from pypodio2.retry import RetryPolicy
+from pypodio2.transport import TransportException
+from tests.utils import get_client_and_http
+
+
+def response(status, headers=None):
+    resp = Mock()
+    resp.status = status
+    resp.__getitem__ = Mock(side_effect=(headers or {}).__getitem__)
+    return resp
+
+
+def policy(**kwargs):
+    sleeps = []
+    kwargs.setdefault('jitter', False)
+    return RetryPolicy(sleep=sleeps.append, **kwargs), sleeps
+
+
+def test_backoff_is_exponential_and_capped():
+    retry, _ = policy(backoff_base=1, backoff_max=5)
+    eq_([1, 2, 4, 5], [retry.backoff(attempt) for attempt in range(1, 5)])
+
+
+def test_backoff_with_jitter():
+    retry = RetryPolicy(backoff_base=2, random=lambda: 0.25)
+    eq_(1.0, retry.backoff(2))
+
+
+def test_backoff_honours_retry_after():
+    retry, _ = policy(backoff_base=1)
+    eq_(7.0, retry.backoff(1, response(429, {'retry-after': '7'})))
+
+
+def test_delay_records_retry_without_sleeping():
+    retry, sleeps = policy(backoff_base=1)
+    eq_(2, retry.delay(2, response(503)))
+    eq_([], sleeps)
+    eq_({503: 1}, retry.stats.as_dict()['by_reason'])
+
+
+def test_retries_transient_status():
+    client, http = get_client_and_http()
+    retry, sleeps = policy(backoff_base=1)
+    client.transport.retry_policy = retry
+    http.request = Mock(side_effect=[(response(503), b''), (response(200), b'{"a": 1}')])
+
+    eq_({'a': 1}, client.Item.find(1))
+    eq_(2, http.request.call_count)
+    eq_([1], sleeps)
+    eq_({'retries': 1, 'gave_up': 0, 'by_reason': {503: 1}}, retry.stats.as_dict())
+
+
+def test_retries_socket_errors_then_gives_up():
+    client, http = get_client_and_http()
+    retry, sleeps = policy(max_attempts=2)
+    client.transport.retry_policy = retry
+    http.request = Mock(side_effect=socket.error("reset"))
+
+    assert_raises(socket.error, client.Item.find, 1)
+    eq_(2, http.request.call_count)
+    eq_(1, retry.stats.gave_up)
+
+
+def test_does_not_retry_post():
+    client, http = get_client_and_http()
+    client.transport.retry_policy, _ = policy()
+    http.request = Mock(return_value=(response(503), b'{}'))
+
+    assert_raises(TransportException, client.Item.create, 1, {})
+    eq_(1, http.request.call_count)
+
+
+def test_retries_filter_despite_post():
+    client, http = get_client_and_http()
+    client.transport.retry_policy, _ = policy()
+    http.request = Mock(side_effect=[(response(502), b''), (response(200), b'{}')])
+
+    client.Item.filter(1, {})
+    eq_(2, http.request.call_count)
+
+
+def test_per_request_override():
+    client, http = get_client_and_http()
+    client.transport.retry_policy, _ = policy()
+    http.request = Mock(return_value=(response(503), b'{}'))
+
+    assert_raises(TransportException, client.Item.find, 1, retry=False)
+    eq_(1, http.request.call_count)
+
+    override, _ = policy(max_attempts=4)
+    http.request.reset_mock()
+    assert_raises(TransportException, client.Application.get_items, 1, retry=override)
+    eq_(4, http.request.call_count)
+    eq_('https://api.example.com/item/app/1/', http.request.call_args[0][0])
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.singleflight and its use in HttpTransport.
+"""
+
+import threading
+import time
+
+from mock import Mock
+from nose.tools import eq_
+
+from pypodio2.singleflight import SingleFlight
+from pypodio2.transport import ConnectionPool, HttpTransport
+from tests.utils import get_client_and_http, URL_BASE
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_threads(count, target):
+    results = [None] * count
+
+    def run(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_calls_are_collapsed():
+    flight = SingleFlight()
+    release = threading.Event()
+    func = Mock(side_effect=lambda: release.wait(5) and 'result')
+
+    threads, results = run_threads(8, lambda: flight.do('key', func))
+    wait_for(lambda: flight.collapsed == 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    eq_(['result'] * 8, results)
+    eq_(1, func.call_count)
+    eq_((1, 7), (flight.calls, flight.collapsed))
+    # Once done, the next call runs again
+    eq_('again', flight.do('key', lambda: 'again'))
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("boom")
+
+    threads, results = run_threads(3, lambda: flight.do('key', fail))
+    wait_for(lambda: flight.collapsed == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    eq_([ValueError] * 3, [type(result) for result in results])
+
+
+def test_transport_collapses_identical_reads():
+    client, http = get_client_and_http()
+    flight = SingleFlight()
+    client.transport._http = ConnectionPool(8, http_factory=lambda: http)
+    client.transport.single_flight = flight
+    release = threading.Event()
+    response = Mock()
+    response.status = 200
+
+    def request(url, method, body=None, headers=None):
+        release.wait(5)
+        return response, b'{"app_id": 1}'
+
+    http.request = Mock(side_effect=request)
+    threads, results = run_threads(5, lambda: client.Application.find(1))
+    wait_for(lambda: flight.collapsed == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    eq_([{'app_id': 1}] * 5, results)
+    eq_(5, len(set(id(result) for result in results)))
+    http.request.assert_called_once_with(URL_BASE + '/app/1', 'GET', body=None, headers={})
+
+
+def test_only_reads_are_collapsed():
+    collapsible = HttpTransport._collapsible
+    assert collapsible('GET', None, {})
+    assert collapsible('POST', b'{}', {'idempotent': True})
+    assert not collapsible('POST', b'{}', {})
+    assert not collapsible('DELETE', None, {})
+    assert not collapsible('GET', None, {'stream': True})
+    assert not collapsible('POST', iter([b'']), {'idempotent': True})
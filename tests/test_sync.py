@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.sync
+"""
+
+import os
+import shutil
+import tempfile
+
+from mock import Mock
+from nose.tools import eq_
+
+from pypodio2.sync import FileWatermarkStore, IncrementalSync, MemoryWatermarkStore
+
+
+def fake_client(items):
+    """A client whose Item.filter sorts and filters ``items`` like Podio"""
+    def filter(app_id, attributes):
+        since = attributes.get('filters', {}).get('last_edit_on', {}).get('from', '')
+        matching = sorted((item for item in items if item['last_edit_on'] >= since),
+                          key=lambda item: item['last_edit_on'])
+        offset, limit = attributes['offset'], attributes['limit']
+        return {'items': matching[offset:offset + limit], 'filtered': len(matching)}
+
+    client = Mock()
+    client.Item.filter = Mock(side_effect=filter)
+    return client
+
+
+def item(item_id, second):
+    return {'item_id': item_id, 'last_edit_on': '2024-05-01 10:00:%02d' % second}
+
+
+def ids(items):
+    return [item['item_id'] for item in items]
+
+
+def test_yields_only_changes_since_last_run():
+    items = [item(1, 1), item(2, 2), item(3, 3)]
+    store = MemoryWatermarkStore()
+    sync = IncrementalSync(fake_client(items), store, limit=2)
+
+    eq_([1, 2, 3], ids(sync.changes(7)))
+    eq_({'last_edit_on': '2024-05-01 10:00:03', 'item_ids': [3]}, store.load(7))
+    eq_([], ids(sync.changes(7)))
+
+    items[0]['last_edit_on'] = '2024-05-01 10:00:05'
+    items.append(item(4, 4))
+    eq_([4, 1], ids(sync.changes(7)))
+
+
+def test_items_sharing_a_timestamp():
+    items = [item(n, 1) for n in range(1, 6)] + [item(6, 2)]
+    client = fake_client(items)
+    sync = IncrementalSync(client, MemoryWatermarkStore(), limit=2)
+
+    eq_([1, 2, 3, 4, 5, 6], ids(sync.changes(7)))
+    items.append(item(7, 2))
+    eq_([7], ids(sync.changes(7)))
+
+
+def test_edits_during_sync_are_not_skipped():
+    items = [item(1, 1), item(2, 2), item(3, 3), item(4, 4)]
+    client = fake_client(items)
+    sync = IncrementalSync(client, MemoryWatermarkStore(), limit=2)
+
+    changes = sync.changes(7)
+    seen = [next(changes)['item_id'], next(changes)['item_id']]
+    # Item 1 is edited between pages; an offset based sync would skip 3
+    items[0]['last_edit_on'] = '2024-05-01 10:00:09'
+    seen.extend(ids(changes))
+    eq_([1, 2, 3, 4, 1], seen)
+
+
+def test_file_store():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'watermarks.json')
+        eq_(None, FileWatermarkStore(path).load(1))
+        FileWatermarkStore(path).save(1, {'last_edit_on': 'a', 'item_ids': [1]})
+        FileWatermarkStore(path).save(2, {'last_edit_on': 'b', 'item_ids': [2]})
+        eq_({'last_edit_on': 'a', 'item_ids': [1]}, FileWatermarkStore(path).load(1))
+        eq_({'last_edit_on': 'b', 'item_ids': [2]}, FileWatermarkStore(path).load(2))
+    finally:
+        shutil.rmtree(directory)
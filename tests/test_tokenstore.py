@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.tokenstore and its use by the authorizations.
+"""
+
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+from mock import Mock, patch
+from nose.tools import eq_
+
+from pypodio2 import transport
+from pypodio2.tokenstore import FileTokenStore, MemoryTokenStore
+from tests.test_authorization import grants, token_response
+
+
+def stored_token(access_token, expires_in=3600):
+    return {'access_token': access_token, 'refresh_token': 'r',
+            'expires_in': expires_in, 'expires_at': time.time() + expires_in}
+
+
+def authorize(store, *responses):
+    http = Mock()
+    http.request = Mock(side_effect=list(responses))
+    with patch('pypodio2.transport._default_http', return_value=http):
+        auth = transport.OAuthAppAuthorization(7, 'app-token', 'key', 'secret',
+                                               'https://api.example.com', token_store=store)
+    return auth, http
+
+
+def test_file_store_round_trip():
+    directory = tempfile.mkdtemp()
+    try:
+        store = FileTokenStore(os.path.join(directory, 'tokens'))
+        eq_(None, store.load('k'))
+        with store.lock('k'):
+            store.save('k', {'access_token': 'a'})
+        eq_({'access_token': 'a'}, store.load('k'))
+        eq_(0o600, stat.S_IMODE(os.stat(os.path.join(directory, 'tokens', 'k.json')).st_mode))
+        store.delete('k')
+        store.delete('k')
+        eq_(None, store.load('k'))
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_new_token_is_saved():
+    store = MemoryTokenStore()
+    auth, http = authorize(store, token_response('a'))
+    eq_('a', store.load(auth.store_key())['access_token'])
+    eq_(['app'], grants(http)[0]['grant_type'])
+
+
+def test_stored_token_skips_grant():
+    store = MemoryTokenStore()
+    first, _ = authorize(store, token_response('a'))
+    second, http = authorize(store)
+    eq_({'authorization': 'OAuth2 a'}, second())
+    eq_(0, http.request.call_count)
+
+
+def test_expired_stored_token_is_not_used():
+    store = MemoryTokenStore()
+    auth, _ = authorize(store, token_response('a'))
+    store.save(auth.store_key(), stored_token('old', expires_in=10))
+    auth, http = authorize(store, token_response('b'))
+    eq_({'authorization': 'OAuth2 b'}, auth())
+
+
+def test_refresh_picks_up_token_from_other_process():
+    store = MemoryTokenStore()
+    auth, http = authorize(store, token_response('a'))
+    store.save(auth.store_key(), stored_token('b'))
+    auth.refresh({'authorization': 'OAuth2 a'})
+    eq_({'authorization': 'OAuth2 b'}, auth())
+    eq_(1, http.request.call_count)
+
+
+def test_keys_differ_per_identity():
+    store = MemoryTokenStore()
+    auth, _ = authorize(store, token_response('a'))
+    other = transport.OAuthAppAuthorization.__new__(transport.OAuthAppAuthorization)
+    other.domain, other.key, other.app_id = auth.domain, auth.key, 8
+    assert auth.store_key() != other.store_key()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.transport.HttpTransport and its connection pool.
+"""
+
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from mock import Mock
+from nose.tools import eq_, assert_raises
+
+from pypodio2.transport import (ConnectionPool, HttpTransport, StreamingHttp,
+                                TransportException)
+from tests.utils import (check_client_method, get_client_and_http, start_local_server,
+                         URL_BASE)
+
+
+def test_pool_reuses_connections():
+    created = []
+
+    def factory():
+        http = Mock()
+        http.request = Mock(return_value=(None, None))
+        created.append(http)
+        return http
+
+    pool = ConnectionPool(2, http_factory=factory)
+    pool.request('http://a/', 'GET')
+    pool.request('http://a/', 'GET')
+    eq_(1, len(created))
+    eq_(2, created[0].request.call_count)
+
+
+def test_pool_bounds_concurrent_connections():
+    created = []
+    in_flight = []
+    peak = [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def slow_request(*args, **kwargs):
+        with lock:
+            in_flight.append(1)
+            peak[0] = max(peak[0], len(in_flight))
+        release.wait(1)
+        with lock:
+            in_flight.pop()
+        return None, None
+
+    def factory():
+        http = Mock()
+        http.request = Mock(side_effect=slow_request)
+        created.append(http)
+        return http
+
+    pool = ConnectionPool(3, http_factory=factory)
+    threads = [threading.Thread(target=pool.request, args=('http://a/', 'GET'))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    eq_(3, len(created))
+    eq_(3, peak[0])
+
+
+def test_pool_size_must_be_positive():
+    assert_raises(ValueError, ConnectionPool, 0)
+
+
+def test_pooled_transport():
+    transport = HttpTransport(URL_BASE, headers_factory=dict, pool_size=4)
+    assert isinstance(transport._http, ConnectionPool)
+    eq_(4, transport._http.size)
+
+
+def test_requests_do_not_share_state():
+    client, check_assertions = check_client_method()
+    first = client.transport.POST.item
+    second = client.transport.GET.app
+    result = second(1)
+    check_assertions(result, 'GET', '/app/1')
+    eq_(['item'], first._attribute_stack)
+    eq_('POST', first._method)
+
+
+def test_method_does_not_leak_into_next_call():
+    client, check_assertions = check_client_method()
+    client.transport.POST
+    result = client.transport.user.status()
+    check_assertions(result, 'GET', '/user/status')
+
+
+class ChunkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):
+        ChunkHandler.connections.add(self.client_address)
+        body = b'x' * 10000
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_streaming_http_reads_incrementally_and_reuses_connection():
+    server = start_local_server(ChunkHandler)
+    try:
+        http = StreamingHttp()
+        url = 'http://127.0.0.1:%s/file/1/raw' % server.server_address[1]
+        for _ in range(2):
+            response, stream = http.request(url)
+            eq_(200, response.status)
+            eq_('10000', response['content-length'])
+            chunks = list(stream.iter_chunks(4096))
+            stream.close()
+            eq_([4096, 4096, 1808], [len(chunk) for chunk in chunks])
+        eq_(1, len(ChunkHandler.connections))
+        http.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stream_error_raises():
+    client, _ = get_client_and_http()
+    response = Mock()
+    response.status = 404
+    stream = Mock()
+    stream.read = Mock(return_value=b'{"error": "not_found"}')
+    client.transport._streaming_http = Mock()
+    client.transport._streaming_http.request = Mock(return_value=(response, stream))
+
+    assert_raises(TransportException, client.transport.GET, url='/file/1/raw', stream=True)
+    stream.close.assert_called_once_with()
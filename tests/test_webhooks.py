@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Unit tests for pypodio2.webhooks
+"""
+
+import io
+import threading
+
+from mock import Mock
+from nose.tools import assert_raises, eq_
+
+from pypodio2.webhooks import WebhookReceiver
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+
+def post(receiver, method='POST', **params):
+    body = urlencode(params).encode("utf-8")
+    environ = {'REQUEST_METHOD': method, 'CONTENT_LENGTH': str(len(body)),
+               'wsgi.input': io.BytesIO(body)}
+    start_response = Mock()
+    eq_([b''], receiver(environ, start_response))
+    return start_response.call_args[0][0]
+
+
+def make_client():
+    client = Mock()
+    client.Item.find.side_effect = lambda item_id: {'item_id': item_id}
+    return client
+
+
+def test_verification_handshake():
+    client = make_client()
+    receiver = WebhookReceiver(client, Mock(), hook_ids=[5])
+    try:
+        eq_('200 OK', post(receiver, type='hook.verify', hook_id='5', code='a1b2'))
+        client.Hook.validate.assert_called_once_with('5', 'a1b2')
+        eq_('403 Forbidden', post(receiver, type='hook.verify', hook_id='6', code='c'))
+        eq_('405 Method Not Allowed', post(receiver, method='GET'))
+        eq_('400 Bad Request', post(receiver, hook_id='5'))
+    finally:
+        receiver.close()
+
+
+def test_bursts_are_merged_and_fetched_once():
+    client = make_client()
+    handler = Mock()
+    receiver = WebhookReceiver(client, handler, window=60)
+    try:
+        for revision in range(5):
+            post(receiver, type='item.update', hook_id='5', item_id='1',
+                 item_revision_id=str(revision))
+        post(receiver, type='item.create', hook_id='5', item_id='2')
+        post(receiver, type='item.update', hook_id='5', item_id='2')
+        post(receiver, type='item.update', hook_id='5', item_id='3')
+        post(receiver, type='item.delete', hook_id='5', item_id='3')
+        post(receiver, type='app.update', hook_id='7', app_id='9')
+        post(receiver, type='app.update', hook_id='7', app_id='9')
+        receiver.flush()
+    finally:
+        receiver.close()
+
+    events = handler.call_args[0][0]
+    eq_([('item.update', 1, 5), ('item.create', 2, 2), ('item.delete', 3, 2),
+         ('app.update', None, 2)],
+        [(event.type, event.item_id, event.count) for event in events])
+    eq_('4', events[0].params['item_revision_id'])
+    eq_([{'item_id': 1}, {'item_id': 2}, None, None], [event.item for event in events])
+    eq_(2, client.Item.find.call_count)
+    eq_({'received': 11, 'events': 4, 'fetched': 2, 'handler_errors': 0}, receiver.stats)
+
+
+def test_window_and_errors():
+    client = make_client()
+    client.Item.find.side_effect = ValueError('gone')
+    handled = threading.Event()
+
+    def handler(events):
+        eq_('gone', str(events[0].error))
+        handled.set()
+        raise KeyError('handler')
+
+    receiver = WebhookReceiver(client, handler, window=0.05)
+    try:
+        post(receiver, type='item.update', hook_id='5', item_id='1')
+        assert handled.wait(5)
+    finally:
+        receiver.close()
+    eq_(1, receiver.stats['handler_errors'])
+    assert isinstance(receiver.last_error, KeyError)
+
+
+def test_needs_pooled_client_for_workers():
+    client = make_client()
+    client.transport.thread_safe = False
+    assert_raises(ValueError, WebhookReceiver, client, Mock(), workers=4)
+    receiver = WebhookReceiver(client, Mock())
+    receiver.close()
+    eq_(1, receiver.workers)
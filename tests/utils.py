@@ -2,9 +2,17 @@
 Helper methods for testing
 """
 import json
+import threading
 
 from uuid import uuid4
 
+try:
+    from http.server import HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer
+    from SocketServer import ThreadingMixIn
+
 from mock import Mock
 from nose.tools import eq_
 
@@ -84,3 +92,21 @@ def check_client_method():
                                              headers=expected_headers)
 
     return client, check_assertions
+
+
+class LocalServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_local_server(handler_class):
+    """
+    Serves ``handler_class`` (a BaseHTTPRequestHandler) on a free local
+    port in a background thread. Returns the server; its base URL is
+    'http://127.0.0.1:%s' % server.server_address[1]. Call shutdown() and
+    server_close() when done.
+    """
+    server = LocalServer(('127.0.0.1', 0), handler_class)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server